@@ -0,0 +1,55 @@
+# ABOUTME: Benchmark measuring how the thread batch backend of run_post scales with thread count.
+# Run it on a free-threaded build (python3.14t) to see near-linear scaling; with the GIL it stays flat.
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+
+from markwright.registry import EXTENSION_NAMES, run_post_many
+
+# One synthetic rendered page: prose, a styled fence, in-code highlights, and a
+# CodePen embed, so every post stage has work to do.
+PAGE = (
+    '<!-- mw-fence:{"version": 1, "label": "deploy.sh", "environment": "local"} -->\n'
+    '<pre><code class="language-bash">echo &lt;^&gt;hello&lt;^&gt;\n</code></pre>\n'
+    '<p class="codepen" data-slug-hash="abc"></p>\n' + "<p>Some prose with <code>inline</code> code.</p>\n" * 200
+)
+
+
+def _pages_per_second(pages: list[str], threads: int) -> float:
+    """Time one thread-backend batch and return its throughput.
+
+    :param pages: The rendered pages to post-process.
+    :param threads: Worker threads.
+    :returns: Pages processed per second.
+    """
+    started = time.perf_counter()
+    run_post_many(pages, list(EXTENSION_NAMES), backend="thread", max_workers=threads)
+    return len(pages) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    """Print throughput and speedup over one thread for doubling thread counts."""
+    parser = argparse.ArgumentParser(description="Measure how run_post_many scales across threads.")
+    parser.add_argument("--pages", type=int, default=4000, help="pages per batch (default: 4000)")
+    parser.add_argument(
+        "--max-threads", type=int, default=os.process_cpu_count() or 1, help="largest thread count to try"
+    )
+    args = parser.parse_args()
+
+    pages = [PAGE] * args.pages
+    print(f"GIL enabled: {sys._is_gil_enabled()}, pages: {args.pages}")
+    run_post_many(pages[:10], list(EXTENSION_NAMES), backend="thread", max_workers=1)
+    baseline = _pages_per_second(pages, 1)
+    threads = 1
+    while threads <= args.max_threads:
+        rate = baseline if threads == 1 else _pages_per_second(pages, threads)
+        print(f"{threads:>3} threads: {rate:>9.0f} pages/s  speedup {rate / baseline:5.2f}x")
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
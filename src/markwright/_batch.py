@@ -0,0 +1,174 @@
+# ABOUTME: Worker-pool plumbing shared by the batch entry points in registry and render.
+# Picks a process, thread, or subinterpreter pool, plans tasks costliest first, and maps documents in input order.
+
+from __future__ import annotations
+
+import concurrent.futures
+import functools
+import math
+import os
+import sys
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+# Worker pools a batch can run on, by backend name. Every stage is a pure string
+# transform over immutable module state (compiled patterns, the frozen pipelines),
+# so on a free-threaded build threads scale without pickling a single page.
+# Subinterpreters run in parallel on the standard build too, each importing the
+# package once, at a fraction of a worker process's memory. The process and
+# interpreter pools are looked up at call time: importing them costs more than
+# many documents take to transform.
+_POOLS: dict[str, Callable[[int], Executor]] = {
+    "process": lambda worker_count: concurrent.futures.ProcessPoolExecutor(max_workers=worker_count),
+    "thread": lambda worker_count: ThreadPoolExecutor(max_workers=worker_count),
+    "interpreter": lambda worker_count: concurrent.futures.InterpreterPoolExecutor(max_workers=worker_count),
+}
+
+BATCH_BACKENDS: tuple[str, ...] = ("auto", *_POOLS)
+
+
+def resolve_backend(backend: str) -> str:
+    """Turn a requested batch backend into the pool to start.
+
+    ``"auto"`` picks threads when the interpreter runs without the GIL, since they
+    then run stages in parallel at no pickling cost, and processes otherwise.
+
+    :param backend: One of :data:`BATCH_BACKENDS`.
+    :returns: A key of the pool table.
+    :raises ValueError: If ``backend`` is not a known backend.
+    """
+    if backend not in BATCH_BACKENDS:
+        raise ValueError(f"unknown batch backend: {backend!r}")
+    if backend == "auto":
+        return "process" if sys._is_gil_enabled() else "thread"
+    return backend
+
+
+def start_pool(backend: str, worker_count: int) -> Executor:
+    """Start the worker pool a backend names.
+
+    :param backend: One of :data:`BATCH_BACKENDS`; ``"auto"`` is resolved first.
+    :param worker_count: Number of workers.
+    :returns: A new executor the caller must shut down.
+    :raises ValueError: If ``backend`` is not a known backend.
+    """
+    return _POOLS[resolve_backend(backend)](worker_count)
+
+
+def chunksize_for(document_count: int, worker_count: int) -> int:
+    """Pick how many documents to send to a worker per task.
+
+    Aims for about four chunks per worker, the same split ``multiprocessing.Pool``
+    uses: large enough that a page costs little more than its own pickling, small
+    enough that one slow chunk does not leave the other workers idle at the end.
+
+    :param document_count: Number of documents in the batch.
+    :param worker_count: Number of workers.
+    :returns: A chunk size of at least one.
+    """
+    return max(1, math.ceil(document_count / (worker_count * 4)))
+
+
+def plan_tasks(
+    document_count: int, worker_count: int, chunksize: int | None, costs: list[int] | None = None
+) -> list[list[int]]:
+    """Group a batch into the tasks a pool hands out, costliest first.
+
+    A pool starts its tasks in the order they were submitted, so with costs the
+    documents are ordered from the most expensive down (longest processing time
+    first). The large documents then start at once and the small ones fill the
+    gaps at the end, instead of one large document arriving last and keeping a
+    single worker busy while the rest sit idle. Without a fixed ``chunksize``,
+    each task holds documents worth half of one worker's share of the cost not
+    yet planned, so a large document travels alone, the first tasks of small
+    documents are large enough to be cheap to send, and the last ones are small
+    enough that the workers finish together.
+
+    :param document_count: Number of documents in the batch.
+    :param worker_count: Number of workers.
+    :param chunksize: Documents per task, or ``None`` to size tasks by cost, or
+        by :func:`chunksize_for` when there are no costs.
+    :param costs: Estimated cost of each document; ``None`` keeps input order.
+    :returns: Document indices per task, in submission order.
+    """
+    if costs is None:
+        size = chunksize or chunksize_for(document_count, worker_count)
+        return [list(range(start, min(start + size, document_count))) for start in range(0, document_count, size)]
+    # sorted() is stable, so documents of equal cost keep their input order.
+    order = sorted(range(document_count), key=lambda index: -costs[index])
+    if chunksize is not None:
+        return [order[start : start + chunksize] for start in range(0, document_count, chunksize)]
+    # Every document costs at least one, so a batch of empty documents still shares tasks.
+    remaining = sum(costs) + document_count
+    tasks: list[list[int]] = [[]]
+    task_cost = 0
+    for index in order:
+        if task_cost >= remaining / (worker_count * 2):
+            tasks.append([])
+            task_cost = 0
+        tasks[-1].append(index)
+        task_cost += costs[index] + 1
+        remaining -= costs[index] + 1
+    return tasks
+
+
+def _run_task[T](task: Callable[[str], T], documents: list[str]) -> list[T]:
+    """Run one planned task; the picklable unit a pool worker receives.
+
+    :param task: Per-document function, with the selection bound.
+    :param documents: The task's documents.
+    :returns: One result per document, in the task's order.
+    """
+    return [task(document) for document in documents]
+
+
+def map_documents[T](
+    run_one: Callable[[frozenset[str], str], T],
+    documents: Iterable[str],
+    names: list[str],
+    executor: Executor | None,
+    backend: str,
+    max_workers: int | None,
+    chunksize: int | None,
+    cost: Callable[[str], int] | None = None,
+) -> list[T]:
+    """Apply ``run_one`` to every document, in a worker pool when that pays off.
+
+    A batch of one document, or a single worker, runs in-process without starting
+    a pool. ``run_one`` must be a module-level function so process and
+    subinterpreter workers can import it. With ``cost``, the documents are
+    estimated before they are sent and dispatched costliest first; see
+    :func:`plan_tasks`.
+
+    :param run_one: Per-document worker function taking the selection and a document.
+    :param documents: The documents, in order.
+    :param names: Selected extension names, already validated.
+    :param executor: Executor to submit to, or ``None`` to manage a pool.
+    :param backend: Kind of pool to manage when ``executor`` is ``None``.
+    :param max_workers: Worker count for a managed pool; defaults to the usable CPUs.
+    :param chunksize: Documents per task, or ``None`` to size tasks by cost.
+    :param cost: Estimates a document's cost in the parent, before dispatch.
+    :returns: One result per document, in input order.
+    :raises ValueError: If the backend is not known.
+    """
+    resolve_backend(backend)  # Validate up front, so a bad backend fails on the serial path too.
+    batch = list(documents)
+    task = functools.partial(run_one, frozenset(names))
+    worker_count = max_workers or os.process_cpu_count() or 1
+    if executor is None and (worker_count == 1 or len(batch) < 2):
+        return [task(document) for document in batch]
+    costs = [cost(document) for document in batch] if cost is not None else None
+    tasks = plan_tasks(len(batch), worker_count, chunksize, costs)
+    run_task = functools.partial(_run_task, task)
+    chunks = [[batch[index] for index in indices] for indices in tasks]
+    if executor is not None:
+        answers = list(executor.map(run_task, chunks))
+    else:
+        with start_pool(backend, worker_count) as pool:
+            answers = list(pool.map(run_task, chunks))
+    by_index = {
+        index: result
+        for indices, results in zip(tasks, answers, strict=True)
+        for index, result in zip(indices, results, strict=True)
+    }
+    return [by_index[index] for index in range(len(batch))]
@@ -0,0 +1,84 @@
+# ABOUTME: Fused single-pass dispatcher for the standalone embed directives.
+# Routes each segmented [keyword ...] line to its extension's renderer, skipping code.
+
+from __future__ import annotations
+
+import re
+from collections.abc import Callable, Mapping
+
+from markwright._segment import EMBED, HTML, OPEN_FENCE, Segment, join_segments, segment_source
+from markwright._stats import count
+
+EmbedRenderer = Callable[[str], str | None]
+
+# The leading ``[word`` token of a line, after any indentation. Every embed
+# directive starts with its keyword, so this one match picks the single renderer
+# that could possibly claim the line.
+_KEYWORD_RE = re.compile(r"\s*\[(\w+)")
+
+
+def expand_embeds(text: str, renderers: Mapping[str, EmbedRenderer]) -> str:
+    """Expand standalone embed lines for several extensions in a single pass.
+
+    Equivalent to running each extension's ``expand_source`` in turn, but the
+    source is split and joined once and each line is offered to at most one
+    renderer: the one registered for its leading ``[keyword`` token.
+
+    :param text: The source text.
+    :param renderers: Line renderers keyed by directive keyword (``"youtube"``,
+        ``"compare"``, ...). Each returns the embed HTML, or ``None`` when the
+        line is not a valid embed.
+    :returns: The text with every recognized standalone embed replaced by HTML.
+    """
+    lines = text.split("\n")
+    for line_index, line in enumerate(lines):
+        keyword_match = _KEYWORD_RE.match(line)
+        if keyword_match is None:
+            continue
+        renderer = renderers.get(keyword_match.group(1))
+        if renderer is None:
+            continue
+        embed_html = renderer(line)
+        if embed_html is not None:
+            lines[line_index] = embed_html
+            count(f"embeds_expanded.{keyword_match.group(1)}")
+    return "\n".join(lines)
+
+
+def expand_embed_segments(segments: list[Segment], renderers: Mapping[str, EmbedRenderer]) -> list[Segment]:
+    """Expand the embed-line segments claimed by ``renderers``.
+
+    Fenced and inline code never holds an embed segment, so directives shown as
+    code examples stay literal, as they do in-process. An unclosed fence renders
+    as prose, so its lines are still offered to the renderers.
+
+    :param segments: Segments from :func:`~markwright._segment.segment_source`.
+    :param renderers: Line renderers keyed by directive keyword, as for :func:`expand_embeds`.
+    :returns: The segments with each rendered embed line replaced by an ``html`` segment.
+    """
+    expanded: list[Segment] = []
+    for segment in segments:
+        if segment.kind == OPEN_FENCE:
+            segment = Segment(OPEN_FENCE, expand_embeds(segment.text, renderers))
+        elif segment.kind == EMBED:
+            keyword_match = _KEYWORD_RE.match(segment.text)
+            assert keyword_match is not None
+            renderer = renderers.get(keyword_match.group(1))
+            embed_html = renderer(segment.text) if renderer is not None else None
+            if embed_html is not None:
+                segment = Segment(HTML, embed_html)
+                count(f"embeds_expanded.{keyword_match.group(1)}")
+        expanded.append(segment)
+    return expanded
+
+
+def expand_embed_source(text: str, renderers: Mapping[str, EmbedRenderer]) -> str:
+    """Segment ``text`` and expand the embed lines claimed by ``renderers``.
+
+    The standalone ``expand_source`` of every embed extension.
+
+    :param text: The source text.
+    :param renderers: Line renderers keyed by directive keyword.
+    :returns: The text with every standalone embed outside code replaced by HTML.
+    """
+    return join_segments(expand_embed_segments(segment_source(text, renderers), renderers))
@@ -0,0 +1,30 @@
+# ABOUTME: Python-Markdown classes for the markwright extensions, kept apart from their stage functions.
+# Imported only when Python-Markdown loads an extension, so the mw pre and post paths never import Markdown.
+
+from __future__ import annotations
+
+import importlib
+from collections.abc import Callable
+
+
+def markdown_attributes(module_name: str, names: tuple[str, ...]) -> Callable[[str], object]:
+    """Build the module ``__getattr__`` that exposes an extension's Python-Markdown classes.
+
+    Each public extension module keeps its stage functions, which need only the
+    standard library, and forwards ``makeExtension`` and its processor classes to
+    the same-named module in this package, imported on first access. Python-Markdown
+    finds ``makeExtension`` by attribute lookup, so loading ``markwright.youtube``
+    as an extension works unchanged.
+
+    :param module_name: ``__name__`` of the public extension module.
+    :param names: The attributes to forward.
+    :returns: A function to assign to the module's ``__getattr__``.
+    """
+    target = f"{__name__}.{module_name.rpartition('.')[2]}"
+
+    def __getattr__(name: str) -> object:
+        if name not in names:
+            raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+        return getattr(importlib.import_module(target), name)
+
+    return __getattr__
@@ -0,0 +1,76 @@
+# ABOUTME: Python-Markdown classes for the CodePen extension, loaded by markwright.codepen.
+# Wraps the stage functions in processors; makeExtension is the entry point Python-Markdown calls.
+
+from __future__ import annotations
+
+from markdown import Markdown
+from markdown.extensions import Extension
+from markdown.postprocessors import Postprocessor
+from markdown.preprocessors import Preprocessor
+
+from markwright._stats import count
+from markwright.codepen import _render_match, apply_html
+
+
+class CodePenPreprocessor(Preprocessor):
+    """Replace [codepen ...] lines with CodePen embed HTML.
+
+    :param md: The Markdown instance.
+    """
+
+    def run(self, lines: list[str]) -> list[str]:
+        """Process lines, replacing CodePen embed syntax with HTML.
+
+        :param lines: Source lines to process.
+        :returns: Modified lines with CodePen embeds replaced by HTML.
+        """
+        output: list[str] = []
+        for line in lines:
+            embed_html = _render_match(line)
+            if embed_html is not None:
+                output.append(self.md.htmlStash.store(embed_html))
+                count("embeds_expanded.codepen")
+            else:
+                output.append(line)
+        return output
+
+
+class CodePenPostprocessor(Postprocessor):
+    """Append the CodePen embed script tag once if any embeds are present.
+
+    :param md: The Markdown instance.
+    """
+
+    def run(self, text: str) -> str:
+        """Append the script tag if a CodePen embed signature is present.
+
+        :param text: Rendered HTML content.
+        :returns: HTML with CodePen script appended if needed.
+        """
+        return apply_html(text)
+
+
+class CodePenExtension(Extension):
+    """Python-Markdown extension for CodePen embeds.
+
+    :param \\*\\*kwargs: Configuration options passed to the extension.
+    """
+
+    def extendMarkdown(self, md: Markdown) -> None:
+        """Register the CodePen preprocessor and postprocessor.
+
+        :param md: The Markdown instance to extend.
+        """
+        preprocessor = CodePenPreprocessor(md)
+        postprocessor = CodePenPostprocessor(md)
+        md.preprocessors.register(preprocessor, "do-codepen", 20)
+        md.postprocessors.register(postprocessor, "do-codepen-script", 15)
+
+
+def makeExtension(**kwargs: object) -> CodePenExtension:
+    """Create and return the CodePenExtension instance.
+
+    :param \\*\\*kwargs: Configuration options.
+    :returns: A configured CodePenExtension.
+    """
+    return CodePenExtension(**kwargs)
@@ -0,0 +1,91 @@
+# ABOUTME: Python-Markdown classes for the fence extension, loaded by markwright.fence.
+# Wraps the stage functions in processors; makeExtension is the entry point Python-Markdown calls.
+
+from __future__ import annotations
+
+from markdown import Markdown
+from markdown.extensions import Extension
+from markdown.postprocessors import Postprocessor
+from markdown.preprocessors import Preprocessor
+
+from markwright.fence import _apply_marker, _expand_lines
+
+
+class FencePreprocessor(Preprocessor):
+    """Extract directives and prefix flags from fenced code blocks.
+
+    :param md: The Markdown instance.
+    :param extension: The parent FenceExtension instance.
+    """
+
+    def __init__(self, md: Markdown, extension: FenceExtension) -> None:
+        super().__init__(md)
+        self.extension = extension
+
+    def run(self, lines: list[str]) -> list[str]:
+        """Process lines, extracting fence directives and injecting metadata comments.
+
+        :param lines: Source lines to process.
+        :returns: Modified lines with directives replaced by metadata comments.
+        """
+        return _expand_lines(lines, self.extension.getConfig("allowed_environments"))
+
+
+class FencePostprocessor(Postprocessor):
+    """Inject label HTML and line prefixes based on metadata comments.
+
+    :param md: The Markdown instance.
+    :param extension: The parent FenceExtension instance.
+    """
+
+    def __init__(self, md: Markdown, extension: FenceExtension) -> None:
+        super().__init__(md)
+        self.extension = extension
+
+    def run(self, text: str) -> str:
+        """Process rendered HTML, replacing metadata comments with label elements and prefixes.
+
+        :param text: Rendered HTML string.
+        :returns: Modified HTML with label divs, environment classes, and line prefixes injected.
+        """
+        return _apply_marker(
+            text,
+            None,
+            self.extension.getConfig("label_class"),
+            self.extension.getConfig("secondary_label_class"),
+        )
+
+
+class FenceExtension(Extension):
+    """Python-Markdown extension for fence labels, environments, and prefixes.
+
+    :param \\*\\*kwargs: Configuration options passed to the extension.
+    """
+
+    def __init__(self, **kwargs: object) -> None:
+        self.config: dict[str, list[object]] = {
+            "label_class": ["code-label", "CSS class for the label div"],
+            "secondary_label_class": ["secondary-code-label", "CSS class for the secondary label div"],
+            "allowed_environments": [[], "List of allowed environment names (empty = allow all)"],
+        }
+        super().__init__(**kwargs)
+
+    def extendMarkdown(self, md: Markdown) -> None:
+        """Register the fence preprocessor and postprocessor.
+
+        :param md: The Markdown instance to extend.
+        """
+        preprocessor = FencePreprocessor(md, self)
+        md.preprocessors.register(preprocessor, "mw-fence-pre", 40)
+
+        postprocessor = FencePostprocessor(md, self)
+        md.postprocessors.register(postprocessor, "mw-fence-post", 25)
+
+
+def makeExtension(**kwargs: object) -> FenceExtension:
+    """Create and return the FenceExtension instance.
+
+    :param \\*\\*kwargs: Configuration options.
+    :returns: A configured FenceExtension.
+    """
+    return FenceExtension(**kwargs)
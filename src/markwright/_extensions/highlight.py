@@ -0,0 +1,85 @@
+# ABOUTME: Python-Markdown classes for the highlight extension, loaded by markwright.highlight.
+# Wraps the stage functions in processors; makeExtension is the entry point Python-Markdown calls.
+
+from __future__ import annotations
+
+import re
+import xml.etree.ElementTree as etree
+
+from markdown import Markdown
+from markdown.extensions import Extension
+from markdown.inlinepatterns import InlineProcessor
+from markdown.postprocessors import Postprocessor
+
+from markwright._stats import count
+from markwright.highlight import _HIGHLIGHT_PATTERN, apply_html
+
+
+class HighlightInlineProcessor(InlineProcessor):
+    """Inline processor that converts ``<^>text<^>`` to ``<mark>text</mark>``.
+
+    :param pattern: Regex pattern for matching highlight markers.
+    :param md: The Markdown instance.
+    """
+
+    def handleMatch(self, match: re.Match[str], data: str) -> tuple[etree.Element, int, int]:  # type: ignore[override]
+        """Create a ``<mark>`` element from the matched text.
+
+        :param match: The regex match object.
+        :param data: The full source string being processed.
+        :returns: A tuple of (element, start, end).
+        """
+        mark_element = etree.Element("mark")
+        mark_element.text = match.group(1)
+        count("regions_wrapped")
+        return mark_element, match.start(0), match.end(0)
+
+
+class HighlightPostprocessor(Postprocessor):
+    """Postprocessor that replaces HTML-escaped ``<^>`` markers in rendered code blocks.
+
+    Code blocks render ``<`` and ``>`` as ``&lt;`` and ``&gt;``, so the inline
+    processor cannot reach them. This postprocessor catches those escaped markers
+    in the final HTML and converts them to ``<mark>`` tags.
+    """
+
+    def run(self, text: str) -> str:
+        """Replace escaped highlight markers with ``<mark>`` tags.
+
+        :param text: The rendered HTML string.
+        :returns: HTML with highlight markers replaced.
+        """
+        return apply_html(text)
+
+
+class HighlightExtension(Extension):
+    """Python-Markdown extension for ``<^>text<^>`` highlight syntax.
+
+    Registers an :class:`HighlightInlineProcessor` for regular inline text and a
+    :class:`HighlightPostprocessor` for code blocks where markers are HTML-escaped.
+    """
+
+    def extendMarkdown(self, md: Markdown) -> None:
+        """Register the highlight processors with the Markdown instance.
+
+        :param md: The Markdown instance to extend.
+        """
+        md.inlinePatterns.register(
+            HighlightInlineProcessor(_HIGHLIGHT_PATTERN, md),
+            "do_highlight_inline",
+            175,
+        )
+        md.postprocessors.register(
+            HighlightPostprocessor(md),
+            "do_highlight_post",
+            25,
+        )
+
+
+def makeExtension(**kwargs: str) -> HighlightExtension:
+    """Entry point for Python-Markdown extension loading.
+
+    :param kwargs: Extension configuration options.
+    :returns: A configured HighlightExtension instance.
+    """
+    return HighlightExtension(**kwargs)
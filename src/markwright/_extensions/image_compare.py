@@ -0,0 +1,62 @@
+# ABOUTME: Python-Markdown classes for the image compare extension, loaded by markwright.image_compare.
+# Wraps the stage functions in processors; makeExtension is the entry point Python-Markdown calls.
+
+from __future__ import annotations
+
+from markdown import Markdown
+from markdown.extensions import Extension
+from markdown.preprocessors import Preprocessor
+
+from markwright._stats import count
+from markwright.image_compare import _render_match
+
+
+class ImageComparePreprocessor(Preprocessor):
+    """Replace [compare ...] lines with image comparison HTML.
+
+    :param md: The Markdown instance.
+    """
+
+    def run(self, lines: list[str]) -> list[str]:
+        """Process lines, replacing image compare syntax with HTML.
+
+        :param lines: Source lines to process.
+        :returns: Modified lines with image compare embeds replaced by HTML.
+        """
+        output: list[str] = []
+        for line in lines:
+            # Stash the raw HTML so Markdown does not parse its contents. The
+            # oninput handler contains a JS backtick template literal that
+            # would otherwise be turned into an inline <code> span, and the
+            # block-level <div> would be wrapped in an invalid <p>.
+            compare_html = _render_match(line)
+            if compare_html is not None:
+                output.append(self.md.htmlStash.store(compare_html))
+                count("embeds_expanded.compare")
+            else:
+                output.append(line)
+        return output
+
+
+class ImageCompareExtension(Extension):
+    """Python-Markdown extension for side-by-side image comparison.
+
+    :param \\*\\*kwargs: Configuration options passed to the extension.
+    """
+
+    def extendMarkdown(self, md: Markdown) -> None:
+        """Register the image compare preprocessor.
+
+        :param md: The Markdown instance to extend.
+        """
+        preprocessor = ImageComparePreprocessor(md)
+        md.preprocessors.register(preprocessor, "do-image-compare", 20)
+
+
+def makeExtension(**kwargs: object) -> ImageCompareExtension:
+    """Create and return the ImageCompareExtension instance.
+
+    :param \\*\\*kwargs: Configuration options.
+    :returns: A configured ImageCompareExtension.
+    """
+    return ImageCompareExtension(**kwargs)
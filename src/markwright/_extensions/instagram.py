@@ -0,0 +1,76 @@
+# ABOUTME: Python-Markdown classes for the Instagram extension, loaded by markwright.instagram.
+# Wraps the stage functions in processors; makeExtension is the entry point Python-Markdown calls.
+
+from __future__ import annotations
+
+from markdown import Markdown
+from markdown.extensions import Extension
+from markdown.postprocessors import Postprocessor
+from markdown.preprocessors import Preprocessor
+
+from markwright._stats import count
+from markwright.instagram import _render_match, apply_html
+
+
+class InstagramPreprocessor(Preprocessor):
+    """Replace [instagram ...] lines with Instagram embed HTML.
+
+    :param md: The Markdown instance.
+    """
+
+    def run(self, lines: list[str]) -> list[str]:
+        """Process lines, replacing Instagram embed syntax with HTML.
+
+        :param lines: Source lines to process.
+        :returns: Modified lines with Instagram embeds replaced by HTML.
+        """
+        output: list[str] = []
+        for line in lines:
+            embed_html = _render_match(line)
+            if embed_html is not None:
+                output.append(self.md.htmlStash.store(embed_html))
+                count("embeds_expanded.instagram")
+            else:
+                output.append(line)
+        return output
+
+
+class InstagramPostprocessor(Postprocessor):
+    """Append the Instagram embed script tag once if any embeds are present.
+
+    :param md: The Markdown instance.
+    """
+
+    def run(self, text: str) -> str:
+        """Append the script tag if an Instagram embed signature is present.
+
+        :param text: Rendered HTML content.
+        :returns: HTML with Instagram script appended if needed.
+        """
+        return apply_html(text)
+
+
+class InstagramExtension(Extension):
+    """Python-Markdown extension for Instagram embeds.
+
+    :param \\*\\*kwargs: Configuration options passed to the extension.
+    """
+
+    def extendMarkdown(self, md: Markdown) -> None:
+        """Register the Instagram preprocessor and postprocessor.
+
+        :param md: The Markdown instance to extend.
+        """
+        preprocessor = InstagramPreprocessor(md)
+        postprocessor = InstagramPostprocessor(md)
+        md.preprocessors.register(preprocessor, "do-instagram", 20)
+        md.postprocessors.register(postprocessor, "do-instagram-script", 15)
+
+
+def makeExtension(**kwargs: object) -> InstagramExtension:
+    """Create and return the InstagramExtension instance.
+
+    :param \\*\\*kwargs: Configuration options.
+    :returns: A configured InstagramExtension.
+    """
+    return InstagramExtension(**kwargs)
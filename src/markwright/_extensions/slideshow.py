@@ -0,0 +1,58 @@
+# ABOUTME: Python-Markdown classes for the slideshow extension, loaded by markwright.slideshow.
+# Wraps the stage functions in processors; makeExtension is the entry point Python-Markdown calls.
+
+from __future__ import annotations
+
+from markdown import Markdown
+from markdown.extensions import Extension
+from markdown.preprocessors import Preprocessor
+
+from markwright._stats import count
+from markwright.slideshow import _render_match
+
+
+class SlideshowPreprocessor(Preprocessor):
+    """Replace [slideshow ...] lines with slideshow HTML.
+
+    :param md: The Markdown instance.
+    """
+
+    def run(self, lines: list[str]) -> list[str]:
+        """Process lines, replacing slideshow embed syntax with HTML.
+
+        :param lines: Source lines to process.
+        :returns: Modified lines with slideshow embeds replaced by HTML.
+        """
+        output: list[str] = []
+        for line in lines:
+            slideshow_html = _render_match(line)
+            if slideshow_html is not None:
+                output.append(self.md.htmlStash.store(slideshow_html))
+                count("embeds_expanded.slideshow")
+            else:
+                output.append(line)
+        return output
+
+
+class SlideshowExtension(Extension):
+    """Python-Markdown extension for image slideshow embeds.
+
+    :param \\*\\*kwargs: Configuration options passed to the extension.
+    """
+
+    def extendMarkdown(self, md: Markdown) -> None:
+        """Register the slideshow preprocessor.
+
+        :param md: The Markdown instance to extend.
+        """
+        preprocessor = SlideshowPreprocessor(md)
+        md.preprocessors.register(preprocessor, "do-slideshow", 20)
+
+
+def makeExtension(**kwargs: object) -> SlideshowExtension:
+    """Create and return the SlideshowExtension instance.
+
+    :param \\*\\*kwargs: Configuration options.
+    :returns: A configured SlideshowExtension.
+    """
+    return SlideshowExtension(**kwargs)
@@ -0,0 +1,76 @@
+# ABOUTME: Python-Markdown classes for the Twitter extension, loaded by markwright.twitter.
+# Wraps the stage functions in processors; makeExtension is the entry point Python-Markdown calls.
+
+from __future__ import annotations
+
+from markdown import Markdown
+from markdown.extensions import Extension
+from markdown.postprocessors import Postprocessor
+from markdown.preprocessors import Preprocessor
+
+from markwright._stats import count
+from markwright.twitter import _render_match, apply_html
+
+
+class TwitterPreprocessor(Preprocessor):
+    """Replace [twitter ...] lines with Twitter embed HTML.
+
+    :param md: The Markdown instance.
+    """
+
+    def run(self, lines: list[str]) -> list[str]:
+        """Process lines, replacing Twitter embed syntax with HTML.
+
+        :param lines: Source lines to process.
+        :returns: Modified lines with Twitter embeds replaced by HTML.
+        """
+        output: list[str] = []
+        for line in lines:
+            embed_html = _render_match(line)
+            if embed_html is not None:
+                output.append(self.md.htmlStash.store(embed_html))
+                count("embeds_expanded.twitter")
+            else:
+                output.append(line)
+        return output
+
+
+class TwitterPostprocessor(Postprocessor):
+    """Append the Twitter widgets script tag once if any embeds are present.
+
+    :param md: The Markdown instance.
+    """
+
+    def run(self, text: str) -> str:
+        """Append the script tag if a Twitter embed signature is present.
+
+        :param text: Rendered HTML content.
+        :returns: HTML with Twitter script appended if needed.
+        """
+        return apply_html(text)
+
+
+class TwitterExtension(Extension):
+    """Python-Markdown extension for Twitter embeds.
+
+    :param \\*\\*kwargs: Configuration options passed to the extension.
+    """
+
+    def extendMarkdown(self, md: Markdown) -> None:
+        """Register the Twitter preprocessor and postprocessor.
+
+        :param md: The Markdown instance to extend.
+        """
+        preprocessor = TwitterPreprocessor(md)
+        postprocessor = TwitterPostprocessor(md)
+        md.preprocessors.register(preprocessor, "do-twitter", 20)
+        md.postprocessors.register(postprocessor, "do-twitter-script", 15)
+
+
+def makeExtension(**kwargs: object) -> TwitterExtension:
+    """Create and return the TwitterExtension instance.
+
+    :param \\*\\*kwargs: Configuration options.
+    :returns: A configured TwitterExtension.
+    """
+    return TwitterExtension(**kwargs)
@@ -0,0 +1,58 @@
+# ABOUTME: Python-Markdown classes for the YouTube extension, loaded by markwright.youtube.
+# Wraps the stage functions in processors; makeExtension is the entry point Python-Markdown calls.
+
+from __future__ import annotations
+
+from markdown import Markdown
+from markdown.extensions import Extension
+from markdown.preprocessors import Preprocessor
+
+from markwright._stats import count
+from markwright.youtube import _render_match
+
+
+class YouTubePreprocessor(Preprocessor):
+    """Replace [youtube ...] lines with responsive iframe HTML.
+
+    :param md: The Markdown instance.
+    """
+
+    def run(self, lines: list[str]) -> list[str]:
+        """Process lines, replacing YouTube embed syntax with iframe HTML.
+
+        :param lines: Source lines to process.
+        :returns: Modified lines with YouTube embeds replaced by HTML.
+        """
+        output: list[str] = []
+        for line in lines:
+            iframe_html = _render_match(line)
+            if iframe_html is not None:
+                output.append(self.md.htmlStash.store(iframe_html))
+                count("embeds_expanded.youtube")
+            else:
+                output.append(line)
+        return output
+
+
+class YouTubeExtension(Extension):
+    """Python-Markdown extension for YouTube video embeds.
+
+    :param \\*\\*kwargs: Configuration options passed to the extension.
+    """
+
+    def extendMarkdown(self, md: Markdown) -> None:
+        """Register the YouTube preprocessor.
+
+        :param md: The Markdown instance to extend.
+        """
+        preprocessor = YouTubePreprocessor(md)
+        md.preprocessors.register(preprocessor, "do-youtube", 20)
+
+
+def makeExtension(**kwargs: object) -> YouTubeExtension:
+    """Create and return the YouTubeExtension instance.
+
+    :param \\*\\*kwargs: Configuration options.
+    :returns: A configured YouTubeExtension.
+    """
+    return YouTubeExtension(**kwargs)
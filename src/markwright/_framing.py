@@ -0,0 +1,129 @@
+# ABOUTME: Document and message framing for mw serve, mw client, and the --framing stream mode.
+# Frames are either a 4-byte big-endian length plus payload, or a payload followed by a NUL byte.
+
+from __future__ import annotations
+
+import io
+import json
+import struct
+from collections.abc import Iterator, Mapping
+from typing import Any, BinaryIO
+
+_LENGTH = struct.Struct(">I")
+
+# Standard streams are typed BinaryIO, socket and pipe buffers BufferedIOBase.
+Stream = BinaryIO | io.BufferedIOBase
+
+FRAMINGS = ("nul", "length")
+
+# Bytes requested per read when scanning for NUL separators; read1 returns
+# whatever has arrived, so a writer waiting on its answer is never starved.
+_CHUNK_SIZE = 64 * 1024
+
+
+def write_frame(stream: Stream, payload: bytes) -> None:
+    """Write one length-prefixed frame.
+
+    :param stream: Binary stream to write to; the caller flushes it.
+    :param payload: Frame contents.
+    """
+    stream.write(_LENGTH.pack(len(payload)) + payload)
+
+
+def read_frame(stream: Stream) -> bytes | None:
+    """Read one length-prefixed frame.
+
+    :param stream: Binary stream to read from.
+    :returns: The frame contents, or ``None`` if the stream ended cleanly before a frame.
+    :raises ValueError: If the stream ends partway through a frame.
+    """
+    prefix = stream.read(_LENGTH.size)
+    if not prefix:
+        return None
+    if len(prefix) < _LENGTH.size:
+        raise ValueError("truncated frame length")
+    (length,) = _LENGTH.unpack(prefix)
+    payload = stream.read(length)
+    if len(payload) < length:
+        raise ValueError("truncated frame payload")
+    return payload
+
+
+def write_message(stream: Stream, header: Mapping[str, object], body: str) -> None:
+    """Write one message: a JSON header frame followed by a UTF-8 body frame.
+
+    :param stream: Binary stream to write to; the caller flushes it.
+    :param header: JSON-serializable message header.
+    :param body: Document text.
+    """
+    write_frame(stream, json.dumps(header).encode())
+    write_frame(stream, body.encode())
+
+
+def read_message(stream: Stream) -> tuple[dict[str, Any], str] | None:
+    """Read one message written by :func:`write_message`.
+
+    :param stream: Binary stream to read from.
+    :returns: ``(header, body)``, or ``None`` if the stream ended cleanly before a message.
+    :raises ValueError: If the stream ends partway through a message, or the
+        header is not a JSON object or the body not UTF-8.
+    """
+    header_frame = read_frame(stream)
+    if header_frame is None:
+        return None
+    body_frame = read_frame(stream)
+    if body_frame is None:
+        raise ValueError("message has no body frame")
+    header = json.loads(header_frame)
+    if not isinstance(header, dict):
+        raise ValueError("message header is not a JSON object")
+    return header, body_frame.decode()
+
+
+def _nul_separated(stream: io.BufferedIOBase) -> Iterator[bytes]:
+    """Yield the NUL-terminated documents of ``stream`` as they arrive.
+
+    :param stream: Buffered binary stream to read from.
+    :returns: An iterator over the documents; a final document without a
+        terminating NUL is yielded too, unless it is empty.
+    """
+    pending = bytearray()
+    while chunk := stream.read1(_CHUNK_SIZE):
+        scan_from = len(pending)
+        pending += chunk
+        start = 0
+        while (end := pending.find(0, scan_from)) != -1:
+            yield bytes(pending[start:end])
+            start = scan_from = end + 1
+        del pending[:start]
+    if pending:
+        yield bytes(pending)
+
+
+def iter_documents(stream: io.BufferedIOBase, framing: str) -> Iterator[bytes]:
+    """Yield the framed documents of ``stream`` one at a time, as they arrive.
+
+    :param stream: Buffered binary stream to read from.
+    :param framing: ``"nul"`` for NUL-terminated documents, ``"length"`` for
+        length-prefixed frames.
+    :returns: An iterator over the raw documents.
+    :raises ValueError: If a length-prefixed stream ends partway through a frame.
+    """
+    if framing == "nul":
+        yield from _nul_separated(stream)
+        return
+    while (frame := read_frame(stream)) is not None:
+        yield frame
+
+
+def write_document(stream: Stream, payload: bytes, framing: str) -> None:
+    """Write one document in the given framing.
+
+    :param stream: Binary stream to write to; the caller flushes it.
+    :param payload: The document.
+    :param framing: ``"nul"`` or ``"length"``, as for :func:`iter_documents`.
+    """
+    if framing == "nul":
+        stream.write(payload + b"\0")
+    else:
+        write_frame(stream, payload)
@@ -0,0 +1,90 @@
+# ABOUTME: Zero-work pass-through for filter input that no selected stage could change.
+# Scans the raw bytes for triggers and copies them out unchanged, inside the kernel when stdin is a file.
+
+from __future__ import annotations
+
+import mmap
+import os
+import stat
+from collections.abc import Callable
+from typing import BinaryIO
+
+# What a scan reads: the bytes of a piped document, or a read-only map of a file.
+Document = bytes | mmap.mmap
+
+
+def _mappable(source: BinaryIO) -> int | None:
+    """Return the descriptor of ``source`` if it is a non-empty regular file read from its start.
+
+    :param source: The input stream.
+    :returns: The file descriptor, or ``None`` for a pipe, a terminal, an
+        in-memory stream, an empty file, or a file already partly read.
+    """
+    try:
+        descriptor = source.fileno()
+    except OSError:
+        return None
+    status = os.fstat(descriptor)
+    if not stat.S_ISREG(status.st_mode) or status.st_size == 0 or source.tell() != 0:
+        return None
+    return descriptor
+
+
+def _send(source: int, destination: BinaryIO, count: int) -> bool:
+    """Copy the first ``count`` bytes of a file to ``destination`` inside the kernel.
+
+    :param source: Descriptor of a regular file.
+    :param destination: The output stream, already flushed.
+    :param count: Bytes to copy.
+    :returns: ``False`` if nothing was copied because ``destination`` has no
+        descriptor or the kernel refused it, so the caller can copy instead.
+    :raises OSError: If the kernel fails after part of the file was copied.
+    """
+    sendfile = getattr(os, "sendfile", None)
+    try:
+        descriptor = destination.fileno()
+    except OSError:
+        return False
+    copied = 0
+    while sendfile is not None and copied < count:
+        try:
+            sent = sendfile(descriptor, source, copied, count - copied)
+        except OSError:
+            if copied:
+                raise
+            return False
+        if sent == 0:
+            # The file shrank under us; what was there has been copied.
+            return True
+        copied += sent
+    return copied == count
+
+
+def pass_through(source: BinaryIO, destination: BinaryIO, untouched: Callable[[Document], bool]) -> bytes | None:
+    """Copy ``source`` to ``destination`` unchanged if ``untouched`` says no stage would change it.
+
+    A regular file is mapped rather than read, so the scan costs no copy of the
+    document, and a document that passes is copied with ``os.sendfile`` where the
+    platform and ``destination`` allow it. Anything else is read once as bytes,
+    never decoded.
+
+    :param source: Binary stdin.
+    :param destination: Binary stdout.
+    :param untouched: Reports whether the raw document can go out as it came in.
+    :returns: ``None`` if the document was copied; otherwise its bytes, for the
+        caller to transform.
+    """
+    descriptor = _mappable(source)
+    if descriptor is None:
+        data = source.read()
+        if not untouched(data):
+            return data
+        destination.write(data)
+        return None
+    with mmap.mmap(descriptor, 0, access=mmap.ACCESS_READ) as view:
+        if not untouched(view):
+            return source.read()
+        destination.flush()
+        if not _send(descriptor, destination, len(view)):
+            destination.write(view)
+    return None
@@ -0,0 +1,95 @@
+# ABOUTME: Literal position index shared by the post stages of one pipeline run.
+# Finds every trigger literal once per document and carries the offsets across each stage's edits.
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+
+from markwright._util import Edit
+
+
+def _find_all(text: str, literal: str, start: int, end: int) -> list[int]:
+    """Return the start offset of every occurrence of ``literal`` within ``text[start:end]``.
+
+    :param text: The text to search.
+    :param literal: The literal to find.
+    :param start: Offset to start searching from.
+    :param end: Offset every occurrence must end at or before.
+    :returns: Ascending start offsets, overlapping occurrences included.
+    """
+    offsets: list[int] = []
+    position = text.find(literal, start, end)
+    while position != -1:
+        offsets.append(position)
+        position = text.find(literal, position + 1, end)
+    return offsets
+
+
+@dataclass(frozen=True, slots=True)
+class LiteralIndex:
+    """The offsets of a fixed set of literals in one text.
+
+    Built once per document from every selected post stage's literals, so a stage
+    visits only the places it cares about instead of searching the whole HTML, and
+    a literal several stages share is searched for once. After a stage's edits are
+    applied, :meth:`remap` shifts the surviving offsets and searches only the
+    edited spans, so the index stays exact without rescanning the document.
+
+    :ivar hits: Ascending start offsets of each literal, keyed by literal.
+    """
+
+    hits: Mapping[str, list[int]]
+
+    @classmethod
+    def build(cls, text: str, literals: Iterable[str]) -> LiteralIndex:
+        """Index every occurrence of ``literals`` in ``text``.
+
+        :param text: The text to index.
+        :param literals: The literals to find; duplicates are searched for once.
+        :returns: The index for ``text``.
+        """
+        return cls({literal: _find_all(text, literal, 0, len(text)) for literal in dict.fromkeys(literals)})
+
+    def contains_any(self, literals: Iterable[str]) -> bool:
+        """Report whether any of ``literals`` occurs in the indexed text.
+
+        :param literals: Indexed literals to check.
+        :returns: ``True`` if at least one of them has an occurrence.
+        """
+        return any(self.hits[literal] for literal in literals)
+
+    def remap(self, text: str, edits: list[Edit]) -> LiteralIndex:
+        """Carry the index across a set of edits.
+
+        Offsets clear of every edit shift by the length change of the edits before
+        them. Occurrences an edit touches are dropped, and each edited span (plus a
+        literal's length either side, for occurrences straddling its boundary) is
+        searched again in the edited text.
+
+        :param text: The text after ``edits`` were applied.
+        :param edits: The applied edits, sorted by offset and non-overlapping, as
+            returned by :func:`~markwright._util.sort_edits`.
+        :returns: The index for ``text``.
+        """
+        if not edits:
+            return self
+        remapped: dict[str, list[int]] = {}
+        for literal, offsets in self.hits.items():
+            reach = len(literal) - 1
+            moved: list[int] = []
+            offset_index = 0
+            delta = 0
+            for edit_offset, edit_length, replacement in edits:
+                while offset_index < len(offsets) and offsets[offset_index] < edit_offset - reach:
+                    moved.append(offsets[offset_index] + delta)
+                    offset_index += 1
+                while offset_index < len(offsets) and offsets[offset_index] < edit_offset + edit_length:
+                    offset_index += 1
+                edited_start = edit_offset + delta
+                window_end = edited_start + len(replacement) + reach
+                moved.extend(_find_all(text, literal, max(0, edited_start - reach), window_end))
+                delta += len(replacement) - edit_length
+            moved.extend(offset + delta for offset in offsets[offset_index:])
+            remapped[literal] = sorted(set(moved))
+        return LiteralIndex(remapped)
@@ -0,0 +1,168 @@
+# ABOUTME: One-time segmentation of Markdown source into prose, code, and embed-line segments.
+# Shared by every pre stage so a document is tokenized once however many extensions run.
+
+from __future__ import annotations
+
+import functools
+import re
+from collections.abc import Iterable
+from typing import NamedTuple
+
+# Segment kinds. ``open_fence`` is a fence opener with no closing fence, together
+# with the directive lines right after it: the fence stage still extracts those
+# directives, but Markdown renders the opener as prose, so the other stages treat
+# it as prose too. ``html`` is an embed line already expanded.
+PROSE = "prose"
+INLINE_CODE = "inline_code"
+FENCE = "fence"
+OPEN_FENCE = "open_fence"
+EMBED = "embed"
+HTML = "html"
+
+FENCE_RE = re.compile(r"^(`{3,}|~{3,})")
+_CLOSING_FENCE_RE = re.compile(r"^(`{3,}|~{3,})[^\S\n]*$", re.MULTILINE)
+_INLINE_CODE_RE = re.compile(r"`[^`\n]*`")
+# A line the fence stage may read as a directive, with the newline before it, matched as it matches one: stripped.
+_DIRECTIVE_LINE_RE = re.compile(r"\n[^\S\n]*\[(?:label|secondary_label|environment) [^\n]+\][^\S\n]*(?=\n|\Z)")
+
+
+class Segment(NamedTuple):
+    """A contiguous run of source text and what it is.
+
+    Block segments (fences and embed lines) hold whole lines without the newline
+    that ends them; that newline belongs to the following prose. Joining every
+    segment's text reproduces the document.
+
+    :ivar kind: One of the module-level kind constants.
+    :ivar text: The segment's source text.
+    """
+
+    kind: str
+    text: str
+
+
+@functools.cache
+def _block_start_re(embed_keywords: tuple[str, ...]) -> re.Pattern[str]:
+    """Build the pattern matching the first line of a fence or embed block.
+
+    :param embed_keywords: Directive keywords whose lines are embed segments.
+    :returns: A multiline pattern with a ``fence`` group for fence openers and an
+        ``embed`` group for recognized ``[keyword`` lines.
+    """
+    block_start = r"^(?:(?P<fence>`{3,}|~{3,})"
+    if embed_keywords:
+        block_start += r"|[^\S\n]*\[(?P<embed>" + "|".join(map(re.escape, embed_keywords)) + r")\b"
+    return re.compile(block_start + ")", re.MULTILINE)
+
+
+def _closing_fence_end(text: str, position: int, fence_marker: str) -> int | None:
+    """Find the end of the line that closes a fence opened with ``fence_marker``.
+
+    A closing line holds only a run of the same fence character at least as long
+    as the opener, optionally followed by whitespace.
+
+    :param text: The source text.
+    :param position: Offset just past the opening line.
+    :param fence_marker: The opener's run of backticks or tildes.
+    :returns: The offset just past the closing line (before its newline), or
+        ``None`` if the fence never closes.
+    """
+    while (closing_match := _CLOSING_FENCE_RE.search(text, position)) is not None:
+        closing_marker = closing_match.group(1)
+        if closing_marker[0] == fence_marker[0] and len(closing_marker) >= len(fence_marker):
+            return closing_match.end()
+        position = closing_match.end()
+    return None
+
+
+def _directive_lines_end(text: str, position: int) -> int:
+    """Skip the directive lines that follow a fence opener.
+
+    :param text: The source text.
+    :param position: Offset just past the opening line.
+    :returns: The offset just past the last directive line (before its newline),
+        or ``position`` if the next line is not a directive.
+    """
+    while (directive_match := _DIRECTIVE_LINE_RE.match(text, position)) is not None:
+        position = directive_match.end()
+    return position
+
+
+def _split_inline(text: str, start: int, end: int, segments: list[Segment]) -> None:
+    """Append the prose between two offsets, split around inline code spans.
+
+    :param text: The source text.
+    :param start: Offset where the prose run starts.
+    :param end: Offset where the prose run ends.
+    :param segments: The list to append ``prose`` and ``inline_code`` segments to.
+    """
+    cursor = start
+    for code_match in _INLINE_CODE_RE.finditer(text, start, end):
+        if code_match.start() > cursor:
+            segments.append(Segment(PROSE, text[cursor : code_match.start()]))
+        segments.append(Segment(INLINE_CODE, code_match.group(0)))
+        cursor = code_match.end()
+    if end > cursor:
+        segments.append(Segment(PROSE, text[cursor:end]))
+
+
+def split_inline(text: str) -> list[Segment]:
+    """Split a run of prose around its inline code spans.
+
+    :param text: Text known to hold no fences, such as a line a stage left as prose.
+    :returns: ``prose`` and ``inline_code`` segments whose texts concatenate to ``text``.
+    """
+    segments: list[Segment] = []
+    _split_inline(text, 0, len(text), segments)
+    return segments
+
+
+def segment_source(text: str, embed_keywords: Iterable[str] = ()) -> list[Segment]:
+    """Split Markdown source into prose, inline-code, fence, and embed-line segments.
+
+    Fences follow the fence extension's rules: an opener is a line starting with
+    three or more backticks or tildes, and it closes at the next line holding only
+    a run of the same character at least as long. Only lines whose leading
+    ``[keyword`` names one of ``embed_keywords`` become embed segments. Scanning
+    jumps between candidate lines with compiled patterns, so plain prose is never
+    visited line by line.
+
+    A fence that never closes yields an ``open_fence`` segment holding only its
+    opener and the directive lines right after it; the text after those is
+    segmented as usual, so a closed fence further down still protects its code.
+
+    :param text: The source text.
+    :param embed_keywords: Directive keywords (``"youtube"``, ``"compare"``, ...) to
+        recognize as embed lines.
+    :returns: Segments whose texts concatenate to ``text``.
+    """
+    block_start_re = _block_start_re(tuple(sorted(set(embed_keywords))))
+    segments: list[Segment] = []
+    cursor = 0
+    while (block_match := block_start_re.search(text, cursor)) is not None:
+        line_start = block_match.start()
+        line_end = text.find("\n", line_start)
+        if line_end == -1:
+            line_end = len(text)
+        fence_marker = block_match.group("fence")
+        kind = EMBED
+        block_end = line_end
+        if fence_marker is not None:
+            closing_end = _closing_fence_end(text, line_end, fence_marker)
+            kind = OPEN_FENCE if closing_end is None else FENCE
+            block_end = _directive_lines_end(text, line_end) if closing_end is None else closing_end
+        _split_inline(text, cursor, line_start, segments)
+        segments.append(Segment(kind, text[line_start:block_end]))
+        cursor = block_end
+    _split_inline(text, cursor, len(text), segments)
+    return segments
+
+
+def join_segments(segments: Iterable[Segment]) -> str:
+    """Reassemble segments into source text.
+
+    :param segments: Segments as produced by :func:`segment_source` and transformed
+        by the pre stages.
+    :returns: The concatenated segment texts.
+    """
+    return "".join(segment.text for segment in segments)
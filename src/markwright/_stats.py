@@ -0,0 +1,39 @@
+# ABOUTME: Event counters the stage functions bump so mw --stats can report what each stage did.
+# Counting is on only inside counting(); elsewhere count() is one context-variable lookup and returns.
+
+from __future__ import annotations
+
+import contextlib
+from collections import Counter
+from collections.abc import Iterator
+from contextvars import ContextVar
+
+_counts: ContextVar[Counter[str] | None] = ContextVar("markwright_counts", default=None)
+
+
+def count(event: str, amount: int = 1) -> None:
+    """Record that a stage did something, if a :func:`counting` block is collecting.
+
+    :param event: What happened, such as ``"markers_applied"``.
+    :param amount: How many times it happened.
+    """
+    counts = _counts.get()
+    if counts is not None:
+        counts[event] += amount
+
+
+@contextlib.contextmanager
+def counting() -> Iterator[Counter[str]]:
+    """Collect the events counted in this context until the block exits.
+
+    A block nested inside another collects its own events; the outer block does
+    not see them.
+
+    :returns: A context manager yielding the counter the events accumulate in.
+    """
+    counts: Counter[str] = Counter()
+    token = _counts.set(counts)
+    try:
+        yield counts
+    finally:
+        _counts.reset(token)
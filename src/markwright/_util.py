@@ -1,9 +1,17 @@
 # ABOUTME: Shared utility functions for markwright extensions.
-# Provides fraction reduction helper used by embed extensions.
+# Provides fraction reduction for embeds, the edit-list merge for post stages, and the atomic write for tree modes.
 
 from __future__ import annotations
 
 import math
+import os
+import stat
+import threading
+from pathlib import Path
+
+# A single splice against a stage's input: replace ``length`` characters starting
+# at ``offset`` with ``replacement``. A zero ``length`` is a pure insertion.
+Edit = tuple[int, int, str]
 
 
 def reduce_fraction(numerator: int, denominator: int) -> tuple[int, int]:
@@ -15,3 +23,80 @@ def reduce_fraction(numerator: int, denominator: int) -> tuple[int, int]:
     """
     divisor = math.gcd(numerator, denominator)
     return numerator // divisor, denominator // divisor
+
+
+def sort_edits(edits: list[Edit], text_length: int) -> list[Edit]:
+    """Order edits by offset and check that they do not overlap.
+
+    The sort is stable, so insertions sharing an offset with each other or with
+    the start of a replacement keep the order in which they were produced.
+
+    :param edits: Edits against a text of ``text_length`` characters, in any order.
+    :param text_length: Length of the text the edits were computed against.
+    :returns: The edits sorted by offset.
+    :raises ValueError: If an edit falls outside the text or overlaps another edit.
+    """
+    ordered = sorted(edits, key=lambda edit: edit[0])
+    previous_end = 0
+    for offset, length, _ in ordered:
+        if offset < previous_end or length < 0 or offset + length > text_length:
+            raise ValueError(f"invalid or overlapping edit at offset {offset} (length {length})")
+        previous_end = offset + length
+    return ordered
+
+
+def apply_edits(text: str, edits: list[Edit]) -> str:
+    """Materialize a list of non-overlapping edits against ``text`` in one pass.
+
+    :param text: The text the edits were computed against.
+    :param edits: ``(offset, length, replacement)`` splices, in any order.
+    :returns: ``text`` with every edit applied.
+    :raises ValueError: If an edit falls outside the text or overlaps another edit.
+    """
+    if not edits:
+        return text
+    parts: list[str] = []
+    cursor = 0
+    for offset, length, replacement in sort_edits(edits, len(text)):
+        parts.append(text[cursor:offset])
+        parts.append(replacement)
+        cursor = offset + length
+    parts.append(text[cursor:])
+    return "".join(parts)
+
+
+def write_atomic(path: Path, text: str | bytes, *, in_place: bool = False) -> None:
+    """Write ``text`` to ``path`` so readers see the old file or the new one, never a partial write.
+
+    The text goes to a temporary file beside ``path`` that is then renamed over
+    it. The temporary name is unique per process and thread, and the file is
+    created with the usual umask-derived mode.
+
+    With ``in_place``, ``path`` is an existing file being rewritten. A symlink is
+    followed, so the file it points to is replaced and the link is kept, and the
+    file's permission bits are copied to the new file before the rename.
+
+    :param path: File to write; its parent directories are created as needed.
+    :param text: Content, written as UTF-8, or bytes written as they are.
+    :param in_place: Whether to keep an existing file's mode and symlinks.
+    :raises FileNotFoundError: If ``in_place`` is set and ``path`` does not exist.
+    """
+    mode = None
+    if in_place:
+        path = path.resolve()
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp")
+    try:
+        if isinstance(text, bytes):
+            with temporary.open("xb") as binary_handle:
+                binary_handle.write(text)
+        else:
+            with temporary.open("x", encoding="utf-8") as handle:
+                handle.write(text)
+        if mode is not None:
+            os.chmod(temporary, mode)
+        os.replace(temporary, path)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
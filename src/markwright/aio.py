@@ -0,0 +1,147 @@
+# ABOUTME: Asyncio entry points that run markwright stages and rendering off the event loop.
+# Offloads large documents to an executor with bounded concurrency; small ones run inline.
+
+from __future__ import annotations
+
+import asyncio
+import os
+import weakref
+from collections.abc import Callable
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+from markwright import registry, render
+
+# Below this many characters a document is transformed directly on the event loop:
+# the work takes less time than handing it to an executor and back.
+INLINE_BELOW = 16 * 1024
+
+
+class Offloader:
+    """Run blocking markwright calls from async code without stalling the event loop.
+
+    Work on documents of at least ``inline_below`` characters is submitted to
+    ``executor``, with at most ``max_concurrency`` submissions in flight per event
+    loop; further callers wait their turn. A slot stays taken until the executor
+    has actually finished the work, so cancelling a caller never lets more jobs
+    run at once than the bound allows. Cancelling a caller whose job has not
+    started yet withdraws the job.
+
+    :param executor: Executor to run work on; by default a thread pool sized to
+        ``max_concurrency``, created on first use. Pass a process pool to keep
+        large documents from competing with the loop for the GIL.
+    :param max_concurrency: Most jobs in flight at once; defaults to the CPUs this
+        process may use.
+    :param inline_below: Document size, in characters, below which work runs inline.
+    """
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        *,
+        max_concurrency: int | None = None,
+        inline_below: int = INLINE_BELOW,
+    ) -> None:
+        self._executor = executor
+        self.max_concurrency = max_concurrency or os.process_cpu_count() or 1
+        self.inline_below = inline_below
+        self._slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def executor(self) -> Executor:
+        """The executor work is offloaded to, created on first use if none was given."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="markwright")
+        return self._executor
+
+    async def run[**P, T](self, size: int, function: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        """Call ``function`` inline or on the executor, depending on ``size``.
+
+        :param size: Size of the document being processed, in characters.
+        :param function: The blocking call; a module-level function if the
+            executor is a process pool.
+        :param args: Positional arguments for ``function``.
+        :param kwargs: Keyword arguments for ``function``.
+        :returns: The result of ``function``.
+        """
+        if size < self.inline_below:
+            return function(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_concurrency)
+        await slots.acquire()
+        try:
+            job = self.executor.submit(function, *args, **kwargs)
+        except BaseException:
+            slots.release()
+            raise
+
+        def release(_: Future[T]) -> None:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(slots.release)
+
+        job.add_done_callback(release)
+        return await asyncio.wrap_future(job)
+
+
+_default_offloader = Offloader()
+
+
+def _post_with_warnings(html: str, names: list[str]) -> tuple[str, list[str]]:
+    """Run the post stages and return the warnings alongside the HTML.
+
+    Collecting warnings in a fresh list lets the call run in another process,
+    where the caller's list could not be appended to.
+
+    :param html: Rendered HTML.
+    :param names: Selected extension names.
+    :returns: ``(html, warnings)``.
+    """
+    warnings: list[str] = []
+    return registry.run_post(html, names, warnings), warnings
+
+
+async def arun_pre(text: str, names: list[str], *, offloader: Offloader | None = None) -> str:
+    """Async form of :func:`markwright.registry.run_pre`.
+
+    :param text: Markdown source text.
+    :param names: Selected extension names.
+    :param offloader: Where to run the work; defaults to a shared thread-pool offloader.
+    :returns: Source text after every selected pre stage has run.
+    """
+    return await (offloader or _default_offloader).run(len(text), registry.run_pre, text, names)
+
+
+async def arun_post(
+    html: str,
+    names: list[str],
+    warnings: list[str] | None = None,
+    *,
+    offloader: Offloader | None = None,
+) -> str:
+    """Async form of :func:`markwright.registry.run_post`.
+
+    :param html: Rendered HTML.
+    :param names: Selected extension names.
+    :param warnings: Optional list collecting skip reasons from stages that validate markers.
+    :param offloader: Where to run the work; defaults to a shared thread-pool offloader.
+    :returns: HTML after every selected post stage has run.
+    """
+    result, post_warnings = await (offloader or _default_offloader).run(len(html), _post_with_warnings, html, names)
+    if warnings is not None:
+        warnings.extend(post_warnings)
+    return result
+
+
+async def arender(text: str, names: list[str], *, offloader: Offloader | None = None) -> str:
+    """Async form of :func:`markwright.render.render`.
+
+    :param text: Markdown source text.
+    :param names: Selected extension names.
+    :param offloader: Where to run the work; defaults to a shared thread-pool offloader.
+    :returns: The rendered HTML.
+    :raises ValueError: If a name is not registered.
+    """
+    return await (offloader or _default_offloader).run(len(text), render.render, text, names)
@@ -0,0 +1,230 @@
+# ABOUTME: Benchmark harness behind mw bench: times every registry stage and render over a corpus.
+# Reports throughput, latency percentiles, and peak memory per stage, as a table or as JSON for comparing releases.
+
+from __future__ import annotations
+
+import functools
+import math
+import random
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from importlib.metadata import version
+from pathlib import Path
+from typing import Literal
+
+from markwright import build, registry, render
+
+# Sections a generated page is assembled from: prose with highlights, each embed,
+# and fences covering labels, environments, prefixes, and line numbers.
+_PROSE = "Configure the <^>server<^> before you deploy, and check `config.<^>timeout<^>` for the limit.\n"
+_SECTIONS = (
+    "[youtube dQw4w9WgXcQ]\n",
+    "[codepen MattCowley vwPzeX dark css 300]\n",
+    "[twitter https://twitter.com/github/status/1234567890]\n",
+    "[instagram https://www.instagram.com/p/CkQuv3_LRgS caption]\n",
+    "[slideshow https://picsum.photos/id/10/480/270 https://picsum.photos/id/20/480/270]\n",
+    "[compare https://picsum.photos/id/10/480/270 https://picsum.photos/id/20/480/270]\n",
+    "```python\n[label app.py]\nfrom flask import Flask\n\napp = <^>Flask(__name__)<^>\n```\n",
+    "```command\n[environment local]\n[label deploy.sh]\nssh root@192.168.1.1\nsystemctl restart nginx\n```\n",
+    "```custom_prefix(mysql>)\nSELECT * FROM users;\nSHOW DATABASES;\n```\n",
+    "```\n[secondary_label Output]\nServer started on port 8080\n```\n",
+)
+_LINE_NUMBERS = "```line_numbers,python\n{body}```\n"
+
+
+@dataclass(frozen=True, slots=True)
+class StageStats:
+    """Timings for one benchmarked stage.
+
+    :ivar stage: ``"pre:<name>"`` or ``"post:<name>"`` for one extension's stage,
+        ``"pre"`` or ``"post"`` for the whole selection, or ``"render"``.
+    :ivar documents: Documents per iteration.
+    :ivar iterations: Timed passes over the corpus.
+    :ivar input_bytes: UTF-8 size of the stage's input, per iteration.
+    :ivar seconds: Total time spent in the stage over every timed pass.
+    :ivar p50_ms: Median per-document latency.
+    :ivar p95_ms: 95th percentile per-document latency.
+    :ivar p99_ms: 99th percentile per-document latency.
+    :ivar peak_bytes: Most memory the stage held at once during one traced pass.
+    """
+
+    stage: str
+    documents: int
+    iterations: int
+    input_bytes: int
+    seconds: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    peak_bytes: int
+
+    @property
+    def mb_per_second(self) -> float:
+        """Input megabytes processed per second."""
+        return self.input_bytes * self.iterations / 1e6 / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def documents_per_second(self) -> float:
+        """Documents processed per second."""
+        return self.documents * self.iterations / self.seconds if self.seconds > 0 else 0.0
+
+    def as_dict(self) -> dict[str, object]:
+        """The fields and derived rates, ready for JSON."""
+        return {**asdict(self), "mb_per_second": self.mb_per_second, "documents_per_second": self.documents_per_second}
+
+
+def generate_corpus(documents: int = 40, seed: int = 0) -> list[str]:
+    """Build a synthetic corpus exercising every extension.
+
+    Pages vary in length, and about one in ten carries a long ``line_numbers``
+    fence, the kind of reference page that dominates a real build.
+
+    :param documents: Number of pages.
+    :param seed: Seed for the page mix, so runs compare like with like.
+    :returns: The Markdown pages.
+    """
+    chooser = random.Random(seed)
+    corpus: list[str] = []
+    for _ in range(documents):
+        parts = [f"# Tutorial\n\n{_PROSE * chooser.randint(2, 20)}"]
+        parts.extend(chooser.choice(_SECTIONS) + "\n" + _PROSE for _ in range(chooser.randint(2, 12)))
+        if chooser.random() < 0.1:
+            body = "".join(f"print({line})  # <^>step<^>\n" for line in range(chooser.randint(200, 2000)))
+            parts.append(_LINE_NUMBERS.format(body=body))
+        corpus.append("\n".join(parts))
+    return corpus
+
+
+def load_corpus(directory: Path) -> list[str]:
+    """Read every Markdown file under ``directory``.
+
+    :param directory: Root of a content tree.
+    :returns: The files' contents, in path order.
+    """
+    return [(directory / relative).read_text(encoding="utf-8") for relative in build.find_sources(directory, "pre")]
+
+
+def _percentile(ordered: list[int], fraction: float) -> float:
+    """Nearest-rank percentile of sorted nanosecond samples, in milliseconds."""
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)] / 1e6
+
+
+def measure(
+    stage: str,
+    function: Callable[[str], object],
+    inputs: list[str],
+    iterations: int,
+    warmup: int,
+) -> StageStats:
+    """Time ``function`` on every input.
+
+    Warmup passes run first and are not timed. Memory is traced in a separate
+    pass after the timed ones, since tracing slows every allocation.
+
+    :param stage: Label for the report.
+    :param function: The stage, taking one document.
+    :param inputs: The documents.
+    :param iterations: Timed passes over ``inputs``.
+    :param warmup: Untimed passes before the timed ones.
+    :returns: The stage's timings.
+    """
+    for _ in range(warmup):
+        for document in inputs:
+            function(document)
+    samples: list[int] = []
+    for _ in range(iterations):
+        for document in inputs:
+            started = time.perf_counter_ns()
+            function(document)
+            samples.append(time.perf_counter_ns() - started)
+    tracemalloc.start()
+    try:
+        for document in inputs:
+            function(document)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    samples.sort()
+    return StageStats(
+        stage=stage,
+        documents=len(inputs),
+        iterations=iterations,
+        input_bytes=sum(len(document.encode()) for document in inputs),
+        seconds=sum(samples) / 1e9,
+        p50_ms=_percentile(samples, 0.50),
+        p95_ms=_percentile(samples, 0.95),
+        p99_ms=_percentile(samples, 0.99),
+        peak_bytes=peak,
+    )
+
+
+def run_bench(corpus: list[str], names: list[str], iterations: int = 5, warmup: int = 1) -> list[StageStats]:
+    """Benchmark each selected extension's stages, the whole pre and post passes, and render.
+
+    Pre stages run on the corpus. Post stages run on the HTML the production
+    pipeline feeds them: the corpus after the pre pass, rendered by the site
+    stack without the markwright extensions.
+
+    :param corpus: Markdown documents.
+    :param names: Selected extension names, in registry order.
+    :param iterations: Timed passes per stage.
+    :param warmup: Untimed passes per stage.
+    :returns: One entry per stage, pre stages first.
+    :raises ValueError: If the corpus is empty, ``iterations`` is below one, or a
+        name is not registered.
+    """
+    if not corpus:
+        raise ValueError("the benchmark corpus is empty")
+    if iterations < 1:
+        raise ValueError(f"iterations must be at least 1, not {iterations}")
+    registry.select_extensions(names, [])
+    pages = [render.render(registry.run_pre(document, names), []) for document in corpus]
+    stages: tuple[tuple[Literal["pre", "post"], Callable[..., str], list[str]], ...] = (
+        ("pre", registry.run_pre, corpus),
+        ("post", registry.run_post, pages),
+    )
+    targets: list[tuple[str, Callable[[str], object], list[str]]] = []
+    for stage, run_stage, inputs in stages:
+        targets.extend(
+            (f"{stage}:{name}", functools.partial(run_stage, names=[name]), inputs)
+            for name in names
+            if registry.REGISTRY[name][stage] is not None
+        )
+        targets.append((stage, functools.partial(run_stage, names=names), inputs))
+    targets.append(("render", functools.partial(render.render, names=names), corpus))
+    return [measure(stage, function, inputs, iterations, warmup) for stage, function, inputs in targets]
+
+
+def report_json(stats: list[StageStats], warmup: int) -> dict[str, object]:
+    """Describe a run for saving and comparing against another release.
+
+    :param stats: The stage timings.
+    :param warmup: Untimed passes per stage.
+    :returns: The run's environment and every stage's timings.
+    """
+    return {
+        "markwright": version("markwright"),
+        "python": sys.version.split()[0],
+        "warmup": warmup,
+        "stages": [entry.as_dict() for entry in stats],
+    }
+
+
+def format_table(stats: list[StageStats]) -> str:
+    """Lay the timings out as a fixed-width table.
+
+    :param stats: The stage timings.
+    :returns: The table, one line per stage after a header.
+    """
+    lines = [
+        f"{'stage':<20} {'MB/s':>8} {'docs/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak KiB':>9}",
+    ]
+    lines.extend(
+        f"{entry.stage:<20} {entry.mb_per_second:>8.2f} {entry.documents_per_second:>9.0f} {entry.p50_ms:>8.3f}"
+        f" {entry.p95_ms:>8.3f} {entry.p99_ms:>8.3f} {entry.peak_bytes / 1024:>9.0f}"
+        for entry in stats
+    )
+    return "\n".join(lines)
@@ -0,0 +1,287 @@
+# ABOUTME: Directory mode behind mw build: applies one pipeline step to every matching file in a tree.
+# Walks the source tree, transforms files on a worker pool, and writes each output atomically.
+
+from __future__ import annotations
+
+import functools
+import gzip
+import importlib
+import mmap
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from markwright import registry, render
+from markwright._batch import map_documents
+from markwright._util import write_atomic
+from markwright.manifest import MANIFEST_NAME, ManifestEntry, content_hash, save_manifest, selection_key
+from markwright.shard import SHARD_STRATEGIES, Shard
+
+# The suffix a step reads and the suffix it writes, by step name.
+STEP_SUFFIXES: dict[str, tuple[str, str]] = {
+    "pre": (".md", ".md"),
+    "post": (".html", ".html"),
+    "render": (".md", ".html"),
+}
+
+BUILD_STEPS: tuple[str, ...] = tuple(STEP_SUFFIXES)
+
+# Compressed sidecars a tree run can write beside each HTML output, by format.
+# Each compresses the output already in memory. gzip leaves out the timestamp so
+# an unchanged page compresses to the same bytes; compression.zstd is new in
+# Python 3.14 and is imported on first use.
+SIDECARS: dict[str, Callable[[bytes], bytes]] = {
+    "gz": lambda data: gzip.compress(data, mtime=0),
+    "zst": lambda data: importlib.import_module("compression.zstd").compress(data),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class BuildResult:
+    """Outcome of one :func:`build_tree` run.
+
+    :ivar files: Number of files written.
+    :ivar seconds: Wall-clock time the run took.
+    :ivar warnings: Skip reasons from post stages, and inputs that are not valid
+        UTF-8 and were not built, each prefixed with its file.
+    :ivar hashes: :func:`~markwright.manifest.content_hash` of each input built,
+        by path relative to the source root.
+    :ivar input_bytes: Total size of the inputs read.
+    """
+
+    files: int
+    seconds: float
+    warnings: tuple[str, ...] = ()
+    hashes: dict[str, str] = field(default_factory=dict)
+    input_bytes: int = 0
+
+    @property
+    def files_per_second(self) -> float:
+        """Throughput of the run, or ``0.0`` for a run too fast to time."""
+        return self.files / self.seconds if self.seconds > 0 else 0.0
+
+
+def find_sources(source: Path, step: str, destination: Path | None = None) -> list[str]:
+    """List the files under ``source`` that ``step`` reads.
+
+    :param source: Root of the source tree.
+    :param step: One of :data:`BUILD_STEPS`.
+    :param destination: Output root; skipped if it lies inside ``source``, so a
+        rerun does not pick up its own outputs.
+    :returns: Paths relative to ``source``, in POSIX form and sorted.
+    """
+    suffix = STEP_SUFFIXES[step][0]
+    skip = destination.resolve() if destination is not None else None
+    found: list[str] = []
+    for directory, dirnames, filenames in os.walk(source):
+        root = Path(directory)
+        dirnames[:] = sorted(name for name in dirnames if (root / name).resolve() != skip)
+        found.extend((root / name).relative_to(source).as_posix() for name in filenames if name.endswith(suffix))
+    return sorted(found)
+
+
+def check_tree(
+    step: str,
+    source: Path,
+    destination: Path,
+    names: list[str],
+    compress: tuple[str, ...] = (),
+) -> None:
+    """Validate a tree run before any file is touched.
+
+    :param step: Step to apply.
+    :param source: Root of the source tree.
+    :param destination: Root of the output tree.
+    :param names: Selected extension names.
+    :param compress: Sidecar formats to write, from :data:`SIDECARS`.
+    :raises ValueError: If the step, a name, or a sidecar format is not known,
+        sidecars are asked of a step that does not write HTML, or the step would
+        overwrite its own inputs.
+    """
+    if step not in STEP_SUFFIXES:
+        raise ValueError(f"unknown build step: {step!r}")
+    registry.select_extensions(names, [])
+    for sidecar in compress:
+        if sidecar not in SIDECARS:
+            raise ValueError(f"unknown sidecar format: {sidecar!r}")
+    if compress and STEP_SUFFIXES[step][1] != ".html":
+        raise ValueError(f"the {step} step does not write HTML; compressed sidecars need post or render")
+    read_suffix, write_suffix = STEP_SUFFIXES[step]
+    if read_suffix == write_suffix and source.resolve() == destination.resolve():
+        raise ValueError(f"the {step} step would overwrite its inputs; choose a separate destination")
+
+
+def transform(step: str, names: list[str], text: str) -> tuple[str, list[str]]:
+    """Apply one step to one document.
+
+    :param step: One of :data:`BUILD_STEPS`.
+    :param names: Selected extension names.
+    :param text: The document.
+    :returns: ``(output, warnings)``.
+    """
+    if step == "pre":
+        return registry.run_pre(text, names), []
+    if step == "post":
+        warnings: list[str] = []
+        return registry.run_post(text, names, warnings), warnings
+    return render.render(text, names), []
+
+
+def file_cost(step: str, source: str, names: list[str], relative: str) -> int:
+    """Estimate one file's cost for largest-first scheduling, without decoding it.
+
+    A post input, or a Markdown input below
+    :data:`~markwright.registry.PRESCAN_MIN_BYTES`, costs its size, read from the
+    file system. A larger Markdown input is mapped rather than read, and scanned
+    by :func:`~markwright.registry.document_cost`.
+
+    :param step: One of :data:`BUILD_STEPS`.
+    :param source: Root of the source tree.
+    :param names: Selected extension names.
+    :param relative: The file, relative to ``source``.
+    :returns: The estimated cost, in bytes of plain prose.
+    """
+    path = Path(source, relative)
+    size = path.stat().st_size
+    if step == "post" or size < registry.PRESCAN_MIN_BYTES:
+        return size
+    with path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        return registry.document_cost(view, "render" if step == "render" else "pre", names)
+
+
+def _build_one(
+    step: str,
+    source: str,
+    destination: str,
+    compress: tuple[str, ...],
+    names: frozenset[str],
+    relative: str,
+) -> tuple[list[str], str | None, int]:
+    """Transform one file and write its output; the picklable unit of :func:`build_tree`.
+
+    The worker reads and writes the file itself, so only paths cross to it. It
+    also writes the file's compressed sidecars from the output it holds, and
+    deletes any sidecar of a format not asked for, which would be stale. A file
+    that is not valid UTF-8 is not built; it comes back as a warning instead.
+
+    :param step: One of :data:`BUILD_STEPS`.
+    :param source: Root of the source tree.
+    :param destination: Root of the output tree.
+    :param compress: Sidecar formats to write, from :data:`SIDECARS`.
+    :param names: Selected extension names.
+    :param relative: The file, relative to ``source``.
+    :returns: The file's warnings, each prefixed with ``relative``, and the hash
+        and size of its input; the hash is ``None`` if the file was not built.
+    """
+    read_suffix, write_suffix = STEP_SUFFIXES[step]
+    source_data = Path(source, relative).read_bytes()
+    try:
+        text = source_data.decode()
+    except UnicodeDecodeError as decode_error:
+        return [f"{relative}: not built: {decode_error}"], None, len(source_data)
+    ordered = [name for name in registry.EXTENSION_NAMES if name in names]
+    output, warnings = transform(step, ordered, text)
+    target = Path(destination, relative.removesuffix(read_suffix) + write_suffix)
+    data = output.encode()
+    write_atomic(target, data)
+    if write_suffix == ".html":
+        for sidecar, compress_bytes in SIDECARS.items():
+            sidecar_path = target.with_name(f"{target.name}.{sidecar}")
+            if sidecar in compress:
+                write_atomic(sidecar_path, compress_bytes(data))
+            else:
+                sidecar_path.unlink(missing_ok=True)
+    return [f"{relative}: {warning}" for warning in warnings], content_hash(source_data), len(source_data)
+
+
+def build_tree(
+    step: str,
+    source: Path,
+    destination: Path,
+    names: list[str],
+    *,
+    executor: Executor | None = None,
+    backend: str = "auto",
+    max_workers: int | None = None,
+    chunksize: int | None = None,
+    compress: tuple[str, ...] = (),
+    shard: Shard | None = None,
+    shard_by: str = "path",
+) -> BuildResult:
+    """Apply ``step`` to every matching file under ``source``, mirroring the tree into ``destination``.
+
+    ``pre`` reads and writes ``.md`` files, ``post`` reads and writes ``.html``
+    files, and ``render`` turns ``.md`` files into ``.html``. Files run on a
+    worker pool as in :func:`~markwright.registry.run_pre_many`, each worker
+    importing the package once for the whole tree. The files are ranked by
+    estimated cost first and dispatched costliest first, so a long reference page
+    does not start last and hold up the run. For ``post`` and ``render``,
+    the worker that produced a page also writes its compressed sidecars, such as
+    ``index.html.gz``, so the page is read and written once in all.
+
+    With ``shard``, only that shard's files are processed, as chosen by
+    :meth:`~markwright.shard.Shard.select` from paths relative to ``source``, and
+    the run also writes a partial manifest and a stats file named after
+    :data:`~markwright.manifest.MANIFEST_NAME` in ``destination``. The partial
+    manifests of all shards merge into the manifest ``mw watch`` reads.
+
+    :param step: One of :data:`BUILD_STEPS`.
+    :param source: Root of the source tree.
+    :param destination: Root of the output tree, created as needed.
+    :param names: Selected extension names.
+    :param executor: Optional executor to run on instead of a fresh pool; it is
+        not shut down.
+    :param backend: Pool to start when no executor is given.
+    :param max_workers: Workers for the managed pool; defaults to the CPUs this
+        process may use.
+    :param chunksize: Files sent to a worker per task; by default each task holds
+        about half of one worker's share of the estimated cost not yet planned.
+    :param compress: Sidecar formats to write beside each page, from :data:`SIDECARS`.
+    :param shard: The slice of the tree to process; all of it by default.
+    :param shard_by: How files are assigned to shards, from
+        :data:`~markwright.shard.SHARD_STRATEGIES`.
+    :returns: The file count, elapsed time, collected warnings, and input hashes.
+    :raises ValueError: If the step, a name, the backend, a sidecar format, or the
+        shard strategy is not known, sidecars are asked of ``pre``, or the step
+        would overwrite its own inputs.
+    """
+    check_tree(step, source, destination, names, compress)
+    if shard_by not in SHARD_STRATEGIES:
+        raise ValueError(f"unknown shard strategy: {shard_by!r}")
+    started = time.perf_counter()
+    files = find_sources(source, step, destination)
+    if shard is not None:
+        sizes = {relative: Path(source, relative).stat().st_size for relative in files} if shard_by == "size" else None
+        files = shard.select(files, sizes)
+    run_one = functools.partial(_build_one, step, str(source), str(destination), compress)
+    cost = functools.partial(file_cost, step, str(source), names)
+    per_file = map_documents(run_one, files, names, executor, backend, max_workers, chunksize, cost)
+    hashes = {relative: digest for relative, (_, digest, _) in zip(files, per_file, strict=True) if digest is not None}
+    result = BuildResult(
+        files=len(hashes),
+        seconds=time.perf_counter() - started,
+        warnings=tuple(warning for warnings, _, _ in per_file for warning in warnings),
+        hashes=hashes,
+        input_bytes=sum(size for _, _, size in per_file),
+    )
+    if shard is not None:
+        manifest = destination / MANIFEST_NAME
+        selection = selection_key(step, [name for name in registry.EXTENSION_NAMES if name in names])
+        entries = {
+            relative: ManifestEntry(hash=digest, selection=selection) for relative, digest in result.hashes.items()
+        }
+        save_manifest(shard.partial(manifest), entries)
+        shard.save_stats(
+            manifest,
+            step,
+            {
+                "files": result.files,
+                "input_bytes": result.input_bytes,
+                "seconds": result.seconds,
+                "warnings": len(result.warnings),
+            },
+        )
+    return result
@@ -1,15 +1,31 @@
 # ABOUTME: Command-line entry point for the mw markwright pipeline tool.
-# Builds the argparse parser and dispatches list/pre/post/render; --version reports the package version.
+# Builds the argparse parser and dispatches each subcommand; --version reports the package version.
 
 from __future__ import annotations
 
 import argparse
+import contextlib
+import dataclasses
+import functools
+import io
+import json
+import os
 import sys
-from importlib.metadata import version
+import time
+from collections.abc import Callable, Sequence
+from pathlib import Path
+from typing import Any, Literal, NoReturn, cast
 
-import markdown
+from markwright import build, registry, render
+from markwright._batch import BATCH_BACKENDS, start_pool
+from markwright._framing import FRAMINGS, iter_documents, write_document
+from markwright._passthrough import Document, pass_through
+from markwright._stats import counting
+from markwright.shard import SHARD_STRATEGIES, Shard
 
-from markwright import registry
+# The steps mw client can ask the daemon to run; mw serve accepts the same ones.
+# Spelled out here so building the parser does not import the socket modules.
+_CLIENT_STEPS = ("pre", "post", "render")
 
 
 def _package_version() -> str:
@@ -17,25 +33,125 @@ def _package_version() -> str:
 
     :returns: The version string for the ``markwright`` distribution.
     """
+    from importlib.metadata import version
+
     return version("markwright")
 
 
+class _VersionAction(argparse.Action):
+    """Print ``mw <version>`` and exit, reading the distribution metadata only when asked."""
+
+    def __init__(self, option_strings: Sequence[str], dest: str, help: str | None = None) -> None:
+        super().__init__(option_strings, dest, nargs=0, default=argparse.SUPPRESS, help=help)
+
+    def __call__(
+        self,
+        parser: argparse.ArgumentParser,
+        namespace: argparse.Namespace,
+        values: str | Sequence[Any] | None,
+        option_string: str | None = None,
+    ) -> NoReturn:
+        print(f"mw {_package_version()}")
+        parser.exit()
+
+
 def build_parser() -> argparse.ArgumentParser:
     """Construct the ``mw`` argument parser with its subcommands.
 
     :returns: A parser exposing ``--version`` and the ``list`` subcommand.
     """
     parser = argparse.ArgumentParser(prog="mw", description="markwright Markdown pipeline CLI.")
-    parser.add_argument("--version", action="version", version=f"mw {_package_version()}")
+    parser.add_argument("--version", action=_VersionAction, help="show program's version number and exit")
     subparsers = parser.add_subparsers(dest="command")
     subparsers.add_parser("list", help="List registered extensions and the stages each provides.")
     pre_parser = subparsers.add_parser("pre", help="Expand markwright source directives read from stdin.")
     _add_selection_flags(pre_parser)
+    _add_report_skips_flag(pre_parser)
+    _add_stats_flag(pre_parser)
+    _add_framing_flag(pre_parser)
+    _add_in_place_flags(pre_parser)
+    _add_shard_flags(pre_parser)
+    _add_tree_flags(pre_parser)
     post_parser = subparsers.add_parser("post", help="Post-process rendered HTML read from stdin.")
     _add_selection_flags(post_parser)
     post_parser.add_argument("--warn", action="store_true", help="Report skipped markers to stderr.")
+    _add_report_skips_flag(post_parser)
+    _add_stats_flag(post_parser)
+    _add_framing_flag(post_parser)
+    _add_in_place_flags(post_parser)
+    _add_shard_flags(post_parser)
+    _add_tree_flags(post_parser)
     render_parser = subparsers.add_parser("render", help="Render Markdown from stdin to final HTML.")
     _add_selection_flags(render_parser)
+    _add_stats_flag(render_parser)
+    _add_framing_flag(render_parser)
+    tree_parser = subparsers.add_parser("build", help="Apply one step to every matching file in a directory tree.")
+    tree_parser.add_argument("step", choices=build.BUILD_STEPS, help="Step to apply: pre, post, or render.")
+    tree_parser.add_argument("source", type=Path, help="Source directory to walk.")
+    tree_parser.add_argument("destination", type=Path, help="Directory to write the outputs to.")
+    _add_selection_flags(tree_parser)
+    tree_parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker count (default: usable CPUs).")
+    tree_parser.add_argument(
+        "--backend", choices=BATCH_BACKENDS, default="auto", help="Worker pool to use (default: auto)."
+    )
+    tree_parser.add_argument("--warn", action="store_true", help="Report skipped markers to stderr (post step).")
+    tree_parser.add_argument(
+        "--compress",
+        action="append",
+        choices=tuple(build.SIDECARS),
+        default=[],
+        help="Also write each page compressed in this format beside it (post and render; repeatable).",
+    )
+    _add_shard_flags(tree_parser)
+    merge_parser = subparsers.add_parser("merge-manifests", help="Combine the partial manifests of a sharded run.")
+    merge_parser.add_argument("output", type=Path, help="Manifest to write.")
+    merge_parser.add_argument("partials", nargs="+", type=Path, metavar="PARTIAL", help="Partial manifests to merge.")
+    watch_parser = subparsers.add_parser("watch", help="Keep an output tree current as its sources change.")
+    watch_parser.add_argument("source", type=Path, help="Source directory to watch.")
+    watch_parser.add_argument("destination", type=Path, help="Directory to write the outputs to.")
+    watch_parser.add_argument(
+        "--stage", choices=build.BUILD_STEPS, default="pre", help="Step to apply: pre, post, or render (default: pre)."
+    )
+    _add_selection_flags(watch_parser)
+    watch_parser.add_argument("--interval", type=float, default=0.5, help="Seconds between scans (default: 0.5).")
+    watch_parser.add_argument(
+        "--debounce", type=float, default=0.2, help="Quiet seconds after an edit before rebuilding (default: 0.2)."
+    )
+    watch_parser.add_argument("--once", action="store_true", help="Bring the outputs up to date once, then exit.")
+    watch_parser.add_argument("--warn", action="store_true", help="Report skipped markers to stderr (post step).")
+    bench_parser = subparsers.add_parser("bench", help="Time every stage and render over a corpus.")
+    bench_parser.add_argument(
+        "--corpus", type=Path, default=None, help="Directory of .md files to use (default: a generated corpus)."
+    )
+    bench_parser.add_argument("--documents", type=int, default=40, help="Pages to generate (default: 40).")
+    bench_parser.add_argument("--seed", type=int, default=0, help="Seed for the generated corpus (default: 0).")
+    bench_parser.add_argument("-n", "--iterations", type=int, default=5, help="Timed passes per stage (default: 5).")
+    bench_parser.add_argument("--warmup", type=int, default=1, help="Untimed passes per stage (default: 1).")
+    _add_selection_flags(bench_parser)
+    bench_parser.add_argument("--json", action="store_true", help="Print the results as JSON instead of a table.")
+    profile_parser = subparsers.add_parser("profile", help="Profile one step on stdin with cProfile and tracemalloc.")
+    profile_parser.add_argument("step", choices=build.BUILD_STEPS, help="Step to profile: pre, post, or render.")
+    _add_selection_flags(profile_parser)
+    profile_parser.add_argument("--top", type=int, default=20, help="Functions and modules to list (default: 20).")
+    profile_parser.add_argument("--repeat", type=int, default=1, help="Profiled runs of the step (default: 1).")
+    profile_parser.add_argument(
+        "--trace-depth", type=int, default=4, help="Frames kept per allocation; deeper is slower (default: 4)."
+    )
+    profile_parser.add_argument("--pstats", type=Path, default=None, help="Also write the call statistics here.")
+    jsonl_parser = subparsers.add_parser("jsonl", help="Answer JSON-lines requests from stdin on a worker pool.")
+    jsonl_parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker count (default: usable CPUs).")
+    jsonl_parser.add_argument(
+        "--backend", choices=BATCH_BACKENDS, default="auto", help="Worker pool to use (default: auto)."
+    )
+    serve_parser = subparsers.add_parser("serve", help="Answer mw client requests over a Unix socket.")
+    _add_socket_flag(serve_parser)
+    serve_parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker threads (default: usable CPUs).")
+    client_parser = subparsers.add_parser("client", help="Run pre, post, or render on stdin through mw serve.")
+    client_parser.add_argument("step", choices=_CLIENT_STEPS, help="Step to run: pre, post, or render.")
+    _add_socket_flag(client_parser)
+    _add_selection_flags(client_parser)
+    client_parser.add_argument("--warn", action="store_true", help="Report skipped markers to stderr (post step).")
+    _add_report_skips_flag(client_parser)
     return parser
 
 
@@ -48,6 +164,167 @@ def _add_selection_flags(subparser: argparse.ArgumentParser) -> None:
     subparser.add_argument("--exclude", action="append", default=[], help="Drop the named extension (repeatable).")
 
 
+def _add_socket_flag(subparser: argparse.ArgumentParser) -> None:
+    """Add the ``--socket`` flag, defaulting to ``$MW_SOCKET``, to a subparser.
+
+    :param subparser: The ``serve`` or ``client`` subcommand parser to extend.
+    """
+    subparser.add_argument(
+        "--socket",
+        default=os.environ.get("MW_SOCKET"),
+        help="Unix socket path of the daemon (default: $MW_SOCKET).",
+    )
+
+
+def _add_report_skips_flag(subparser: argparse.ArgumentParser) -> None:
+    """Add the ``--report-skips`` flag to a stage subparser.
+
+    :param subparser: The ``pre`` or ``post`` subcommand parser to extend.
+    """
+    subparser.add_argument(
+        "--report-skips",
+        action="store_true",
+        help="Report stages the trigger prefilter skipped to stderr.",
+    )
+
+
+def _add_stats_flag(subparser: argparse.ArgumentParser) -> None:
+    """Add the ``--stats`` flag to a filter subparser.
+
+    :param subparser: The ``pre``, ``post``, or ``render`` subcommand parser to extend.
+    """
+    subparser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Report each stage's time, sizes, and match counts to stderr as JSON.",
+    )
+
+
+def _add_framing_flag(subparser: argparse.ArgumentParser) -> None:
+    """Add the ``--framing`` flag to a filter subparser.
+
+    :param subparser: The ``pre``, ``post``, or ``render`` subcommand parser to extend.
+    """
+    subparser.add_argument(
+        "--framing",
+        choices=FRAMINGS,
+        default=None,
+        help="Read a stream of NUL-terminated or length-prefixed documents and answer each in kind.",
+    )
+
+
+def _add_in_place_flags(subparser: argparse.ArgumentParser) -> None:
+    """Add the ``--in-place`` and ``--manifest`` flags to a stage subparser.
+
+    :param subparser: The ``pre`` or ``post`` subcommand parser to extend.
+    """
+    subparser.add_argument(
+        "--in-place",
+        nargs="+",
+        type=Path,
+        default=None,
+        metavar="FILE",
+        help="Rewrite these files instead of filtering stdin, skipping files already current.",
+    )
+    subparser.add_argument(
+        "--manifest",
+        type=Path,
+        default=None,
+        help="Manifest recording each rewritten file's hash (default: .mw-manifest.json here).",
+    )
+
+
+def _add_tree_flags(subparser: argparse.ArgumentParser) -> None:
+    """Add the ``--tree`` flag and its worker pool flags to a stage subparser.
+
+    :param subparser: The ``pre`` or ``post`` subcommand parser to extend.
+    """
+    subparser.add_argument(
+        "--tree",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="Rewrite every matching file under this directory in place, only where the step changes it.",
+    )
+    subparser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="Worker count for --tree (default: usable CPUs)."
+    )
+    subparser.add_argument(
+        "--backend", choices=BATCH_BACKENDS, default=None, help="Worker pool for --tree (default: auto)."
+    )
+
+
+def _shard_spec(spec: str) -> Shard:
+    """Parse a ``--shard`` value, reporting a bad one as a usage error.
+
+    :param spec: The value, such as ``2/8``.
+    :returns: The shard.
+    :raises argparse.ArgumentTypeError: If the value is not ``I/N`` with ``1 <= I <= N``.
+    """
+    try:
+        return Shard.parse(spec)
+    except ValueError as shard_error:
+        raise argparse.ArgumentTypeError(str(shard_error)) from None
+
+
+def _add_shard_flags(subparser: argparse.ArgumentParser) -> None:
+    """Add the ``--shard`` and ``--shard-by`` flags to a multi-file subparser.
+
+    :param subparser: The ``build``, ``pre``, or ``post`` subcommand parser to extend.
+    """
+    subparser.add_argument(
+        "--shard",
+        type=_shard_spec,
+        default=None,
+        metavar="I/N",
+        help="Process only shard I of N, writing a partial manifest and a stats file for it.",
+    )
+    subparser.add_argument(
+        "--shard-by",
+        choices=SHARD_STRATEGIES,
+        default="path",
+        help="Assign files to shards by path hash or balance them by size (default: path).",
+    )
+
+
+def _report_skips(stage: str, names: list[str], skipped: list[str]) -> None:
+    """Print how many selected stages the trigger prefilter skipped.
+
+    :param stage: ``"pre"`` or ``"post"``, naming the stage that ran.
+    :param names: Selected extension names.
+    :param skipped: Names of the stages that were skipped.
+    """
+    print(registry.skip_summary(stage, names, skipped), file=sys.stderr)
+
+
+def _report_stats(
+    step: str,
+    text: str,
+    output: str,
+    seconds: float,
+    stages: list[registry.StageRun],
+    skipped: list[str],
+) -> None:
+    """Print one document's stage statistics to stderr as a line of JSON.
+
+    :param step: ``"pre"``, ``"post"``, or ``"render"``, naming the step that ran.
+    :param text: The document as read.
+    :param output: The document as written.
+    :param seconds: Wall-clock time the whole step took.
+    :param stages: What each stage did.
+    :param skipped: Names of the stages the trigger prefilter skipped.
+    """
+    report = {
+        "step": step,
+        "seconds": seconds,
+        "input_size": len(text),
+        "output_size": len(output),
+        "stages": [dataclasses.asdict(stage) for stage in stages],
+        "skipped": skipped,
+    }
+    print(json.dumps(report), file=sys.stderr)
+
+
 def _run_list() -> int:
     """Print each registered extension and its available stages.
 
@@ -72,58 +349,481 @@ def _resolve_selection(args: argparse.Namespace) -> list[str] | None:
         return None
 
 
+def _untouched(step: Literal["pre", "post"], names: list[str], data: Document) -> bool:
+    """Report whether a raw document would come out of ``step`` byte for byte as it went in.
+
+    Reading stdin as text turns ``\\r\\n`` into ``\\n``, so a document holding a
+    carriage return is transformed even when no stage would touch it.
+
+    :param step: ``"pre"`` or ``"post"``.
+    :param names: Selected extension names.
+    :param data: The encoded document.
+    :returns: ``True`` if the document can be copied through unchanged.
+    """
+    return data.find(b"\r") == -1 and not registry.could_change(data, step, names)
+
+
+def _filter_stdin(
+    args: argparse.Namespace,
+    transform: Callable[[str], str],
+    untouched: Callable[[Document], bool] | None = None,
+) -> None:
+    """Apply ``transform`` to stdin, as one document or as a framed stream of them.
+
+    Without ``--framing``, all of stdin is one document. With it, each framed
+    document is transformed and its output written and flushed in the same
+    framing before the next one is read, so a caller can keep the pipe open and
+    wait for each answer. A document ``untouched`` accepts is copied to stdout
+    as raw bytes without being decoded or transformed. Every other document is
+    decoded as ``sys.stdin`` would decode it, newline translation included; one
+    that cannot be decoded is reported to stderr and answered with its bytes
+    unchanged, and the stream goes on.
+
+    :param args: Parsed arguments carrying ``framing``.
+    :param transform: Per-document transform, which also reports its diagnostics.
+    :param untouched: Reports whether a raw document needs no work, or ``None``
+        to transform every document.
+    """
+    if args.framing is None:
+        if untouched is None:
+            sys.stdout.write(transform(sys.stdin.read()))
+            return
+        data = pass_through(sys.stdin.buffer, sys.stdout.buffer, untouched)
+        if data is not None:
+            sys.stdout.write(transform(_decode_stdin(data)))
+        return
+    stdin = cast(io.BufferedIOBase, sys.stdin.buffer)
+    stdout = sys.stdout.buffer
+    for number, document in enumerate(iter_documents(stdin, args.framing), start=1):
+        if untouched is not None and untouched(document):
+            write_document(stdout, document, args.framing)
+        else:
+            try:
+                text = _decode_stdin(document)
+            except UnicodeDecodeError as decode_error:
+                print(f"mw {args.command}: document {number} left unchanged: {decode_error}", file=sys.stderr)
+                write_document(stdout, document, args.framing)
+            else:
+                write_document(
+                    stdout, transform(text).encode(sys.stdout.encoding, sys.stdout.errors or "strict"), args.framing
+                )
+        stdout.flush()
+
+
+def _decode_stdin(data: bytes) -> str:
+    """Decode bytes read from stdin's buffer as ``sys.stdin`` would have.
+
+    :param data: Raw bytes from ``sys.stdin.buffer``.
+    :returns: The text, with stdin's encoding, error handler, and newline translation applied.
+    :raises UnicodeDecodeError: If ``data`` does not decode under stdin's error handler.
+    """
+    return io.TextIOWrapper(io.BytesIO(data), encoding=sys.stdin.encoding, errors=sys.stdin.errors).read()
+
+
+def _pass_through_check(
+    args: argparse.Namespace, step: Literal["pre", "post"], names: list[str]
+) -> Callable[[Document], bool] | None:
+    """Choose the pass-through check for a filter run.
+
+    :param args: Parsed arguments carrying ``report_skips`` and ``stats``.
+    :param step: ``"pre"`` or ``"post"``.
+    :param names: Selected extension names.
+    :returns: The check, or ``None`` when a report is asked for, since every
+        document then has to run through the pipeline to be described.
+    """
+    if args.report_skips or args.stats:
+        return None
+    return functools.partial(_untouched, step, names)
+
+
 def _run_pre(args: argparse.Namespace) -> int:
     """Expand source directives from stdin and write the result to stdout.
 
-    :param args: Parsed arguments carrying ``use`` and ``exclude``.
+    :param args: Parsed arguments carrying ``use``, ``exclude``, ``report_skips``, ``stats``, and ``framing``.
     :returns: ``0`` on success, ``2`` if a selected extension name is unknown.
     """
     names = _resolve_selection(args)
     if names is None:
         return 2
-    sys.stdout.write(registry.run_pre(sys.stdin.read(), names))
+    if any(
+        value is not None for value in (args.in_place, args.tree, args.manifest, args.shard, args.jobs, args.backend)
+    ):
+        return _run_in_place("pre", args, names)
+
+    def pre(text: str) -> str:
+        skipped: list[str] = []
+        stats: list[registry.StageRun] | None = [] if args.stats else None
+        started = time.perf_counter()
+        expanded = registry.run_pre(text, names, skipped, stats)
+        if args.report_skips:
+            _report_skips("pre", names, skipped)
+        if stats is not None:
+            _report_stats("pre", text, expanded, time.perf_counter() - started, stats, skipped)
+        return expanded
+
+    _filter_stdin(args, pre, _pass_through_check(args, "pre", names))
     return 0
 
 
 def _run_post(args: argparse.Namespace) -> int:
     """Post-process HTML from stdin and write the result to stdout.
 
-    :param args: Parsed arguments carrying ``use``, ``exclude``, and ``warn``.
+    :param args: Parsed arguments carrying ``use``, ``exclude``, ``warn``, ``report_skips``, ``stats``,
+        and ``framing``.
     :returns: ``0`` on success, ``2`` if a selected extension name is unknown.
     """
     names = _resolve_selection(args)
     if names is None:
         return 2
-    warnings: list[str] | None = [] if args.warn else None
-    rendered_html = registry.run_post(sys.stdin.read(), names, warnings)
-    sys.stdout.write(rendered_html)
-    if warnings is not None:
-        for warning in warnings:
+    if any(
+        value is not None for value in (args.in_place, args.tree, args.manifest, args.shard, args.jobs, args.backend)
+    ):
+        return _run_in_place("post", args, names)
+
+    def post(text: str) -> str:
+        warnings: list[str] | None = [] if args.warn else None
+        skipped: list[str] = []
+        stats: list[registry.StageRun] | None = [] if args.stats else None
+        started = time.perf_counter()
+        rendered_html = registry.run_post(text, names, warnings, skipped, stats)
+        if warnings is not None:
+            for warning in warnings:
+                print(warning, file=sys.stderr)
+        if args.report_skips:
+            _report_skips("post", names, skipped)
+        if stats is not None:
+            _report_stats("post", text, rendered_html, time.perf_counter() - started, stats, skipped)
+        return rendered_html
+
+    _filter_stdin(args, post, _pass_through_check(args, "post", names))
+    return 0
+
+
+def _run_in_place(step: Literal["pre", "post"], args: argparse.Namespace, names: list[str]) -> int:
+    """Rewrite files or a tree in place with one step and print a summary.
+
+    :param step: ``"pre"`` or ``"post"``.
+    :param args: Parsed arguments carrying ``in_place``, ``tree``, ``manifest``,
+        ``shard``, ``shard_by``, ``jobs``, ``backend``, ``report_skips``,
+        ``stats``, ``framing``, and for ``post`` also ``warn``.
+    :param names: Selected extension names.
+    :returns: ``0`` on success, ``2`` if ``--tree`` comes with ``--in-place``,
+        ``--manifest`` or ``--shard`` comes without ``--in-place``, ``-j`` or
+        ``--backend`` comes without ``--tree``, a stdin-only flag comes with
+        either mode, or a named file or directory does not exist.
+    """
+    from markwright import inplace
+
+    mode = "--in-place" if args.tree is None else "--tree"
+    if args.tree is not None and args.in_place is not None:
+        print(f"mw {step}: --tree and --in-place cannot be combined", file=sys.stderr)
+        return 2
+    if args.in_place is None and (args.manifest is not None or args.shard is not None):
+        print(f"mw {step}: --manifest and --shard need --in-place", file=sys.stderr)
+        return 2
+    if args.tree is None and (args.jobs is not None or args.backend is not None):
+        print(f"mw {step}: -j and --backend need --tree", file=sys.stderr)
+        return 2
+    if args.framing is not None or args.stats or args.report_skips:
+        print(f"mw {step}: {mode} cannot be combined with --framing, --stats, or --report-skips", file=sys.stderr)
+        return 2
+    if args.tree is not None:
+        if not args.tree.is_dir():
+            print(f"mw {step}: not a directory: {args.tree}", file=sys.stderr)
+            return 2
+        result = inplace.rewrite_tree(step, args.tree, names, backend=args.backend or "auto", max_workers=args.jobs)
+        summary = f"{len(result.rewritten)} rewritten, {len(result.unchanged)} unchanged"
+    else:
+        missing = next((path for path in args.in_place if not path.is_file()), None)
+        if missing is not None:
+            print(f"mw {step}: not a file: {missing}", file=sys.stderr)
+            return 2
+        result = inplace.rewrite_in_place(
+            step, args.in_place, names, manifest=args.manifest, shard=args.shard, shard_by=args.shard_by
+        )
+        summary = f"{len(result.rewritten)} rewritten, {len(result.unchanged)} unchanged, {len(result.current)} current"
+    # pre has no --warn, and its only warnings are files it could not decode.
+    if step == "pre" or args.warn:
+        for warning in result.warnings:
             print(warning, file=sys.stderr)
+    print(f"mw {step} {mode}: {summary} in {result.seconds:.2f}s{_shard_note(args.shard)}")
     return 0
 
 
 def _run_render(args: argparse.Namespace) -> int:
     """Render Markdown from stdin to final HTML using the in-process stack.
 
-    Builds a ``markdown.Markdown`` instance configured with ``pymdownx.superfences``
+    Uses a ``markdown.Markdown`` instance configured with ``pymdownx.superfences``
     and ``pymdownx.highlight`` plus the selected ``markwright.*`` extensions, mirroring
-    the site stack so fence and highlight render correctly.
+    the site stack so fence and highlight render correctly (see :mod:`markwright.render`).
 
-    :param args: Parsed arguments carrying ``use`` and ``exclude``.
+    With ``--stats`` the whole render is reported as one stage, since the
+    extensions run inside Python-Markdown rather than one after another; its
+    counts still cover every marker, region, embed, and script they handled.
+
+    :param args: Parsed arguments carrying ``use``, ``exclude``, ``stats``, and ``framing``.
     :returns: ``0`` on success, ``2`` if a selected extension name is unknown.
     """
     names = _resolve_selection(args)
     if names is None:
         return 2
-    instance = markdown.Markdown(
-        extensions=["pymdownx.superfences", "pymdownx.highlight", *(f"markwright.{name}" for name in names)],
-        extension_configs={"pymdownx.highlight": {"pygments_lang_class": True}},
+
+    def render_document(text: str) -> str:
+        if not args.stats:
+            return render.render(text, names)
+        with counting() as counts:
+            started = time.perf_counter()
+            rendered_html = render.render(text, names)
+            seconds = time.perf_counter() - started
+        stage = registry.StageRun("render", seconds, len(text), len(rendered_html), dict(counts))
+        _report_stats("render", text, rendered_html, seconds, [stage], [])
+        return rendered_html
+
+    _filter_stdin(args, render_document)
+    return 0
+
+
+def _run_build(args: argparse.Namespace) -> int:
+    """Apply a step to a directory tree and print a throughput summary.
+
+    :param args: Parsed arguments carrying ``step``, ``source``, ``destination``,
+        ``use``, ``exclude``, ``jobs``, ``backend``, ``warn``, ``compress``,
+        ``shard``, and ``shard_by``.
+    :returns: ``0`` on success, ``2`` on an unknown name, a missing source
+        directory, a destination that would overwrite the inputs, or sidecars
+        asked of the pre step.
+    """
+    names = _resolve_selection(args)
+    if names is None:
+        return 2
+    if not args.source.is_dir():
+        print(f"mw build: not a directory: {args.source}", file=sys.stderr)
+        return 2
+    try:
+        result = build.build_tree(
+            args.step,
+            args.source,
+            args.destination,
+            names,
+            backend=args.backend,
+            max_workers=args.jobs,
+            compress=tuple(dict.fromkeys(args.compress)),
+            shard=args.shard,
+            shard_by=args.shard_by,
+        )
+    except ValueError as build_error:
+        print(build_error, file=sys.stderr)
+        return 2
+    if args.warn:
+        for warning in result.warnings:
+            print(warning, file=sys.stderr)
+    print(
+        f"mw build {args.step}: {result.files} files in {result.seconds:.2f}s ({result.files_per_second:.0f} files/s)"
+        f"{_shard_note(args.shard)}"
     )
-    sys.stdout.write(instance.convert(sys.stdin.read()))
     return 0
 
 
+def _shard_note(shard: Shard | None) -> str:
+    """Name the shard a summary line covers.
+
+    :param shard: The shard that ran, or ``None`` for a whole run.
+    :returns: A suffix such as ``" [shard 2/8]"``, or an empty string.
+    """
+    return "" if shard is None else f" [shard {shard}]"
+
+
+def _run_merge_manifests(args: argparse.Namespace) -> int:
+    """Merge the partial manifests of a sharded run and print a summary.
+
+    :param args: Parsed arguments carrying ``output`` and ``partials``.
+    :returns: ``0`` on success, ``2`` if a partial manifest is missing, is not a
+        manifest of this markwright version, or disagrees with another about a file.
+    """
+    from markwright import manifest
+
+    missing = next((path for path in args.partials if not path.is_file()), None)
+    if missing is not None:
+        print(f"mw merge-manifests: not a file: {missing}", file=sys.stderr)
+        return 2
+    try:
+        entries = manifest.merge_manifests(args.partials)
+    except ValueError as merge_error:
+        print(f"mw merge-manifests: {merge_error}", file=sys.stderr)
+        return 2
+    manifest.save_manifest(args.output, entries)
+    print(f"mw merge-manifests: {len(entries)} files from {len(args.partials)} manifests")
+    return 0
+
+
+def _run_watch(args: argparse.Namespace) -> int:
+    """Rebuild changed files in a tree, once or until interrupted.
+
+    :param args: Parsed arguments carrying ``source``, ``destination``,
+        ``stage``, ``use``, ``exclude``, ``interval``, ``debounce``, ``once``,
+        and ``warn``.
+    :returns: ``0`` on success or interrupt, ``2`` on an unknown name, a missing
+        source directory, or a destination that would overwrite the inputs.
+    """
+    from markwright import watch
+
+    names = _resolve_selection(args)
+    if names is None:
+        return 2
+    if not args.source.is_dir():
+        print(f"mw watch: not a directory: {args.source}", file=sys.stderr)
+        return 2
+    try:
+        watcher = watch.Watcher(args.stage, args.source, args.destination, names)
+    except ValueError as watch_error:
+        print(watch_error, file=sys.stderr)
+        return 2
+
+    def report(result: watch.SyncResult) -> None:
+        if args.warn:
+            for warning in result.warnings:
+                print(warning, file=sys.stderr)
+        if result.rebuilt or result.removed:
+            print(
+                f"mw watch {args.stage}: {len(result.rebuilt)} rebuilt, {len(result.removed)} removed"
+                f" in {result.seconds:.2f}s",
+                flush=True,
+            )
+
+    if args.once:
+        report(watcher.sync())
+        return 0
+    print(f"mw watch: watching {args.source}", file=sys.stderr)
+    with contextlib.suppress(KeyboardInterrupt):
+        watcher.run(report, interval=args.interval, debounce=args.debounce)
+    return 0
+
+
+def _run_bench(args: argparse.Namespace) -> int:
+    """Benchmark the selected stages and print a table or JSON.
+
+    :param args: Parsed arguments carrying ``corpus``, ``documents``, ``seed``,
+        ``iterations``, ``warmup``, ``use``, ``exclude``, and ``json``.
+    :returns: ``0`` on success, ``2`` on an unknown name, a missing or empty
+        corpus, or an iteration count below one.
+    """
+    from markwright import bench
+
+    names = _resolve_selection(args)
+    if names is None:
+        return 2
+    if args.corpus is not None and not args.corpus.is_dir():
+        print(f"mw bench: not a directory: {args.corpus}", file=sys.stderr)
+        return 2
+    corpus = bench.load_corpus(args.corpus) if args.corpus else bench.generate_corpus(args.documents, args.seed)
+    try:
+        stats = bench.run_bench(corpus, names, args.iterations, args.warmup)
+    except ValueError as bench_error:
+        print(f"mw bench: {bench_error}", file=sys.stderr)
+        return 2
+    if args.json:
+        print(json.dumps(bench.report_json(stats, args.warmup), indent=2))
+        return 0
+    size = sum(len(document.encode()) for document in corpus)
+    print(f"{len(corpus)} documents, {size / 1024:.0f} KiB, {args.iterations} passes after {args.warmup} warmup")
+    print(bench.format_table(stats))
+    return 0
+
+
+def _run_profile(args: argparse.Namespace) -> int:
+    """Profile one step on the stdin document and print the report.
+
+    :param args: Parsed arguments carrying ``step``, ``use``, ``exclude``,
+        ``top``, ``repeat``, ``trace_depth``, and ``pstats``.
+    :returns: ``0`` on success, ``2`` on an unknown name or a count below one.
+    """
+    from markwright import profiling
+
+    names = _resolve_selection(args)
+    if names is None:
+        return 2
+    try:
+        report = profiling.profile_step(args.step, sys.stdin.read(), names, args.repeat, args.trace_depth)
+    except ValueError as profile_error:
+        print(f"mw profile: {profile_error}", file=sys.stderr)
+        return 2
+    if args.pstats is not None:
+        report.stats.dump_stats(args.pstats)
+    print(profiling.format_report(report, args.top))
+    return 0
+
+
+def _run_jsonl(args: argparse.Namespace) -> int:
+    """Answer JSON-lines requests from stdin, writing each answer as its worker finishes.
+
+    One worker answers in-process and in input order; more run on a pool, with
+    up to four requests per worker in flight.
+
+    :param args: Parsed arguments carrying ``jobs`` and ``backend``.
+    :returns: Always ``0``; a request that fails is answered with an error object.
+    """
+
+    def write(answer: str) -> None:
+        sys.stdout.write(answer + "\n")
+        sys.stdout.flush()
+
+    from markwright import jsonl
+
+    worker_count = args.jobs or os.process_cpu_count() or 1
+    if worker_count == 1:
+        jsonl.run_stream(sys.stdin, write)
+        return 0
+    with start_pool(args.backend, worker_count) as pool:
+        jsonl.run_stream(sys.stdin, write, pool, window=worker_count * 4)
+    return 0
+
+
+def _run_serve(args: argparse.Namespace) -> int:
+    """Run the daemon until interrupted.
+
+    :param args: Parsed arguments carrying ``socket`` and ``jobs``.
+    :returns: ``0`` after an interrupt, ``1`` if the socket cannot be bound, ``2``
+        if no socket path was given.
+    """
+    if args.socket is None:
+        print("mw serve: pass --socket or set MW_SOCKET", file=sys.stderr)
+        return 2
+    from markwright import serve
+
+    try:
+        server = serve.Server(args.socket, args.jobs)
+    except OSError as bind_error:
+        print(f"mw serve: {bind_error}", file=sys.stderr)
+        return 1
+    print(f"mw serve: listening on {args.socket}", file=sys.stderr)
+    with server, contextlib.suppress(KeyboardInterrupt):
+        server.serve_forever()
+    return 0
+
+
+def _run_client(args: argparse.Namespace) -> int:
+    """Forward stdin to the daemon and relay its answer, like the matching filter.
+
+    :param args: Parsed arguments carrying ``step``, ``socket``, ``use``,
+        ``exclude``, ``warn``, and ``report_skips``.
+    :returns: The daemon's exit code, ``1`` if it cannot be reached, or ``2`` if
+        no socket path was given.
+    """
+    if args.socket is None:
+        print("mw client: pass --socket or set MW_SOCKET", file=sys.stderr)
+        return 2
+    header: dict[str, object] = {
+        "step": args.step,
+        "use": args.use,
+        "exclude": args.exclude,
+        "warn": args.warn,
+        "report_skips": args.report_skips,
+    }
+    from markwright import client
+
+    return client.run(args.socket, header)
+
+
 def main(argv: list[str] | None = None) -> int:
     """Parse ``argv`` and dispatch to the selected subcommand.
 
@@ -143,5 +843,21 @@ def main(argv: list[str] | None = None) -> int:
         return _run_post(args)
     if args.command == "render":
         return _run_render(args)
+    if args.command == "build":
+        return _run_build(args)
+    if args.command == "merge-manifests":
+        return _run_merge_manifests(args)
+    if args.command == "watch":
+        return _run_watch(args)
+    if args.command == "bench":
+        return _run_bench(args)
+    if args.command == "profile":
+        return _run_profile(args)
+    if args.command == "jsonl":
+        return _run_jsonl(args)
+    if args.command == "serve":
+        return _run_serve(args)
+    if args.command == "client":
+        return _run_client(args)
     parser.print_usage()
     return 2
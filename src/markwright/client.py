@@ -0,0 +1,48 @@
+# ABOUTME: The mw client shim: forwards one stdin document to a running mw serve daemon.
+# Behaves like the mw pre/post/render filters, writing the daemon's output, stderr, and exit code.
+
+from __future__ import annotations
+
+import socket
+import sys
+
+from markwright._framing import read_message, write_message
+
+
+def request(path: str, header: dict[str, object], text: str) -> tuple[int, str, str]:
+    """Send one document to the daemon and wait for its answer.
+
+    :param path: Socket path the daemon listens on.
+    :param header: Request header: ``step``, ``use``, ``exclude``, ``warn``, ``report_skips``.
+    :param text: The document.
+    :returns: ``(exit_code, output, stderr)`` as the daemon reports them.
+    :raises OSError: If the daemon cannot be reached.
+    :raises ValueError: If the daemon hangs up or answers with a malformed message.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        with connection.makefile("rwb") as stream:
+            write_message(stream, header, text)
+            stream.flush()
+            reply = read_message(stream)
+    if reply is None:
+        raise ValueError("mw serve closed the connection without answering")
+    status, output = reply
+    return int(status["exit"]), output, str(status["stderr"])
+
+
+def run(path: str, header: dict[str, object]) -> int:
+    """Forward stdin to the daemon, then write its output to stdout and its report to stderr.
+
+    :param path: Socket path the daemon listens on.
+    :param header: Request header; see :func:`request`.
+    :returns: The daemon's exit code, or ``1`` if it could not be reached.
+    """
+    try:
+        exit_code, output, errors = request(path, header, sys.stdin.read())
+    except (OSError, ValueError) as connection_error:
+        print(f"mw client: cannot use mw serve at {path}: {connection_error}", file=sys.stderr)
+        return 1
+    sys.stdout.write(output)
+    sys.stderr.write(errors)
+    return exit_code
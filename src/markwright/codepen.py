@@ -6,15 +6,24 @@ from __future__ import annotations
 import html
 import re
 import urllib.parse
+from typing import TYPE_CHECKING
 
-from markdown import Markdown
-from markdown.extensions import Extension
-from markdown.postprocessors import Postprocessor
-from markdown.preprocessors import Preprocessor
+from markwright._embed import expand_embed_source
+from markwright._extensions import markdown_attributes
+from markwright._scan import LiteralIndex
+from markwright._stats import count
+from markwright._util import Edit
+
+# Static types for the classes __getattr__ forwards below; at run time they still load on first access.
+if TYPE_CHECKING:
+    from markwright._extensions.codepen import CodePenExtension as CodePenExtension
+    from markwright._extensions.codepen import CodePenPostprocessor as CodePenPostprocessor
+    from markwright._extensions.codepen import CodePenPreprocessor as CodePenPreprocessor
+    from markwright._extensions.codepen import makeExtension as makeExtension
 
 CODEPEN_RE = re.compile(r"^\[codepen\s+(\S+)\s+(\S+)((?:\s+(?:lazy|light|dark|editable|html|css|js|result|\d+))*)\]$")
 
-TAB_PRIORITY = ["html", "css", "js"]
+TAB_PRIORITY = ("html", "css", "js")
 
 DEFAULT_HEIGHT = 256
 
@@ -122,9 +131,9 @@ def expand_source(text: str) -> str:
     HTML inline without any Python-Markdown stash placeholder.
 
     :param text: The source text.
-    :returns: The text with standalone CodePen embeds replaced by HTML.
+    :returns: The text with standalone CodePen embeds outside code replaced by HTML.
     """
-    return "\n".join(_render_match(line) or line for line in text.split("\n"))
+    return expand_embed_source(text, {"codepen": _render_match})
 
 
 def apply_html(rendered_html: str, warnings: list[str] | None = None) -> str:
@@ -139,68 +148,29 @@ def apply_html(rendered_html: str, warnings: list[str] | None = None) -> str:
     :returns: HTML with the CodePen script appended if needed.
     """
     if CODEPEN_SIGNATURE in rendered_html and CODEPEN_SCRIPT not in rendered_html:
+        count("scripts_injected")
         return rendered_html + "\n" + CODEPEN_SCRIPT
     return rendered_html
 
 
-class CodePenPreprocessor(Preprocessor):
-    """Replace [codepen ...] lines with CodePen embed HTML.
-
-    :param md: The Markdown instance.
-    """
-
-    def run(self, lines: list[str]) -> list[str]:
-        """Process lines, replacing CodePen embed syntax with HTML.
-
-        :param lines: Source lines to process.
-        :returns: Modified lines with CodePen embeds replaced by HTML.
-        """
-        output: list[str] = []
-        for line in lines:
-            embed_html = _render_match(line)
-            if embed_html is not None:
-                output.append(self.md.htmlStash.store(embed_html))
-            else:
-                output.append(line)
-        return output
-
-
-class CodePenPostprocessor(Postprocessor):
-    """Append the CodePen embed script tag once if any embeds are present.
-
-    :param md: The Markdown instance.
-    """
-
-    def run(self, text: str) -> str:
-        """Append the script tag if a CodePen embed signature is present.
+def script_edits(rendered_html: str, index: LiteralIndex, warnings: list[str] | None = None) -> list[Edit]:
+    """Compute the script injection of :func:`apply_html` from a literal index.
 
-        :param text: Rendered HTML content.
-        :returns: HTML with CodePen script appended if needed.
-        """
-        return apply_html(text)
+    The form the registry pipeline calls: the index already records whether the
+    CodePen class signature and the script occur, so the HTML is not searched.
 
-
-class CodePenExtension(Extension):
-    """Python-Markdown extension for CodePen embeds.
-
-    :param \\*\\*kwargs: Configuration options passed to the extension.
+    :param rendered_html: Rendered HTML content.
+    :param index: An index of ``rendered_html`` holding ``CODEPEN_SIGNATURE`` and ``CODEPEN_SCRIPT``.
+    :param warnings: Optional warnings list; unused (signature injection never warns).
+    :returns: One edit appending the script if needed, else no edits.
     """
+    if index.hits[CODEPEN_SIGNATURE] and not index.hits[CODEPEN_SCRIPT]:
+        count("scripts_injected")
+        return [(len(rendered_html), 0, "\n" + CODEPEN_SCRIPT)]
+    return []
 
-    def extendMarkdown(self, md: Markdown) -> None:
-        """Register the CodePen preprocessor and postprocessor.
-
-        :param md: The Markdown instance to extend.
-        """
-        preprocessor = CodePenPreprocessor(md)
-        postprocessor = CodePenPostprocessor(md)
-        md.preprocessors.register(preprocessor, "do-codepen", 20)
-        md.postprocessors.register(postprocessor, "do-codepen-script", 15)
 
-
-def makeExtension(**kwargs: object) -> CodePenExtension:
-    """Create and return the CodePenExtension instance.
-
-    :param \\*\\*kwargs: Configuration options.
-    :returns: A configured CodePenExtension.
-    """
-    return CodePenExtension(**kwargs)
+# The Python-Markdown classes live in markwright._extensions.codepen and load on first access.
+__getattr__ = markdown_attributes(
+    __name__, ("CodePenPreprocessor", "CodePenPostprocessor", "CodePenExtension", "makeExtension")
+)
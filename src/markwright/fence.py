@@ -1,5 +1,5 @@
 # ABOUTME: Fence extension adding labels, environments, and line prefixes to code blocks.
-# Coordinates a Preprocessor and Postprocessor and exposes the mw-fence stage functions.
+# Holds the mw-fence stage functions; the Python-Markdown processors load lazily from markwright._extensions.
 
 # Fence directives travel from the pre stage to the post stage as an HTML comment
 # placed immediately before the fence: ``<!-- mw-fence:{JSON} -->``. This comment is
@@ -21,24 +21,35 @@
 
 from __future__ import annotations
 
+import bisect
 import html
 import json
 import re
-
-from markdown import Markdown
-from markdown.extensions import Extension
-from markdown.postprocessors import Postprocessor
-from markdown.preprocessors import Preprocessor
+from collections.abc import Callable, Mapping
+from typing import TYPE_CHECKING
+
+from markwright._extensions import markdown_attributes
+from markwright._scan import LiteralIndex
+from markwright._segment import FENCE, FENCE_RE, OPEN_FENCE, Segment
+from markwright._stats import count
+from markwright._util import Edit, apply_edits
+
+# Static types for the classes __getattr__ forwards below; at run time they still load on first access.
+if TYPE_CHECKING:
+    from markwright._extensions.fence import FenceExtension as FenceExtension
+    from markwright._extensions.fence import FencePostprocessor as FencePostprocessor
+    from markwright._extensions.fence import FencePreprocessor as FencePreprocessor
+    from markwright._extensions.fence import makeExtension as makeExtension
 
 MARKER_NAME = "mw-fence"
 MARKER_VERSION = 1
 DEFAULT_LABEL_CLASS = "code-label"
 DEFAULT_SECONDARY_LABEL_CLASS = "secondary-code-label"
 
-FENCE_RE = re.compile(r"^(`{3,}|~{3,})")
 LABEL_RE = re.compile(r"^\[label (.+)\]$")
 SECONDARY_LABEL_RE = re.compile(r"^\[secondary_label (.+)\]$")
 ENVIRONMENT_RE = re.compile(r"^\[environment (.+)\]$")
+MARKER_PREFIX = f"<!-- {MARKER_NAME}:"
 COMMENT_RE = re.compile(rf"<!-- {MARKER_NAME}:(.*?) -->")
 CUSTOM_PREFIX_RE = re.compile(r"^custom_prefix\((.+)\)$")
 
@@ -230,6 +241,7 @@ def _expand_lines(lines: list[str], allowed_environments: list[str] | None) -> l
             payload: dict[str, object] = {"version": MARKER_VERSION}
             payload.update(metadata)
             output.append(f"<!-- {MARKER_NAME}:{json.dumps(payload)} -->")
+            count("markers_written")
 
         output.append(fence_line)
         output.extend(content_lines)
@@ -245,6 +257,37 @@ def _expand_lines(lines: list[str], allowed_environments: list[str] | None) -> l
     return output
 
 
+def _expand_segments(segments: list[Segment], allowed_environments: list[str] | None) -> list[Segment]:
+    """Run :func:`_expand_lines` over the fence segments of a segmented document.
+
+    Lines outside fences never change, so processing each fence on its own gives
+    the same result as a pass over the whole source. A fence that never closes
+    holds the rest of the document as its content, so no segment after an
+    ``open_fence`` segment is expanded.
+
+    :param segments: Segments from :func:`~markwright._segment.segment_source`.
+    :param allowed_environments: Allowed environment names; an empty list or ``None`` allows all.
+    :returns: The segments with each fence's directives replaced by its marker comment.
+    """
+    expanded: list[Segment] = []
+    for index, segment in enumerate(segments):
+        if segment.kind in (FENCE, OPEN_FENCE):
+            segment = Segment(segment.kind, "\n".join(_expand_lines(segment.text.split("\n"), allowed_environments)))
+        expanded.append(segment)
+        if segment.kind == OPEN_FENCE:
+            return expanded + segments[index + 1 :]
+    return expanded
+
+
+def expand_segments(segments: list[Segment]) -> list[Segment]:
+    """Segment-level form of :func:`expand_source` used by the registry pipeline.
+
+    :param segments: Segments from :func:`~markwright._segment.segment_source`.
+    :returns: The segments with fence directives replaced by mw-fence marker comments.
+    """
+    return _expand_segments(segments, None)
+
+
 def expand_source(text: str) -> str:
     """Extract fence directives and emit mw-fence marker comments in raw source.
 
@@ -257,70 +300,115 @@ def expand_source(text: str) -> str:
     return "\n".join(_expand_lines(text.split("\n"), None))
 
 
-class FencePreprocessor(Preprocessor):
-    """Extract directives and prefix flags from fenced code blocks.
+CODE_TAG_RE = re.compile(r"<code[^>]*>")
+CODE_CLOSE_RE = re.compile(r"</code>")
+PRE_TAG_RE = re.compile(r"<pre[^>]*>")
+
+
+def _classed_pre_tag(pre_tag: str, css_classes: str) -> str:
+    """Add CSS classes to a ``<pre>`` opening tag.
 
-    :param md: The Markdown instance.
-    :param extension: The parent FenceExtension instance.
+    :param pre_tag: The ``<pre ...>`` opening tag.
+    :param css_classes: Space-separated CSS class string to add.
+    :returns: The tag with ``css_classes`` prepended to its class attribute.
     """
+    if 'class="' in pre_tag:
+        return pre_tag.replace('class="', f'class="{css_classes} ')
+    return pre_tag.replace("<pre", f'<pre class="{css_classes}"')
 
-    def __init__(self, md: Markdown, extension: FenceExtension) -> None:
-        super().__init__(md)
-        self.extension = extension
 
-    def run(self, lines: list[str]) -> list[str]:
-        """Process lines, extracting fence directives and injecting metadata comments.
+def _search_outside(
+    pattern: re.Pattern[str],
+    text: str,
+    position: int,
+    comment_starts: list[int],
+    comment_ends: list[int],
+) -> re.Match[str] | None:
+    """Search for ``pattern`` from ``position``, ignoring matches inside marker comments.
 
-        :param lines: Source lines to process.
-        :returns: Modified lines with directives replaced by metadata comments.
-        """
-        return _expand_lines(lines, self.extension.getConfig("allowed_environments"))
+    Marker comments are removed or replaced by label HTML, so a tag spelled inside a
+    marker's JSON payload (a label such as ``<pre>``) is never a real code block.
 
+    :param pattern: The tag pattern to search for.
+    :param text: The full HTML string.
+    :param position: Offset to start searching from.
+    :param comment_starts: Sorted start offsets of every marker comment.
+    :param comment_ends: End offsets of the same comments.
+    :returns: The first match outside every marker comment, or ``None``.
+    """
+    while (found := pattern.search(text, position)) is not None:
+        comment_index = bisect.bisect_right(comment_starts, found.start()) - 1
+        if comment_index < 0 or found.start() >= comment_ends[comment_index]:
+            return found
+        position = comment_ends[comment_index]
+    return None
 
-CODE_TAG_RE = re.compile(r"<code[^>]*>")
-CODE_CLOSE_RE = re.compile(r"</code>")
-PRE_TAG_RE = re.compile(r"<pre[^>]*>")
 
+def _comments_at(text: str, offsets: list[int]) -> list[re.Match[str]]:
+    """Match marker comments at the indexed offsets of :data:`MARKER_PREFIX`.
 
-def _add_pre_classes(text: str, search_start: int, css_classes: str) -> str:
-    """Add CSS classes to the <pre> tag nearest after search_start.
+    Gives the same matches as ``COMMENT_RE.finditer(text)`` without searching the
+    text: an offset inside an earlier comment's payload is not a comment of its own.
 
     :param text: The full HTML string.
-    :param search_start: Position to start searching from.
-    :param css_classes: Space-separated CSS class string to add.
-    :returns: Modified HTML with classes added to <pre>.
+    :param offsets: Ascending offsets of every :data:`MARKER_PREFIX` occurrence.
+    :returns: The comment matches in document order.
     """
-    pre_match = PRE_TAG_RE.search(text, search_start)
-    if pre_match:
-        pre_tag = pre_match.group(0)
-        if 'class="' in pre_tag:
-            new_pre_tag = pre_tag.replace('class="', f'class="{css_classes} ')
-        else:
-            new_pre_tag = pre_tag.replace("<pre", f'<pre class="{css_classes}"')
-        text = text[: pre_match.start()] + new_pre_tag + text[pre_match.end() :]
-    return text
+    comments: list[re.Match[str]] = []
+    previous_end = 0
+    for offset in offsets:
+        if offset < previous_end:
+            continue
+        comment_match = COMMENT_RE.match(text, offset)
+        if comment_match is not None:
+            comments.append(comment_match)
+            previous_end = comment_match.end()
+    return comments
 
 
-def _apply_marker(
+def _marker_edits(
     rendered_html: str,
     warnings: list[str] | None,
     label_class: str,
     secondary_label_class: str,
-) -> str:
-    """Style code blocks from their mw-fence marker comments, validating each marker.
+    index: LiteralIndex | None = None,
+) -> list[Edit]:
+    """Compute the edits that style code blocks from their mw-fence marker comments.
 
     A marker is skipped (and optionally warned about) when its JSON is malformed,
     its version is unsupported, or no code block follows it. The recognized marker
     comment is always removed from the output.
 
+    Every edit is an ``(offset, length, replacement)`` splice against
+    ``rendered_html`` itself, so the caller materializes the output once no matter
+    how many markers the page holds. Markers are visited last to first, and two
+    markers that resolve to the same ``<pre>`` tag or ``<code>`` block share one
+    edit: classes accumulate on the tag, the later marker's line prefixes win, and
+    secondary labels stack in document order.
+
     :param rendered_html: Rendered HTML containing mw-fence marker comments.
     :param warnings: Optional list to collect skip reasons; ``None`` suppresses warnings.
     :param label_class: CSS class for the label div.
     :param secondary_label_class: CSS class for the secondary label div.
-    :returns: HTML with label divs, environment classes, and line prefixes injected.
+    :param index: An index of ``rendered_html`` holding :data:`MARKER_PREFIX`, or
+        ``None`` to build one.
+    :returns: Non-overlapping edits against ``rendered_html``.
     """
     text = rendered_html
-    for match in reversed(list(COMMENT_RE.finditer(text))):
+    if index is None:
+        index = LiteralIndex.build(text, (MARKER_PREFIX,))
+    comments = _comments_at(text, index.hits[MARKER_PREFIX])
+    comment_starts = [match.start() for match in comments]
+    comment_ends = [match.end() for match in comments]
+    comment_edits: list[Edit] = []
+    # <pre> start -> (tag end, classes in the order they were applied)
+    pre_classes: dict[int, tuple[int, list[str]]] = {}
+    # <code> open end -> (</code> start, wrapped content)
+    code_wraps: dict[int, tuple[int, str]] = {}
+    # <code> open end -> secondary label divs in the order they were inserted
+    code_inserts: dict[int, list[str]] = {}
+
+    for match in reversed(comments):
         raw_payload = match.group(1)
         comment_start = match.start()
         comment_end = match.end()
@@ -330,20 +418,25 @@ def _apply_marker(
         except json.JSONDecodeError:
             if warnings is not None:
                 warnings.append(f"Skipping malformed {MARKER_NAME} marker: {raw_payload!r}")
-            text = text[:comment_start] + text[comment_end:]
+            count("markers_skipped")
+            comment_edits.append((comment_start, comment_end - comment_start, ""))
             continue
 
         version = metadata.get("version")
         if version != MARKER_VERSION:
             if warnings is not None:
                 warnings.append(f"Skipping {MARKER_NAME} marker with unsupported version {version!r}")
-            text = text[:comment_start] + text[comment_end:]
+            count("markers_skipped")
+            comment_edits.append((comment_start, comment_end - comment_start, ""))
             continue
 
-        if PRE_TAG_RE.search(text, comment_end) is None and CODE_TAG_RE.search(text, comment_end) is None:
+        pre_match = _search_outside(PRE_TAG_RE, text, comment_end, comment_starts, comment_ends)
+        code_open_match = _search_outside(CODE_TAG_RE, text, comment_end, comment_starts, comment_ends)
+        if pre_match is None and code_open_match is None:
             if warnings is not None:
                 warnings.append(f"Skipping {MARKER_NAME} marker with no following code block")
-            text = text[:comment_start] + text[comment_end:]
+            count("markers_skipped")
+            comment_edits.append((comment_start, comment_end - comment_start, ""))
             continue
 
         label_html = ""
@@ -352,110 +445,193 @@ def _apply_marker(
             label_html = f'<div class="{label_class}" title="{label_text}">{label_text}</div>\n'
 
         # Replace the comment with the label div (or empty string)
-        text = text[:comment_start] + label_html + text[comment_end:]
+        comment_edits.append((comment_start, comment_end - comment_start, label_html))
+        count("markers_applied")
 
         # Add environment class to <pre>
-        if "environment" in metadata:
+        if "environment" in metadata and pre_match is not None:
             env_name = re.sub(r"[^a-zA-Z0-9-]", "", metadata["environment"])
-            env_class = f"environment-{env_name}"
-            text = _add_pre_classes(text, comment_start, env_class)
+            pre_classes.setdefault(pre_match.start(), (pre_match.end(), []))[1].append(f"environment-{env_name}")
 
         # Add prefix classes to <pre> and wrap code lines
         if "prefix_type" in metadata:
             prefix_type = metadata["prefix_type"]
-            prefix_classes = f"prefixed {prefix_type}"
-            text = _add_pre_classes(text, comment_start, prefix_classes)
+            if pre_match is not None:
+                pre_classes.setdefault(pre_match.start(), (pre_match.end(), []))[1].append(f"prefixed {prefix_type}")
 
             # Find <code>...</code> block and wrap lines
-            code_open_match = CODE_TAG_RE.search(text, comment_start)
-            if code_open_match:
-                code_close_match = CODE_CLOSE_RE.search(text, code_open_match.end())
+            if code_open_match and code_open_match.end() not in code_wraps:
+                code_close_match = _search_outside(
+                    CODE_CLOSE_RE, text, code_open_match.end(), comment_starts, comment_ends
+                )
                 if code_close_match:
                     code_content = text[code_open_match.end() : code_close_match.start()]
                     wrapped_content = _wrap_lines_with_prefix(code_content, metadata)
-                    text = text[: code_open_match.end()] + wrapped_content + text[code_close_match.start() :]
+                    code_wraps[code_open_match.end()] = (code_close_match.start(), wrapped_content)
 
-        if "secondary_label" in metadata:
+        if "secondary_label" in metadata and code_open_match:
             secondary_text = html.escape(metadata["secondary_label"])
             secondary_html = f'<div class="{secondary_label_class}" title="{secondary_text}">{secondary_text}</div>'
-
-            # Find the first <code...> tag after where the comment was
-            code_match = CODE_TAG_RE.search(text, comment_start)
-            if code_match:
-                insert_pos = code_match.end()
-                text = text[:insert_pos] + secondary_html + text[insert_pos:]
-
-    return text
+            code_inserts.setdefault(code_open_match.end(), []).append(secondary_html)
+
+    styling_edits: list[Edit] = []
+    for pre_start, (pre_end, css_classes) in pre_classes.items():
+        pre_tag = text[pre_start:pre_end]
+        for css_class in css_classes:
+            pre_tag = _classed_pre_tag(pre_tag, css_class)
+        styling_edits.append((pre_start, pre_end - pre_start, pre_tag))
+    for insert_at, secondary_divs in code_inserts.items():
+        # Each insertion lands in front of the previous one, so the last applied comes first.
+        styling_edits.append((insert_at, 0, "".join(reversed(secondary_divs))))
+    for code_start, (code_end, wrapped_content) in code_wraps.items():
+        styling_edits.append((code_start, code_end - code_start, wrapped_content))
+    return _drop_conflicts(comment_edits, styling_edits, warnings)
+
+
+def _drop_conflicts(comment_edits: list[Edit], styling_edits: list[Edit], warnings: list[str] | None) -> list[Edit]:
+    """Discard styling edits that overlap a marker comment or another styling edit.
+
+    Only malformed raw HTML (an unclosed ``<code>`` running across a later marker,
+    say) produces overlaps. Comment edits never overlap one another and always
+    survive, so every marker comment is still removed.
+
+    :param comment_edits: Edits removing or replacing marker comments.
+    :param styling_edits: Edits classing ``<pre>`` tags, inserting labels, and wrapping code.
+    :param warnings: Optional list to collect skip reasons; ``None`` suppresses warnings.
+    :returns: Non-overlapping edits.
+    """
+    comment_count = len(comment_edits)
+    tagged = [(edit, index < comment_count) for index, edit in enumerate([*comment_edits, *styling_edits])]
+    kept: list[tuple[Edit, bool]] = []
+    # Insertions sort ahead of replacements that share their offset.
+    for edit, is_comment in sorted(tagged, key=lambda item: (item[0][0], item[0][1] != 0)):
+        while kept and is_comment and not kept[-1][1] and edit[0] < kept[-1][0][0] + kept[-1][0][1]:
+            kept.pop()
+            count("styling_dropped")
+            if warnings is not None:
+                warnings.append(f"Skipping {MARKER_NAME} styling that overlaps another marker")
+        if kept and edit[0] < kept[-1][0][0] + kept[-1][0][1]:
+            count("styling_dropped")
+            if warnings is not None:
+                warnings.append(f"Skipping {MARKER_NAME} styling that overlaps another marker")
+            continue
+        kept.append((edit, is_comment))
+    return [edit for edit, _ in kept]
 
 
-def apply_html(rendered_html: str, warnings: list[str] | None = None) -> str:
-    """Style code blocks from their mw-fence marker comments.
+def _apply_marker(
+    rendered_html: str,
+    warnings: list[str] | None,
+    label_class: str,
+    secondary_label_class: str,
+) -> str:
+    """Style code blocks from their mw-fence marker comments, validating each marker.
 
-    Used by the ``mw post`` CLI stage and the in-process postprocessor. Markers are
-    validated and skipped fail-soft; pass a ``warnings`` list to collect skip reasons.
+    Materializes :func:`_marker_edits` in a single pass.
 
     :param rendered_html: Rendered HTML containing mw-fence marker comments.
     :param warnings: Optional list to collect skip reasons; ``None`` suppresses warnings.
+    :param label_class: CSS class for the label div.
+    :param secondary_label_class: CSS class for the secondary label div.
     :returns: HTML with label divs, environment classes, and line prefixes injected.
     """
-    return _apply_marker(rendered_html, warnings, DEFAULT_LABEL_CLASS, DEFAULT_SECONDARY_LABEL_CLASS)
+    return apply_edits(rendered_html, _marker_edits(rendered_html, warnings, label_class, secondary_label_class))
 
 
-class FencePostprocessor(Postprocessor):
-    """Inject label HTML and line prefixes based on metadata comments.
+def marker_edits(rendered_html: str, warnings: list[str] | None = None) -> list[Edit]:
+    """Compute the edits that style code blocks from their mw-fence marker comments.
 
-    :param md: The Markdown instance.
-    :param extension: The parent FenceExtension instance.
-    """
-
-    def __init__(self, md: Markdown, extension: FenceExtension) -> None:
-        super().__init__(md)
-        self.extension = extension
+    The edit-list form of :func:`apply_html`, for callers that merge the edits
+    themselves.
 
-    def run(self, text: str) -> str:
-        """Process rendered HTML, replacing metadata comments with label elements and prefixes.
+    :param rendered_html: Rendered HTML containing mw-fence marker comments.
+    :param warnings: Optional list to collect skip reasons; ``None`` suppresses warnings.
+    :returns: Non-overlapping ``(offset, length, replacement)`` edits against ``rendered_html``.
+    """
+    return _marker_edits(rendered_html, warnings, DEFAULT_LABEL_CLASS, DEFAULT_SECONDARY_LABEL_CLASS)
 
-        :param text: Rendered HTML string.
-        :returns: Modified HTML with label divs, environment classes, and line prefixes injected.
-        """
-        return _apply_marker(
-            text,
-            None,
-            self.extension.getConfig("label_class"),
-            self.extension.getConfig("secondary_label_class"),
-        )
 
+def scan_edits(rendered_html: str, index: LiteralIndex, warnings: list[str] | None = None) -> list[Edit]:
+    """Compute the marker edits from the indexed offsets of :data:`MARKER_PREFIX`.
 
-class FenceExtension(Extension):
-    """Python-Markdown extension for fence labels, environments, and prefixes.
+    The form of :func:`marker_edits` the registry pipeline calls, reusing the
+    literal index it already holds for ``rendered_html``.
 
-    :param \\*\\*kwargs: Configuration options passed to the extension.
+    :param rendered_html: Rendered HTML containing mw-fence marker comments.
+    :param index: An index of ``rendered_html`` holding :data:`MARKER_PREFIX`.
+    :param warnings: Optional list to collect skip reasons; ``None`` suppresses warnings.
+    :returns: Non-overlapping ``(offset, length, replacement)`` edits against ``rendered_html``.
     """
+    return _marker_edits(rendered_html, warnings, DEFAULT_LABEL_CLASS, DEFAULT_SECONDARY_LABEL_CLASS, index)
 
-    def __init__(self, **kwargs: object) -> None:
-        self.config: dict[str, list[object]] = {
-            "label_class": ["code-label", "CSS class for the label div"],
-            "secondary_label_class": ["secondary-code-label", "CSS class for the secondary label div"],
-            "allowed_environments": [[], "List of allowed environment names (empty = allow all)"],
-        }
-        super().__init__(**kwargs)
 
-    def extendMarkdown(self, md: Markdown) -> None:
-        """Register the fence preprocessor and postprocessor.
-
-        :param md: The Markdown instance to extend.
-        """
-        preprocessor = FencePreprocessor(md, self)
-        md.preprocessors.register(preprocessor, "mw-fence-pre", 40)
+def apply_html(rendered_html: str, warnings: list[str] | None = None) -> str:
+    """Style code blocks from their mw-fence marker comments.
 
-        postprocessor = FencePostprocessor(md, self)
-        md.postprocessors.register(postprocessor, "mw-fence-post", 25)
+    Used by the ``mw post`` CLI stage and the in-process postprocessor. Markers are
+    validated and skipped fail-soft; pass a ``warnings`` list to collect skip reasons.
 
+    :param rendered_html: Rendered HTML containing mw-fence marker comments.
+    :param warnings: Optional list to collect skip reasons; ``None`` suppresses warnings.
+    :returns: HTML with label divs, environment classes, and line prefixes injected.
+    """
+    return _apply_marker(rendered_html, warnings, DEFAULT_LABEL_CLASS, DEFAULT_SECONDARY_LABEL_CLASS)
 
-def makeExtension(**kwargs: object) -> FenceExtension:
-    """Create and return the FenceExtension instance.
 
-    :param \\*\\*kwargs: Configuration options.
-    :returns: A configured FenceExtension.
+def bind_stages(
+    config: Mapping[str, object],
+) -> tuple[
+    Callable[[str], str],
+    Callable[[str, list[str] | None], str],
+    Callable[[str, list[str] | None], list[Edit]],
+    Callable[[list[Segment]], list[Segment]],
+    Callable[[str, LiteralIndex, list[str] | None], list[Edit]],
+]:
+    """Build pre and post stage functions bound to fence configuration options.
+
+    Accepts the same options as :class:`FenceExtension` (``label_class``,
+    ``secondary_label_class``, ``allowed_environments``) so a registry pipeline can
+    reproduce a configured in-process render. Omitted options keep their defaults.
+
+    :param config: Option values keyed by option name.
+    :returns: ``(expand, apply, edits, segments, scan)`` with the signatures of
+        :func:`expand_source`, :func:`apply_html`, :func:`marker_edits`,
+        :func:`expand_segments`, and :func:`scan_edits`.
+    :raises ValueError: If an option is unknown or has the wrong type.
     """
-    return FenceExtension(**kwargs)
+    for option in config:
+        if option not in ("label_class", "secondary_label_class", "allowed_environments"):
+            raise ValueError(f"unknown fence option: {option!r}")
+    label_class = config.get("label_class", DEFAULT_LABEL_CLASS)
+    secondary_label_class = config.get("secondary_label_class", DEFAULT_SECONDARY_LABEL_CLASS)
+    allowed_environments = config.get("allowed_environments", [])
+    if not isinstance(label_class, str) or not isinstance(secondary_label_class, str):
+        raise ValueError("fence label classes must be strings")
+    if not isinstance(allowed_environments, list | tuple) or not all(
+        isinstance(environment, str) for environment in allowed_environments
+    ):
+        raise ValueError("fence allowed_environments must be a list of strings")
+    environments = [str(environment) for environment in allowed_environments]
+
+    def expand(text: str) -> str:
+        return "\n".join(_expand_lines(text.split("\n"), environments))
+
+    def apply(rendered_html: str, warnings: list[str] | None = None) -> str:
+        return _apply_marker(rendered_html, warnings, label_class, secondary_label_class)
+
+    def edits(rendered_html: str, warnings: list[str] | None = None) -> list[Edit]:
+        return _marker_edits(rendered_html, warnings, label_class, secondary_label_class)
+
+    def segments(source_segments: list[Segment]) -> list[Segment]:
+        return _expand_segments(source_segments, environments)
+
+    def scan(rendered_html: str, index: LiteralIndex, warnings: list[str] | None = None) -> list[Edit]:
+        return _marker_edits(rendered_html, warnings, label_class, secondary_label_class, index)
+
+    return expand, apply, edits, segments, scan
+
+
+# The Python-Markdown classes live in markwright._extensions.fence and load on first access.
+__getattr__ = markdown_attributes(
+    __name__, ("FencePreprocessor", "FencePostprocessor", "FenceExtension", "makeExtension")
+)
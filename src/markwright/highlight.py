@@ -4,14 +4,23 @@
 from __future__ import annotations
 
 import re
-import xml.etree.ElementTree as etree
+from typing import TYPE_CHECKING
 
-from markdown import Markdown
-from markdown.extensions import Extension
-from markdown.inlinepatterns import InlineProcessor
-from markdown.postprocessors import Postprocessor
+from markwright._extensions import markdown_attributes
+from markwright._scan import LiteralIndex
+from markwright._segment import EMBED, OPEN_FENCE, PROSE, Segment, join_segments, segment_source, split_inline
+from markwright._stats import count
+from markwright._util import Edit, apply_edits
+
+# Static types for the classes __getattr__ forwards below; at run time they still load on first access.
+if TYPE_CHECKING:
+    from markwright._extensions.highlight import HighlightExtension as HighlightExtension
+    from markwright._extensions.highlight import HighlightInlineProcessor as HighlightInlineProcessor
+    from markwright._extensions.highlight import HighlightPostprocessor as HighlightPostprocessor
+    from markwright._extensions.highlight import makeExtension as makeExtension
 
 _HIGHLIGHT_PATTERN = r"<\^>(.*?)<\^>"
+ESCAPED_MARKER = "&lt;^&gt;"
 # Markers are HTML-escaped to ``&lt;^&gt;`` inside code. A backslash before a
 # marker (``\<^>``) escapes it, so neither lookbehind-guarded marker matches.
 _ESCAPED_HIGHLIGHT_RE = re.compile(r"(?<!\\)&lt;\^&gt;(.*?)(?<!\\)&lt;\^&gt;")
@@ -22,13 +31,6 @@ _HTML_TAG_RE = re.compile(r"<[^>]+>")
 # the escaped post-stage regexes above: a backslash before a marker escapes it.
 _PROSE_HIGHLIGHT_RE = re.compile(r"(?<!\\)<\^>(.*?)(?<!\\)<\^>")
 _PROSE_BACKSLASH_MARKER_RE = re.compile(r"\\<\^>")
-# Code regions the pre stage must skip: fenced code blocks and inline code
-# spans. Markers inside code are HTML-escaped during rendering and handled by
-# :func:`apply_html` in the post stage instead.
-_CODE_REGION_RE = re.compile(
-    r"(?P<fence>^```[^\n]*\n.*?^```)|(?P<inline>`[^`\n]*`)",
-    re.DOTALL | re.MULTILINE,
-)
 
 
 def _wrap_highlight_segments(match: re.Match[str]) -> str:
@@ -61,6 +63,58 @@ def _wrap_highlight_segments(match: re.Match[str]) -> str:
     return "".join(rebuilt_parts)
 
 
+def scan_edits(html: str, index: LiteralIndex, warnings: list[str] | None = None) -> list[Edit]:
+    """Compute the highlight edits from the indexed offsets of ``&lt;^&gt;``.
+
+    Walks the marker offsets in order instead of searching the HTML. An un-escaped
+    marker opens a region that the next un-escaped marker on the same line closes;
+    a backslash-escaped marker outside every region is revealed on its own.
+
+    :param html: Rendered HTML content.
+    :param index: An index of ``html`` holding :data:`ESCAPED_MARKER`.
+    :param warnings: Optional warnings list; unused (highlighting never warns).
+    :returns: Non-overlapping ``(offset, length, replacement)`` edits against ``html``.
+    """
+    edits: list[Edit] = []
+    opener: int | None = None
+    # Backslash-escaped markers after the open marker; revealed on their own
+    # unless a closing marker turns them into part of the region.
+    escaped_in_region: list[int] = []
+    for offset in index.hits[ESCAPED_MARKER]:
+        if offset and html[offset - 1] == "\\":
+            if opener is None:
+                edits.append((offset - 1, len(ESCAPED_MARKER) + 1, ESCAPED_MARKER))
+            else:
+                escaped_in_region.append(offset)
+            continue
+        if opener is not None and html.find("\n", opener, offset) == -1:
+            region_match = _ESCAPED_HIGHLIGHT_RE.match(html, opener)
+            assert region_match is not None
+            wrapped = _BACKSLASH_MARKER_RE.sub(ESCAPED_MARKER, _wrap_highlight_segments(region_match))
+            edits.append((opener, region_match.end() - opener, wrapped))
+            count("regions_wrapped")
+            opener = None
+        else:
+            edits.extend((escaped - 1, len(ESCAPED_MARKER) + 1, ESCAPED_MARKER) for escaped in escaped_in_region)
+            opener = offset
+        escaped_in_region = []
+    edits.extend((escaped - 1, len(ESCAPED_MARKER) + 1, ESCAPED_MARKER) for escaped in escaped_in_region)
+    return edits
+
+
+def highlight_edits(html: str, warnings: list[str] | None = None) -> list[Edit]:
+    """Compute the edits converting escaped highlight markers in ``html`` to ``<mark>``.
+
+    The edit-list form of :func:`apply_html`: each marked region becomes one splice,
+    as does each backslash-escaped marker outside a region.
+
+    :param html: Rendered HTML content.
+    :param warnings: Optional warnings list; unused (highlighting never warns).
+    :returns: Non-overlapping ``(offset, length, replacement)`` edits against ``html``.
+    """
+    return scan_edits(html, LiteralIndex.build(html, (ESCAPED_MARKER,)), warnings)
+
+
 def apply_html(html: str, warnings: list[str] | None = None) -> str:
     """Convert HTML-escaped ``&lt;^&gt;`` markers in rendered HTML to ``<mark>``.
 
@@ -73,8 +127,7 @@ def apply_html(html: str, warnings: list[str] | None = None) -> str:
     :param warnings: Optional warnings list; unused (highlighting never warns).
     :returns: HTML with escaped highlight markers converted to ``<mark>``.
     """
-    highlighted = _ESCAPED_HIGHLIGHT_RE.sub(_wrap_highlight_segments, html)
-    return _BACKSLASH_MARKER_RE.sub("&lt;^&gt;", highlighted)
+    return apply_edits(html, highlight_edits(html, warnings))
 
 
 def _highlight_prose(segment: str) -> str:
@@ -84,94 +137,45 @@ def _highlight_prose(segment: str) -> str:
     :returns: The segment with un-escaped markers wrapped and backslash-escaped
         markers revealed as a literal ``<^>``.
     """
-    marked = _PROSE_HIGHLIGHT_RE.sub(r"<mark>\1</mark>", segment)
+    marked, regions = _PROSE_HIGHLIGHT_RE.subn(r"<mark>\1</mark>", segment)
+    if regions:
+        count("regions_wrapped", regions)
     return _PROSE_BACKSLASH_MARKER_RE.sub("<^>", marked)
 
 
-def expand_source(text: str) -> str:
-    """Wrap prose highlight markers in ``<mark>`` outside code regions.
+def highlight_segments(segments: list[Segment]) -> list[Segment]:
+    """Wrap prose highlight markers in ``<mark>`` across a segmented document.
 
-    The source-stage transform for ``mw pre``. Fenced code blocks and inline
-    code spans are left untouched: their markers are HTML-escaped during
-    rendering and converted by :func:`apply_html` in the post stage.
+    Fenced code, inline code, and expanded embed HTML are left untouched: markers
+    in code are HTML-escaped during rendering and converted by :func:`apply_html`
+    in the post stage instead. Embed lines no renderer claimed and unclosed fences
+    render as prose, so they are highlighted around their inline code spans.
 
-    :param text: Raw Markdown source.
-    :returns: Source with prose ``<^>...<^>`` markers wrapped in ``<mark>``.
+    :param segments: Segments from :func:`~markwright._segment.segment_source`.
+    :returns: The segments with prose ``<^>...<^>`` markers wrapped in ``<mark>``.
     """
-    result_parts: list[str] = []
-    last_end = 0
-    for code_match in _CODE_REGION_RE.finditer(text):
-        result_parts.append(_highlight_prose(text[last_end : code_match.start()]))
-        result_parts.append(code_match.group(0))
-        last_end = code_match.end()
-    result_parts.append(_highlight_prose(text[last_end:]))
-    return "".join(result_parts)
+    highlighted: list[Segment] = []
+    for segment in segments:
+        if segment.kind == PROSE:
+            segment = Segment(PROSE, _highlight_prose(segment.text))
+        elif segment.kind in (EMBED, OPEN_FENCE):
+            segment = Segment(segment.kind, join_segments(highlight_segments(split_inline(segment.text))))
+        highlighted.append(segment)
+    return highlighted
 
 
-class HighlightInlineProcessor(InlineProcessor):
-    """Inline processor that converts ``<^>text<^>`` to ``<mark>text</mark>``.
-
-    :param pattern: Regex pattern for matching highlight markers.
-    :param md: The Markdown instance.
-    """
-
-    def handleMatch(self, match: re.Match[str], data: str) -> tuple[etree.Element, int, int]:  # type: ignore[override]
-        """Create a ``<mark>`` element from the matched text.
-
-        :param match: The regex match object.
-        :param data: The full source string being processed.
-        :returns: A tuple of (element, start, end).
-        """
-        mark_element = etree.Element("mark")
-        mark_element.text = match.group(1)
-        return mark_element, match.start(0), match.end(0)
-
-
-class HighlightPostprocessor(Postprocessor):
-    """Postprocessor that replaces HTML-escaped ``<^>`` markers in rendered code blocks.
-
-    Code blocks render ``<`` and ``>`` as ``&lt;`` and ``&gt;``, so the inline
-    processor cannot reach them. This postprocessor catches those escaped markers
-    in the final HTML and converts them to ``<mark>`` tags.
-    """
-
-    def run(self, text: str) -> str:
-        """Replace escaped highlight markers with ``<mark>`` tags.
-
-        :param text: The rendered HTML string.
-        :returns: HTML with highlight markers replaced.
-        """
-        return apply_html(text)
-
+def expand_source(text: str) -> str:
+    """Wrap prose highlight markers in ``<mark>`` outside code regions.
 
-class HighlightExtension(Extension):
-    """Python-Markdown extension for ``<^>text<^>`` highlight syntax.
+    The source-stage transform for ``mw pre``; see :func:`highlight_segments`.
 
-    Registers an :class:`HighlightInlineProcessor` for regular inline text and a
-    :class:`HighlightPostprocessor` for code blocks where markers are HTML-escaped.
+    :param text: Raw Markdown source.
+    :returns: Source with prose ``<^>...<^>`` markers wrapped in ``<mark>``.
     """
+    return join_segments(highlight_segments(segment_source(text)))
 
-    def extendMarkdown(self, md: Markdown) -> None:
-        """Register the highlight processors with the Markdown instance.
-
-        :param md: The Markdown instance to extend.
-        """
-        md.inlinePatterns.register(
-            HighlightInlineProcessor(_HIGHLIGHT_PATTERN, md),
-            "do_highlight_inline",
-            175,
-        )
-        md.postprocessors.register(
-            HighlightPostprocessor(md),
-            "do_highlight_post",
-            25,
-        )
 
-
-def makeExtension(**kwargs: str) -> HighlightExtension:
-    """Entry point for Python-Markdown extension loading.
-
-    :param kwargs: Extension configuration options.
-    :returns: A configured HighlightExtension instance.
-    """
-    return HighlightExtension(**kwargs)
+# The Python-Markdown classes live in markwright._extensions.highlight and load on first access.
+__getattr__ = markdown_attributes(
+    __name__, ("HighlightInlineProcessor", "HighlightPostprocessor", "HighlightExtension", "makeExtension")
+)
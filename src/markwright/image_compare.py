@@ -5,10 +5,16 @@ from __future__ import annotations
 
 import html
 import re
+from typing import TYPE_CHECKING
 
-from markdown import Markdown
-from markdown.extensions import Extension
-from markdown.preprocessors import Preprocessor
+from markwright._embed import expand_embed_source
+from markwright._extensions import markdown_attributes
+
+# Static types for the classes __getattr__ forwards below; at run time they still load on first access.
+if TYPE_CHECKING:
+    from markwright._extensions.image_compare import ImageCompareExtension as ImageCompareExtension
+    from markwright._extensions.image_compare import ImageComparePreprocessor as ImageComparePreprocessor
+    from markwright._extensions.image_compare import makeExtension as makeExtension
 
 COMPARE_RE = re.compile(r"^\[compare\s+(\S+)\s+(\S+)(?:\s+(\d+))?(?:\s+(\d+))?\]$")
 
@@ -48,35 +54,9 @@ def expand_source(text: str) -> str:
     Python-Markdown stash placeholder.
 
     :param text: The source text.
-    :returns: The text with standalone compare embeds replaced by HTML.
+    :returns: The text with standalone compare embeds outside code replaced by HTML.
     """
-    return "\n".join(_render_match(line) or line for line in text.split("\n"))
-
-
-class ImageComparePreprocessor(Preprocessor):
-    """Replace [compare ...] lines with image comparison HTML.
-
-    :param md: The Markdown instance.
-    """
-
-    def run(self, lines: list[str]) -> list[str]:
-        """Process lines, replacing image compare syntax with HTML.
-
-        :param lines: Source lines to process.
-        :returns: Modified lines with image compare embeds replaced by HTML.
-        """
-        output: list[str] = []
-        for line in lines:
-            # Stash the raw HTML so Markdown does not parse its contents. The
-            # oninput handler contains a JS backtick template literal that
-            # would otherwise be turned into an inline <code> span, and the
-            # block-level <div> would be wrapped in an invalid <p>.
-            compare_html = _render_match(line)
-            if compare_html is not None:
-                output.append(self.md.htmlStash.store(compare_html))
-            else:
-                output.append(line)
-        return output
+    return expand_embed_source(text, {"compare": _render_match})
 
 
 def _build_compare_html(left_url: str, right_url: str, height: int, width: int) -> str:
@@ -102,25 +82,5 @@ def _build_compare_html(left_url: str, right_url: str, height: int, width: int)
     )
 
 
-class ImageCompareExtension(Extension):
-    """Python-Markdown extension for side-by-side image comparison.
-
-    :param \\*\\*kwargs: Configuration options passed to the extension.
-    """
-
-    def extendMarkdown(self, md: Markdown) -> None:
-        """Register the image compare preprocessor.
-
-        :param md: The Markdown instance to extend.
-        """
-        preprocessor = ImageComparePreprocessor(md)
-        md.preprocessors.register(preprocessor, "do-image-compare", 20)
-
-
-def makeExtension(**kwargs: object) -> ImageCompareExtension:
-    """Create and return the ImageCompareExtension instance.
-
-    :param \\*\\*kwargs: Configuration options.
-    :returns: A configured ImageCompareExtension.
-    """
-    return ImageCompareExtension(**kwargs)
+# The Python-Markdown classes live in markwright._extensions.image_compare and load on first access.
+__getattr__ = markdown_attributes(__name__, ("ImageComparePreprocessor", "ImageCompareExtension", "makeExtension"))
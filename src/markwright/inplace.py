@@ -0,0 +1,246 @@
+# ABOUTME: In-place multi-file modes behind mw pre/post --in-place and --tree.
+# Rewrites only the files a step changes, atomically, skipping files the manifest or the trigger prefilter rules out.
+
+from __future__ import annotations
+
+import functools
+import mmap
+import os
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+from markwright import build, registry
+from markwright._batch import map_documents
+from markwright._util import write_atomic
+from markwright.manifest import MANIFEST_NAME, ManifestEntry, content_hash, load_manifest, save_manifest, selection_key
+from markwright.shard import SHARD_STRATEGIES, Shard
+
+
+@dataclass(frozen=True, slots=True)
+class InPlaceResult:
+    """Outcome of one :func:`rewrite_in_place` or :func:`rewrite_tree` run.
+
+    :ivar rewritten: Files the step changed, which were replaced atomically.
+    :ivar unchanged: Files the step ran on without changing, which were left untouched.
+    :ivar current: Files the manifest showed already hold the step's output, which were not transformed.
+    :ivar seconds: Wall-clock time the run took.
+    :ivar warnings: Skip reasons from post stages, and files that are not valid
+        UTF-8 and were left alone, each prefixed with its file.
+    """
+
+    rewritten: tuple[str, ...]
+    unchanged: tuple[str, ...]
+    current: tuple[str, ...]
+    seconds: float
+    warnings: tuple[str, ...] = ()
+
+
+def manifest_key(path: Path, manifest: Path) -> str:
+    """Name a file the same way whatever directory the run starts from.
+
+    :param path: The file.
+    :param manifest: The manifest file.
+    :returns: The file's path relative to the manifest's directory, in POSIX form.
+    """
+    return Path(os.path.relpath(path.resolve(), manifest.parent.resolve())).as_posix()
+
+
+def rewrite_in_place(
+    step: Literal["pre", "post"],
+    files: list[Path],
+    names: list[str],
+    *,
+    manifest: Path | None = None,
+    shard: Shard | None = None,
+    shard_by: str = "path",
+) -> InPlaceResult:
+    """Apply one step to every file, writing each output over its input.
+
+    The manifest records the hash of each file as this step left it. A file
+    whose bytes still hash to that value, under the same selection and
+    markwright version, already holds the step's output and is not decoded or
+    transformed again. A file no selected stage could change is not decoded
+    either, and a file whose output equals its input is not rewritten, so its
+    modification time is kept. A rewritten file keeps its permission bits, and
+    a symlink is followed rather than replaced. A file that is not valid UTF-8
+    is left alone and reported as a warning, and the run goes on. The manifest
+    is saved even if a file fails, so the files finished before it are skipped
+    on the next run.
+
+    With ``shard``, only that shard's files are processed, chosen by
+    :meth:`~markwright.shard.Shard.select` from their manifest keys. The shard
+    keeps its own partial manifest beside ``manifest``, and writes a stats file
+    next to it.
+
+    :param step: ``"pre"`` or ``"post"``.
+    :param files: Files to rewrite, each read as UTF-8.
+    :param names: Selected extension names.
+    :param manifest: Manifest file; defaults to :data:`~markwright.manifest.MANIFEST_NAME`
+        in the current directory. Entries for files not in ``files`` are kept.
+    :param shard: The slice of ``files`` to process; all of them by default.
+    :param shard_by: How files are assigned to shards, from
+        :data:`~markwright.shard.SHARD_STRATEGIES`.
+    :returns: What was rewritten, left alone, and skipped.
+    :raises ValueError: If the step, a name, or the shard strategy is not known.
+    """
+    if step not in ("pre", "post"):
+        raise ValueError(f"unknown in-place step: {step!r}")
+    if shard_by not in SHARD_STRATEGIES:
+        raise ValueError(f"unknown shard strategy: {shard_by!r}")
+    registry.select_extensions(names, [])
+    started = time.perf_counter()
+    ordered = [name for name in registry.EXTENSION_NAMES if name in names]
+    manifest_path = manifest or Path(MANIFEST_NAME)
+    if shard is not None:
+        keys = {manifest_key(path, manifest_path): path for path in files}
+        sizes = {key: path.stat().st_size for key, path in keys.items()} if shard_by == "size" else None
+        files = [keys[key] for key in shard.select(list(keys), sizes)]
+        manifest_path = shard.partial(manifest_path)
+    entries = load_manifest(manifest_path)
+    selection = selection_key(step, ordered)
+    rewritten: list[str] = []
+    unchanged: list[str] = []
+    current: list[str] = []
+    warnings: list[str] = []
+    input_bytes = 0
+    try:
+        for path in files:
+            key = manifest_key(path, manifest_path)
+            data = path.read_bytes()
+            input_bytes += len(data)
+            entry = ManifestEntry(hash=content_hash(data), selection=selection)
+            if entries.get(key) == entry:
+                current.append(str(path))
+                continue
+            if registry.could_change(data, step, ordered):
+                try:
+                    source_text = data.decode()
+                except UnicodeDecodeError as decode_error:
+                    warnings.append(f"{path}: not rewritten: {decode_error}")
+                    continue
+                text, file_warnings = build.transform(step, ordered, source_text)
+                warnings.extend(f"{path}: {warning}" for warning in file_warnings)
+                output = text.encode()
+            else:
+                output = data
+            if output == data:
+                unchanged.append(str(path))
+            else:
+                write_atomic(path, output, in_place=True)
+                entry = ManifestEntry(hash=content_hash(output), selection=selection)
+                rewritten.append(str(path))
+            entries[key] = entry
+    finally:
+        if rewritten or unchanged:
+            save_manifest(manifest_path, entries)
+    result = InPlaceResult(
+        tuple(rewritten), tuple(unchanged), tuple(current), time.perf_counter() - started, tuple(warnings)
+    )
+    if shard is not None:
+        shard.save_stats(
+            manifest or Path(MANIFEST_NAME),
+            step,
+            {
+                "files": len(files),
+                "input_bytes": input_bytes,
+                "seconds": result.seconds,
+                "rewritten": len(rewritten),
+                "unchanged": len(unchanged),
+                "current": len(current),
+                "warnings": len(warnings),
+            },
+        )
+    return result
+
+
+def _rewrite_one(
+    step: Literal["pre", "post"], root: str, names: frozenset[str], relative: str
+) -> tuple[bool, list[str]]:
+    """Rewrite one file of a tree if the step changes it; the picklable unit of :func:`rewrite_tree`.
+
+    The file is mapped rather than read, so one no selected stage could change
+    is scanned for triggers in place and never copied or decoded. The map is
+    closed before the output is written over the file, which keeps its
+    permission bits, and through a symlink to the file it points to. A file
+    that is not valid UTF-8 is left alone and reported as a warning.
+
+    :param step: ``"pre"`` or ``"post"``.
+    :param root: Root of the tree.
+    :param names: Selected extension names.
+    :param relative: The file, relative to ``root``.
+    :returns: Whether the file was rewritten, and its warnings, each prefixed with its path.
+    """
+    path = Path(root, relative)
+    ordered = [name for name in registry.EXTENSION_NAMES if name in names]
+    with path.open("rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return False, []
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            if not registry.could_change(view, step, ordered):
+                return False, []
+            try:
+                text = str(view, "utf-8")
+            except UnicodeDecodeError as decode_error:
+                return False, [f"{path}: not rewritten: {decode_error}"]
+    output, warnings = build.transform(step, ordered, text)
+    if output != text:
+        write_atomic(path, output, in_place=True)
+    return output != text, [f"{path}: {warning}" for warning in warnings]
+
+
+def rewrite_tree(
+    step: Literal["pre", "post"],
+    root: Path,
+    names: list[str],
+    *,
+    executor: Executor | None = None,
+    backend: str = "auto",
+    max_workers: int | None = None,
+    chunksize: int | None = None,
+) -> InPlaceResult:
+    """Apply one step to every matching file under ``root``, writing each output over its input.
+
+    ``pre`` rewrites ``.md`` files and ``post`` rewrites ``.html`` files, such as
+    the ``public`` tree a static site generator writes. The files run on a
+    worker pool, costliest first, as in :func:`~markwright.build.build_tree`.
+    Each worker maps its file and runs the trigger prefilter on the raw bytes,
+    so a page without markwright syntax is neither decoded nor transformed. A
+    file whose output equals its input is not rewritten and keeps its
+    modification time, so an incremental upload of the tree sends only the
+    pages that changed. A rewritten file keeps its permission bits, and a
+    symlinked page stays a symlink.
+
+    :param step: ``"pre"`` or ``"post"``.
+    :param root: Root of the tree.
+    :param names: Selected extension names.
+    :param executor: Optional executor to run on instead of a fresh pool; it is
+        not shut down.
+    :param backend: Pool to start when no executor is given.
+    :param max_workers: Workers for the managed pool; defaults to the CPUs this
+        process may use.
+    :param chunksize: Files sent to a worker per task; by default each task holds
+        about half of one worker's share of the estimated cost not yet planned.
+    :returns: What was rewritten and left alone; :attr:`InPlaceResult.current` is
+        always empty, since a tree run keeps no manifest.
+    :raises ValueError: If the step, a name, or the backend is not known.
+    """
+    if step not in ("pre", "post"):
+        raise ValueError(f"unknown in-place step: {step!r}")
+    registry.select_extensions(names, [])
+    started = time.perf_counter()
+    ordered = [name for name in registry.EXTENSION_NAMES if name in names]
+    files = build.find_sources(root, step)
+    run_one = functools.partial(_rewrite_one, step, str(root))
+    cost = functools.partial(build.file_cost, step, str(root), ordered)
+    outcomes = map_documents(run_one, files, ordered, executor, backend, max_workers, chunksize, cost)
+    paths = [str(Path(root, relative)) for relative in files]
+    return InPlaceResult(
+        rewritten=tuple(path for path, (changed, _) in zip(paths, outcomes, strict=True) if changed),
+        unchanged=tuple(path for path, (changed, _) in zip(paths, outcomes, strict=True) if not changed),
+        current=(),
+        seconds=time.perf_counter() - started,
+        warnings=tuple(warning for _, warnings in outcomes for warning in warnings),
+    )
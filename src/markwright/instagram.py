@@ -5,11 +5,20 @@ from __future__ import annotations
 
 import html
 import re
+from typing import TYPE_CHECKING
 
-from markdown import Markdown
-from markdown.extensions import Extension
-from markdown.postprocessors import Postprocessor
-from markdown.preprocessors import Preprocessor
+from markwright._embed import expand_embed_source
+from markwright._extensions import markdown_attributes
+from markwright._scan import LiteralIndex
+from markwright._stats import count
+from markwright._util import Edit
+
+# Static types for the classes __getattr__ forwards below; at run time they still load on first access.
+if TYPE_CHECKING:
+    from markwright._extensions.instagram import InstagramExtension as InstagramExtension
+    from markwright._extensions.instagram import InstagramPostprocessor as InstagramPostprocessor
+    from markwright._extensions.instagram import InstagramPreprocessor as InstagramPreprocessor
+    from markwright._extensions.instagram import makeExtension as makeExtension
 
 INSTAGRAM_RE = re.compile(
     r"^\[instagram\s+(https?://(?:www\.)?instagram\.com/p/\S+)"
@@ -99,9 +108,9 @@ def expand_source(text: str) -> str:
     HTML inline without any Python-Markdown stash placeholder.
 
     :param text: The source text.
-    :returns: The text with standalone Instagram embeds replaced by HTML.
+    :returns: The text with standalone Instagram embeds outside code replaced by HTML.
     """
-    return "\n".join(_render_match(line) or line for line in text.split("\n"))
+    return expand_embed_source(text, {"instagram": _render_match})
 
 
 def apply_html(rendered_html: str, warnings: list[str] | None = None) -> str:
@@ -116,68 +125,29 @@ def apply_html(rendered_html: str, warnings: list[str] | None = None) -> str:
     :returns: HTML with the Instagram script appended if needed.
     """
     if INSTAGRAM_SIGNATURE in rendered_html and INSTAGRAM_SCRIPT not in rendered_html:
+        count("scripts_injected")
         return rendered_html + "\n" + INSTAGRAM_SCRIPT
     return rendered_html
 
 
-class InstagramPreprocessor(Preprocessor):
-    """Replace [instagram ...] lines with Instagram embed HTML.
-
-    :param md: The Markdown instance.
-    """
-
-    def run(self, lines: list[str]) -> list[str]:
-        """Process lines, replacing Instagram embed syntax with HTML.
-
-        :param lines: Source lines to process.
-        :returns: Modified lines with Instagram embeds replaced by HTML.
-        """
-        output: list[str] = []
-        for line in lines:
-            embed_html = _render_match(line)
-            if embed_html is not None:
-                output.append(self.md.htmlStash.store(embed_html))
-            else:
-                output.append(line)
-        return output
-
-
-class InstagramPostprocessor(Postprocessor):
-    """Append the Instagram embed script tag once if any embeds are present.
-
-    :param md: The Markdown instance.
-    """
-
-    def run(self, text: str) -> str:
-        """Append the script tag if an Instagram embed signature is present.
+def script_edits(rendered_html: str, index: LiteralIndex, warnings: list[str] | None = None) -> list[Edit]:
+    """Compute the script injection of :func:`apply_html` from a literal index.
 
-        :param text: Rendered HTML content.
-        :returns: HTML with Instagram script appended if needed.
-        """
-        return apply_html(text)
+    The form the registry pipeline calls: the index already records whether the
+    Instagram class signature and the script occur, so the HTML is not searched.
 
-
-class InstagramExtension(Extension):
-    """Python-Markdown extension for Instagram embeds.
-
-    :param \\*\\*kwargs: Configuration options passed to the extension.
+    :param rendered_html: Rendered HTML content.
+    :param index: An index of ``rendered_html`` holding ``INSTAGRAM_SIGNATURE`` and ``INSTAGRAM_SCRIPT``.
+    :param warnings: Optional warnings list; unused (signature injection never warns).
+    :returns: One edit appending the script if needed, else no edits.
     """
+    if index.hits[INSTAGRAM_SIGNATURE] and not index.hits[INSTAGRAM_SCRIPT]:
+        count("scripts_injected")
+        return [(len(rendered_html), 0, "\n" + INSTAGRAM_SCRIPT)]
+    return []
 
-    def extendMarkdown(self, md: Markdown) -> None:
-        """Register the Instagram preprocessor and postprocessor.
-
-        :param md: The Markdown instance to extend.
-        """
-        preprocessor = InstagramPreprocessor(md)
-        postprocessor = InstagramPostprocessor(md)
-        md.preprocessors.register(preprocessor, "do-instagram", 20)
-        md.postprocessors.register(postprocessor, "do-instagram-script", 15)
 
-
-def makeExtension(**kwargs: object) -> InstagramExtension:
-    """Create and return the InstagramExtension instance.
-
-    :param \\*\\*kwargs: Configuration options.
-    :returns: A configured InstagramExtension.
-    """
-    return InstagramExtension(**kwargs)
+# The Python-Markdown classes live in markwright._extensions.instagram and load on first access.
+__getattr__ = markdown_attributes(
+    __name__, ("InstagramPreprocessor", "InstagramPostprocessor", "InstagramExtension", "makeExtension")
+)
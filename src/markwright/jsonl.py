@@ -0,0 +1,148 @@
+# ABOUTME: The mw jsonl protocol: one JSON request per input line, one JSON answer per output line.
+# Spreads requests over a worker pool and writes each answer as soon as its worker finishes.
+
+from __future__ import annotations
+
+import functools
+import json
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor, Future
+from typing import Any
+
+from markwright import registry, render
+
+JSONL_STAGES = ("pre", "post", "render")
+
+
+def _string_list(request: dict[str, Any], field: str) -> list[str]:
+    """Read an optional list-of-names field from a request.
+
+    :param request: The decoded request.
+    :param field: ``"use"`` or ``"exclude"``.
+    :returns: The names, or an empty list if the field is absent or null.
+    :raises ValueError: If the field is not a list of strings.
+    """
+    value = request.get(field) or []
+    if not isinstance(value, list) or not all(isinstance(name, str) for name in value):
+        raise ValueError(f"{field} must be a list of extension names")
+    return value
+
+
+def _run_request(request: dict[str, Any]) -> tuple[str, list[str]]:
+    """Run the stage a request names.
+
+    :param request: The decoded request.
+    :returns: ``(output, warnings)``.
+    :raises ValueError: If the stage, the text, or the selection is invalid.
+    """
+    stage = request.get("stage")
+    if stage not in JSONL_STAGES:
+        raise ValueError(f"unknown stage: {stage!r}")
+    text = request.get("text")
+    if not isinstance(text, str):
+        raise ValueError("text must be a string")
+    names = registry.select_extensions(_string_list(request, "use"), _string_list(request, "exclude"))
+    warnings: list[str] = []
+    if stage == "pre":
+        return registry.run_pre(text, names), warnings
+    if stage == "post":
+        return registry.run_post(text, names, warnings), warnings
+    return render.render(text, names), warnings
+
+
+def _request_id(line: str) -> object:
+    """Recover the ``id`` of a request line, for answering it without a worker.
+
+    :param line: One line of JSON.
+    :returns: The request's ``id``, or ``None`` if the line is not a JSON object.
+    """
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+    return request.get("id") if isinstance(request, dict) else None
+
+
+def answer_line(line: str, received: float) -> str:
+    """Answer one request line; the picklable unit of :func:`run_stream`.
+
+    A request is ``{"id", "stage", "text", "use", "exclude"}``, where ``stage`` is
+    ``"pre"``, ``"post"``, or ``"render"`` and the selection lists are optional.
+    The answer is ``{"id", "output", "warnings", "timings"}``, or ``{"id",
+    "error"}`` for a request that cannot be run.
+
+    :param line: One line of JSON.
+    :param received: ``time.monotonic()`` when the line was read, to report how
+        long it waited for a worker.
+    :returns: The answer as one line of JSON, without the newline.
+    """
+    started = time.monotonic()
+    try:
+        request = json.loads(line)
+    except ValueError as decode_error:
+        return json.dumps({"id": None, "error": f"bad request: {decode_error}"})
+    if not isinstance(request, dict):
+        return json.dumps({"id": None, "error": "bad request: not a JSON object"})
+    request_id = request.get("id")
+    try:
+        output, warnings = _run_request(request)
+    except ValueError as request_error:
+        return json.dumps({"id": request_id, "error": str(request_error)})
+    timings = {
+        "queue_ms": round((started - received) * 1000, 3),
+        "run_ms": round((time.monotonic() - started) * 1000, 3),
+    }
+    return json.dumps({"id": request_id, "output": output, "warnings": warnings, "timings": timings})
+
+
+def run_stream(
+    lines: Iterable[str],
+    write: Callable[[str], None],
+    executor: Executor | None = None,
+    window: int = 1,
+) -> int:
+    """Answer every request line, writing each answer as soon as it is ready.
+
+    With an executor, answers arrive in completion order, not input order, so
+    callers match them up by ``id``. A request whose worker fails is answered
+    with an error under its own ``id``, which is read from the line again only
+    then, so the line is parsed once on the usual path. At most ``window`` requests are in flight,
+    which bounds memory when the input outpaces the workers.
+
+    :param lines: Request lines; blank lines are skipped.
+    :param write: Called with each answer line; calls are never concurrent.
+    :param executor: Pool to answer on, or ``None`` to answer in order in-process.
+    :param window: Most requests submitted but not yet written.
+    :returns: The number of requests answered.
+    """
+    requests = (line for line in lines if line.strip())
+    if executor is None:
+        count = 0
+        for line in requests:
+            write(answer_line(line, time.monotonic()))
+            count += 1
+        return count
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(window)
+
+    def deliver(line: str, future: Future[str]) -> None:
+        try:
+            answer = future.result()
+        except Exception as worker_error:
+            answer = json.dumps({"id": _request_id(line), "error": f"worker failed: {worker_error!r}"})
+        try:
+            with lock:
+                write(answer)
+        finally:
+            slots.release()
+
+    count = 0
+    for line in requests:
+        slots.acquire()
+        executor.submit(answer_line, line, time.monotonic()).add_done_callback(functools.partial(deliver, line))
+        count += 1
+    for _ in range(window):
+        slots.acquire()
+    return count
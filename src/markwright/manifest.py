@@ -0,0 +1,126 @@
+# ABOUTME: Content-hash manifests recording which inputs a tree run has already turned into current outputs.
+# Lets incremental modes skip a file whose bytes, extension selection, and markwright version are unchanged.
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+from pathlib import Path
+from typing import TypedDict
+
+from markwright._util import write_atomic
+
+# Default manifest file name, written at the root of the output tree.
+MANIFEST_NAME = ".mw-manifest.json"
+
+
+class ManifestEntry(TypedDict):
+    """What one input looked like when its output was last written.
+
+    :ivar hash: :func:`content_hash` of the input bytes.
+    :ivar selection: :func:`selection_key` of the step and extensions that ran.
+    """
+
+    hash: str
+    selection: str
+
+
+@functools.cache
+def markwright_version() -> str:
+    """Return the running markwright version that manifests are stamped with.
+
+    The distribution metadata is read on first use, so importing this module
+    stays cheap for commands that never write a manifest.
+
+    :returns: The version string for the ``markwright`` distribution.
+    """
+    from importlib.metadata import version
+
+    return version("markwright")
+
+
+def content_hash(data: bytes) -> str:
+    """Hash a file's bytes for change detection.
+
+    :param data: The file contents.
+    :returns: A hex digest; BLAKE2b hashes faster than SHA-256 on 64-bit machines.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def selection_key(step: str, names: list[str]) -> str:
+    """Describe the work a step does, so a changed selection invalidates its outputs.
+
+    :param step: The step that ran.
+    :param names: Selected extension names, in registry order.
+    :returns: A string such as ``"pre:youtube,fence"``.
+    """
+    return f"{step}:{','.join(names)}"
+
+
+def read_manifest(path: Path) -> dict[str, ManifestEntry]:
+    """Read a manifest written by :func:`save_manifest`, failing on anything else.
+
+    :param path: Manifest file.
+    :returns: Entries by input path.
+    :raises OSError: If the file cannot be read.
+    :raises ValueError: If the file is not a manifest or is from another
+        markwright version, which may have produced different output from the
+        same input.
+    """
+    try:
+        document = json.loads(path.read_bytes())
+    except ValueError:
+        raise ValueError(f"{path}: not a markwright manifest") from None
+    if not isinstance(document, dict) or not isinstance(document.get("files"), dict):
+        raise ValueError(f"{path}: not a markwright manifest")
+    if document.get("markwright") != markwright_version():
+        raise ValueError(f"{path}: written by markwright {document.get('markwright')}, not {markwright_version()}")
+    files: dict[str, ManifestEntry] = document["files"]
+    return files
+
+
+def load_manifest(path: Path) -> dict[str, ManifestEntry]:
+    """Read a manifest written by :func:`save_manifest`, starting afresh if it cannot be used.
+
+    :param path: Manifest file.
+    :returns: Entries by input path, or an empty mapping if the file is missing,
+        unreadable, or from another version.
+    """
+    if not path.is_file():
+        return {}
+    try:
+        return read_manifest(path)
+    except ValueError:
+        return {}
+
+
+def merge_manifests(paths: list[Path]) -> dict[str, ManifestEntry]:
+    """Combine the partial manifests that sharded runs wrote into one.
+
+    :param paths: Partial manifests, each read with :func:`read_manifest`.
+    :returns: Every entry of every manifest.
+    :raises OSError: If a manifest cannot be read.
+    :raises ValueError: If a manifest is unusable, or two manifests disagree
+        about the same input.
+    """
+    merged: dict[str, ManifestEntry] = {}
+    owners: dict[str, Path] = {}
+    for path in paths:
+        for key, entry in read_manifest(path).items():
+            if key in merged and merged[key] != entry:
+                raise ValueError(f"{key} differs between {owners[key]} and {path}")
+            merged[key] = entry
+            owners.setdefault(key, path)
+    return merged
+
+
+def save_manifest(path: Path, entries: dict[str, ManifestEntry]) -> None:
+    """Write a manifest atomically, stamped with the running markwright version.
+
+    :param path: Manifest file; its parent directories are created as needed.
+    :param entries: Entries by input path.
+    """
+    document = {"markwright": markwright_version(), "files": dict(sorted(entries.items()))}
+    write_atomic(path, json.dumps(document, indent=1) + "\n")
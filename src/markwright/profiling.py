@@ -0,0 +1,200 @@
+# ABOUTME: Profiler harness behind mw profile: runs one step under cProfile and tracemalloc.
+# Reports the top functions by cumulative time and the memory each markwright module held at the peak.
+
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import sys
+import tracemalloc
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from types import CodeType
+
+from markwright import build
+
+# Frames tracemalloc keeps per allocation by default. Each frame makes tracing
+# slower: on a 20k-line fence, render runs about 7x slower at depth 4 and 55x at
+# depth 16, so deep Pygments allocations are left unattributed unless asked for.
+TRACE_DEPTH = 4
+
+# Where blocks go whose kept frames include no markwright code.
+OUTSIDE = "(outside markwright)"
+
+# A new snapshot is taken once traced memory has grown this much past the last
+# one, so a steadily growing document costs a handful of snapshots, not thousands.
+_SNAPSHOT_GROWTH = 1.05
+
+_PACKAGE_DIR = str(Path(__file__).parent)
+
+# Blocks allocated by the sampling itself, left out of the report.
+_OWN_FRAMES = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+
+
+@dataclass(frozen=True, slots=True)
+class ModuleAllocation:
+    """Memory one markwright module held when traced memory peaked.
+
+    :ivar module: Dotted module name.
+    :ivar size: Bytes allocated under the module's frames and still live.
+    :ivar count: Number of those memory blocks.
+    :ivar top_line: ``file:line`` in the module holding the most of ``size``.
+    """
+
+    module: str
+    size: int
+    count: int
+    top_line: str
+
+
+@dataclass(frozen=True, slots=True)
+class ProfileReport:
+    """Outcome of :func:`profile_step`.
+
+    :ivar step: The step that ran.
+    :ivar repeat: Profiled runs of the step.
+    :ivar stats: Call statistics from the cProfile pass.
+    :ivar peak_bytes: Most memory traced at once during the tracemalloc pass.
+    :ivar allocations: Memory by module near the peak, largest first.
+    """
+
+    step: str
+    repeat: int
+    stats: pstats.Stats
+    peak_bytes: int
+    allocations: tuple[ModuleAllocation, ...]
+
+
+class _PeakSampler:
+    """Snapshot traced memory when a markwright function returns at a new high.
+
+    A function's locals are still alive when it returns, so the snapshot taken
+    there sees the intermediates that a snapshot after the step would have missed.
+    Create it once tracing has started.
+    The return event is switched off for every function outside markwright the
+    first time it fires, so Pygments and Python-Markdown run at full speed.
+    """
+
+    def __init__(self) -> None:
+        self.snapshot = tracemalloc.take_snapshot()
+        self._taken_at = 0
+
+    def __call__(self, code: CodeType, offset: int, value: object) -> object:
+        if not code.co_filename.startswith(_PACKAGE_DIR):
+            return sys.monitoring.DISABLE
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self._taken_at * _SNAPSHOT_GROWTH:
+            self.snapshot = tracemalloc.take_snapshot()
+            self._taken_at = current
+        return None
+
+
+def _module_name(filename: str) -> str:
+    """Turn a file inside the package into its dotted module name."""
+    relative = Path(filename).relative_to(_PACKAGE_DIR).with_suffix("")
+    parts = [part for part in relative.parts if part != "__init__"]
+    return ".".join(["markwright", *parts])
+
+
+def _allocations(snapshot: tracemalloc.Snapshot) -> tuple[ModuleAllocation, ...]:
+    """Charge every live block to the innermost markwright frame that allocated it.
+
+    :param snapshot: Snapshot taken with tracebacks.
+    :returns: Memory by module, largest first; blocks with no markwright frame
+        among those kept are charged to :data:`OUTSIDE`.
+    """
+    sizes: Counter[str] = Counter()
+    counts: Counter[str] = Counter()
+    lines: dict[str, Counter[str]] = {}
+    for trace in snapshot.filter_traces(_OWN_FRAMES).traces:
+        frame = next((frame for frame in reversed(trace.traceback) if frame.filename.startswith(_PACKAGE_DIR)), None)
+        if frame is None:
+            frame = trace.traceback[-1]
+            module = OUTSIDE
+        else:
+            module = _module_name(frame.filename)
+        sizes[module] += trace.size
+        counts[module] += 1
+        lines.setdefault(module, Counter())[f"{Path(frame.filename).name}:{frame.lineno}"] += trace.size
+    return tuple(
+        ModuleAllocation(module, size, counts[module], lines[module].most_common(1)[0][0])
+        for module, size in sizes.most_common()
+    )
+
+
+def profile_step(
+    step: str,
+    text: str,
+    names: list[str],
+    repeat: int = 1,
+    trace_depth: int = TRACE_DEPTH,
+) -> ProfileReport:
+    """Run one step under cProfile, then again under tracemalloc.
+
+    The step runs once unprofiled first, so compiling the pipeline and building
+    the Markdown instance stay out of both reports. The passes are separate
+    because tracing allocations slows every call the profiler times.
+
+    :param step: One of :data:`~markwright.build.BUILD_STEPS`.
+    :param text: The document.
+    :param names: Selected extension names, in registry order.
+    :param repeat: Profiled runs of the step, to gather enough samples on a small document.
+    :param trace_depth: Frames kept per allocation; more frames reach the
+        markwright caller of deeper allocations, at a steep cost in speed.
+    :returns: The call statistics and the memory report.
+    :raises ValueError: If the step or a name is not known, or ``repeat`` or
+        ``trace_depth`` is below one.
+    """
+    if step not in build.STEP_SUFFIXES:
+        raise ValueError(f"unknown step: {step!r}")
+    if repeat < 1:
+        raise ValueError(f"repeat must be at least 1, not {repeat}")
+    if trace_depth < 1:
+        raise ValueError(f"trace depth must be at least 1, not {trace_depth}")
+    build.transform(step, names, text)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for _ in range(repeat):
+        build.transform(step, names, text)
+    profiler.disable()
+    monitoring = sys.monitoring
+    monitoring.use_tool_id(monitoring.PROFILER_ID, "mw profile")
+    tracemalloc.start(trace_depth)
+    try:
+        sampler = _PeakSampler()
+        monitoring.register_callback(monitoring.PROFILER_ID, monitoring.events.PY_RETURN, sampler)
+        monitoring.set_events(monitoring.PROFILER_ID, monitoring.events.PY_RETURN)
+        build.transform(step, names, text)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        monitoring.set_events(monitoring.PROFILER_ID, 0)
+        monitoring.free_tool_id(monitoring.PROFILER_ID)
+    return ProfileReport(step, repeat, pstats.Stats(profiler), peak, _allocations(sampler.snapshot))
+
+
+def format_report(report: ProfileReport, top: int = 20) -> str:
+    """Lay a profile out as text.
+
+    :param report: The profile.
+    :param top: Functions and modules to list.
+    :returns: A summary line, the top functions by cumulative time, and the
+        memory by module.
+    """
+    buffer = io.StringIO()
+    report.stats.stream = buffer  # type: ignore[attr-defined]
+    report.stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
+    lines = [
+        f"mw profile {report.step}: {report.repeat} run(s), peak {report.peak_bytes / 1024:.0f} KiB traced",
+        buffer.getvalue().strip("\n"),
+        "",
+        "Memory held near the peak, by markwright module:",
+        f"{'module':<36} {'KiB':>9} {'blocks':>8}  top line",
+    ]
+    lines.extend(
+        f"{entry.module:<36} {entry.size / 1024:>9.1f} {entry.count:>8}  {entry.top_line}"
+        for entry in report.allocations[:top]
+    )
+    return "\n".join(lines)
@@ -1,27 +1,30 @@
 # ABOUTME: Declarative registry mapping each extension to its pre/post stage functions.
-# Drives select_extensions, run_pre, run_post, and describe for the mw CLI pipeline.
+# Drives select_extensions, compile, run_pre, run_post, the batch runners, and describe for the mw CLI pipeline.
 
 from __future__ import annotations
 
-from collections.abc import Callable
-from typing import TypedDict
-
-from markwright.codepen import apply_html as codepen_post
-from markwright.codepen import expand_source as codepen_pre
-from markwright.fence import apply_html as fence_post
-from markwright.fence import expand_source as fence_pre
-from markwright.highlight import apply_html as highlight_post
-from markwright.highlight import expand_source as highlight_pre
-from markwright.image_compare import expand_source as image_compare_pre
-from markwright.instagram import apply_html as instagram_post
-from markwright.instagram import expand_source as instagram_pre
-from markwright.slideshow import expand_source as slideshow_pre
-from markwright.twitter import apply_html as twitter_post
-from markwright.twitter import expand_source as twitter_pre
-from markwright.youtube import expand_source as youtube_pre
+import functools
+import mmap
+import time
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Literal, TypedDict
+
+from markwright._batch import map_documents
+from markwright._embed import EmbedRenderer, expand_embed_segments
+from markwright._scan import LiteralIndex
+from markwright._segment import Segment, join_segments, segment_source
+from markwright._stats import counting
+from markwright._util import Edit, apply_edits, sort_edits
 
 PreFn = Callable[[str], str]
 PostFn = Callable[[str, list[str] | None], str]
+EditFn = Callable[[str, list[str] | None], list[Edit]]
+SegmentFn = Callable[[list[Segment]], list[Segment]]
+ScanFn = Callable[[str, LiteralIndex, list[str] | None], list[Edit]]
+EmbedSpec = tuple[str, EmbedRenderer]
+ScanSpec = tuple[tuple[str, ...], ScanFn]
 
 
 class StageSpec(TypedDict):
@@ -31,28 +34,270 @@ class StageSpec(TypedDict):
     :ivar post: HTML-stage transform, or ``None`` if the extension has no post stage.
     :ivar pre_priority: Descending order key for the pre stage (higher runs first).
     :ivar post_priority: Descending order key for the post stage (higher runs first).
+    :ivar embed: ``(keyword, renderer)`` for a standalone ``[keyword ...]`` embed line,
+        or ``None``. Adjacent embed pre stages are fused into one pass over the segments.
+    :ivar pre_segments: Segment-level form of ``pre``, or ``None``. When present the
+        pipeline calls it on the shared segmentation of the source instead of ``pre``.
+    :ivar pre_triggers: Literals at least one of which must occur in the source for the
+        pre stage to have any effect; an empty tuple means the stage always runs.
+    :ivar post_triggers: Literals at least one of which must occur in the HTML for the
+        post stage to have any effect; an empty tuple means the stage always runs.
+    :ivar post_edits: Edit-list form of ``post``, or ``None``. When present the
+        pipeline calls it instead of ``post`` and materializes the returned
+        ``(offset, length, replacement)`` edits itself, in one pass.
+    :ivar post_scan: ``(literals, edits)`` for an edit-list form of ``post`` driven by a
+        :class:`~markwright._scan.LiteralIndex`, or ``None``. The pipeline indexes
+        every selected stage's triggers and scan literals in one pass per document,
+        and prefers this form over ``post_edits`` and ``post``.
+    :ivar bind: Factory returning a copy of the spec with its stage functions bound
+        to configuration options, or ``None`` if the extension takes no configuration.
     """
 
     pre: PreFn | None
     post: PostFn | None
     pre_priority: int
     post_priority: int
+    embed: EmbedSpec | None
+    pre_segments: SegmentFn | None
+    pre_triggers: tuple[str, ...]
+    post_triggers: tuple[str, ...]
+    post_edits: EditFn | None
+    post_scan: ScanSpec | None
+    bind: Callable[[Mapping[str, object]], StageSpec] | None
+
+
+def _embed_spec(keyword: str, expand: PreFn, renderer: EmbedRenderer) -> StageSpec:
+    """Build the spec of a pre-only ``[keyword ...]`` embed extension.
+
+    :param keyword: The embed keyword, which doubles as the pre-stage trigger.
+    :param expand: The extension's source-stage transform.
+    :param renderer: Renders one embed line, or returns ``None`` for other lines.
+    :returns: The stage spec.
+    """
+    return {
+        "pre": expand,
+        "post": None,
+        "pre_priority": 20,
+        "post_priority": 0,
+        "embed": (keyword, renderer),
+        "pre_segments": None,
+        "pre_triggers": (f"[{keyword}",),
+        "post_triggers": (),
+        "post_edits": None,
+        "post_scan": None,
+        "bind": None,
+    }
+
+
+def _script_embed_spec(
+    keyword: str,
+    expand: PreFn,
+    renderer: EmbedRenderer,
+    apply: PostFn,
+    signature: str,
+    script: str,
+    scan: ScanFn,
+) -> StageSpec:
+    """Build the spec of an embed extension that also injects its script after rendering.
+
+    :param keyword: The embed keyword, which doubles as the pre-stage trigger.
+    :param expand: The extension's source-stage transform.
+    :param renderer: Renders one embed line, or returns ``None`` for other lines.
+    :param apply: The extension's HTML-stage transform.
+    :param signature: Class signature marking a rendered embed; the post-stage trigger.
+    :param script: The script tag the post stage injects once.
+    :param scan: Index-driven edit form of ``apply``.
+    :returns: The stage spec.
+    """
+    return {
+        **_embed_spec(keyword, expand, renderer),
+        "post": apply,
+        "post_priority": 15,
+        "post_triggers": (signature,),
+        "post_scan": ((signature, script), scan),
+    }
+
+
+def _youtube() -> StageSpec:
+    """Import the YouTube extension and describe its stages."""
+    from markwright import youtube
+
+    return _embed_spec("youtube", youtube.expand_source, youtube._render_match)
+
+
+def _slideshow() -> StageSpec:
+    """Import the slideshow extension and describe its stages."""
+    from markwright import slideshow
+
+    return _embed_spec("slideshow", slideshow.expand_source, slideshow._render_match)
+
+
+def _image_compare() -> StageSpec:
+    """Import the image compare extension and describe its stages."""
+    from markwright import image_compare
+
+    return _embed_spec("compare", image_compare.expand_source, image_compare._render_match)
+
+
+def _codepen() -> StageSpec:
+    """Import the CodePen extension and describe its stages."""
+    from markwright import codepen
+
+    return _script_embed_spec(
+        "codepen",
+        codepen.expand_source,
+        codepen._render_match,
+        codepen.apply_html,
+        codepen.CODEPEN_SIGNATURE,
+        codepen.CODEPEN_SCRIPT,
+        codepen.script_edits,
+    )
+
+
+def _twitter() -> StageSpec:
+    """Import the Twitter extension and describe its stages."""
+    from markwright import twitter
+
+    return _script_embed_spec(
+        "twitter",
+        twitter.expand_source,
+        twitter._render_match,
+        twitter.apply_html,
+        twitter.TWITTER_SIGNATURE,
+        twitter.TWITTER_SCRIPT,
+        twitter.script_edits,
+    )
+
+
+def _instagram() -> StageSpec:
+    """Import the Instagram extension and describe its stages."""
+    from markwright import instagram
+
+    return _script_embed_spec(
+        "instagram",
+        instagram.expand_source,
+        instagram._render_match,
+        instagram.apply_html,
+        instagram.INSTAGRAM_SIGNATURE,
+        instagram.INSTAGRAM_SCRIPT,
+        instagram.script_edits,
+    )
+
+
+def _bind_fence(options: Mapping[str, object]) -> StageSpec:
+    """Return the fence spec with its stage functions bound to ``options``.
+
+    :param options: Fence options, as accepted by :func:`markwright.fence.bind_stages`.
+    :returns: A copy of the registered fence spec holding the bound functions.
+    :raises ValueError: If an option is unknown or has the wrong type.
+    """
+    from markwright import fence
+
+    expand, apply, edits, segments, scan = fence.bind_stages(options)
+    spec = REGISTRY["fence"].copy()
+    spec["pre"] = expand
+    spec["post"] = apply
+    spec["post_edits"] = edits
+    spec["pre_segments"] = segments
+    spec["post_scan"] = ((fence.MARKER_PREFIX,), scan)
+    return spec
+
+
+def _fence() -> StageSpec:
+    """Import the fence extension and describe its stages."""
+    from markwright import fence
+
+    return {
+        "pre": fence.expand_source,
+        "post": fence.apply_html,
+        "pre_priority": 40,
+        "post_priority": 25,
+        "embed": None,
+        "pre_segments": fence.expand_segments,
+        "pre_triggers": ("```", "~~~"),
+        "post_triggers": (fence.MARKER_PREFIX,),
+        "post_edits": fence.marker_edits,
+        "post_scan": ((fence.MARKER_PREFIX,), fence.scan_edits),
+        "bind": _bind_fence,
+    }
+
+
+def _highlight() -> StageSpec:
+    """Import the highlight extension and describe its stages."""
+    from markwright import highlight
+
+    return {
+        "pre": highlight.expand_source,
+        "post": highlight.apply_html,
+        "pre_priority": 10,
+        "post_priority": 25,
+        "embed": None,
+        "pre_segments": highlight.highlight_segments,
+        "pre_triggers": ("<^>",),
+        "post_triggers": (highlight.ESCAPED_MARKER,),
+        "post_edits": highlight.highlight_edits,
+        "post_scan": ((highlight.ESCAPED_MARKER,), highlight.scan_edits),
+        "bind": None,
+    }
+
+
+class _Registry(Mapping[str, StageSpec]):
+    """Registered extensions by name, importing each extension's module on first lookup.
+
+    Membership and iteration need only the names, so selecting and validating
+    extensions imports nothing; a process that runs one extension never imports
+    the other seven.
+
+    :param loaders: Spec factory for each extension, in registry order.
+    """
+
+    def __init__(self, loaders: dict[str, Callable[[], StageSpec]]) -> None:
+        self._loaders = loaders
+        self._specs: dict[str, StageSpec] = {}
+
+    def __getitem__(self, name: str) -> StageSpec:
+        spec = self._specs.get(name)
+        if spec is None:
+            spec = self._specs[name] = self._loaders[name]()
+        return spec
 
+    def __contains__(self, name: object) -> bool:
+        return name in self._loaders
 
-REGISTRY: dict[str, StageSpec] = {
-    "youtube": {"pre": youtube_pre, "post": None, "pre_priority": 20, "post_priority": 0},
-    "slideshow": {"pre": slideshow_pre, "post": None, "pre_priority": 20, "post_priority": 0},
-    "image_compare": {"pre": image_compare_pre, "post": None, "pre_priority": 20, "post_priority": 0},
-    "codepen": {"pre": codepen_pre, "post": codepen_post, "pre_priority": 20, "post_priority": 15},
-    "twitter": {"pre": twitter_pre, "post": twitter_post, "pre_priority": 20, "post_priority": 15},
-    "instagram": {"pre": instagram_pre, "post": instagram_post, "pre_priority": 20, "post_priority": 15},
-    "fence": {"pre": fence_pre, "post": fence_post, "pre_priority": 40, "post_priority": 25},
-    "highlight": {"pre": highlight_pre, "post": highlight_post, "pre_priority": 10, "post_priority": 25},
-}
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._loaders)
+
+    def __len__(self) -> int:
+        return len(self._loaders)
+
+
+REGISTRY: Mapping[str, StageSpec] = _Registry(
+    {
+        "youtube": _youtube,
+        "slideshow": _slideshow,
+        "image_compare": _image_compare,
+        "codepen": _codepen,
+        "twitter": _twitter,
+        "instagram": _instagram,
+        "fence": _fence,
+        "highlight": _highlight,
+    }
+)
 
 EXTENSION_NAMES: tuple[str, ...] = tuple(REGISTRY)
 
 
+def require_registered(names: Iterable[str]) -> None:
+    """Check that every name is a registered extension.
+
+    :param names: Extension names to check.
+    :raises ValueError: Naming the first unregistered name.
+    """
+    for name in names:
+        if name not in REGISTRY:
+            raise ValueError(f"unknown extension: {name!r}")
+
+
 def select_extensions(use: list[str], exclude: list[str]) -> list[str]:
     """Resolve the active extension set from ``use`` and ``exclude`` filters.
 
@@ -64,9 +309,7 @@ def select_extensions(use: list[str], exclude: list[str]) -> list[str]:
     :returns: Selected extension names in registry order.
     :raises ValueError: If any name in ``use`` or ``exclude`` is not registered.
     """
-    for name in [*use, *exclude]:
-        if name not in REGISTRY:
-            raise ValueError(f"unknown extension: {name!r}")
+    require_registered([*use, *exclude])
     included = use if use else list(EXTENSION_NAMES)
     return [name for name in EXTENSION_NAMES if name in included and name not in exclude]
 
@@ -87,33 +330,542 @@ def _ordered(
     return sorted(selected, key=lambda name: get_priority(REGISTRY[name]), reverse=True)
 
 
-def run_pre(text: str, names: list[str]) -> str:
+def _triggered(text: str, triggers: tuple[str, ...]) -> bool:
+    """Report whether a stage with the given trigger literals could change ``text``.
+
+    :param text: The current source or HTML.
+    :param triggers: The stage's trigger literals; empty means it always runs.
+    :returns: ``True`` if ``triggers`` is empty or any trigger occurs in ``text``.
+    """
+    return not triggers or any(trigger in text for trigger in triggers)
+
+
+@dataclass(frozen=True, slots=True)
+class PreStage:
+    """A resolved pre stage with its configuration already bound.
+
+    :ivar name: Extension name.
+    :ivar run: Source-stage transform.
+    :ivar triggers: Trigger literals gating the stage (empty means always run).
+    :ivar embed: ``(keyword, renderer)`` if the stage joins the fused embed pass.
+    :ivar segments: Segment-level form of ``run``, preferred when present.
+    """
+
+    name: str
+    run: PreFn
+    triggers: tuple[str, ...]
+    embed: EmbedSpec | None
+    segments: SegmentFn | None
+
+
+@dataclass(frozen=True, slots=True)
+class PostStage:
+    """A resolved post stage with its configuration already bound.
+
+    :ivar name: Extension name.
+    :ivar run: HTML-stage transform.
+    :ivar triggers: Trigger literals gating the stage (empty means always run).
+    :ivar edits: Edit-list form of ``run``, preferred when present.
+    :ivar scan: Index-driven edit-list form of ``run``, preferred over ``edits``.
+    """
+
+    name: str
+    run: PostFn
+    triggers: tuple[str, ...]
+    edits: EditFn | None
+    scan: ScanFn | None
+
+
+@dataclass(frozen=True, slots=True)
+class StageRun:
+    """What one stage did to one document, as collected through a ``stats`` list.
+
+    :ivar name: Extension name; a fused embed pass joins its extensions' names with ``+``.
+    :ivar seconds: Wall-clock time the stage took.
+    :ivar input_size: Characters the stage received.
+    :ivar output_size: Characters the stage returned.
+    :ivar counts: What the stage did, by event name, such as ``{"markers_applied": 2}``.
+    """
+
+    name: str
+    seconds: float
+    input_size: int
+    output_size: int
+    counts: dict[str, int]
+
+
+def _segments_size(segments: list[Segment]) -> int:
+    """Total characters held by ``segments``."""
+    return sum(len(segment.text) for segment in segments)
+
+
+def _timed[T](
+    stats: list[StageRun] | None,
+    name: str,
+    size: Callable[[T], int],
+    run: Callable[[T], T],
+    value: T,
+) -> T:
+    """Run one stage, recording its time, sizes, and counted events if ``stats`` is given.
+
+    :param stats: Optional list the stage's :class:`StageRun` is appended to.
+    :param name: Name to record the stage under.
+    :param size: Measures the stage's input and output.
+    :param run: The stage.
+    :param value: The stage's input.
+    :returns: The stage's output.
+    """
+    if stats is None:
+        return run(value)
+    input_size = size(value)
+    with counting() as counts:
+        started = time.perf_counter()
+        result = run(value)
+        seconds = time.perf_counter() - started
+    stats.append(StageRun(name, seconds, input_size, size(result), dict(counts)))
+    return result
+
+
+@dataclass(frozen=True, slots=True)
+class Pipeline:
+    """An immutable, pre-resolved selection of stages ready to run many documents.
+
+    Built by :func:`compile`. Stage selection, priority ordering, and configuration
+    binding all happen once at construction; :meth:`pre` and :meth:`post` only loop
+    over the stored stages, so a long-lived worker can reuse one instance for every
+    document it processes.
+
+    :ivar names: Selected extension names in registry order.
+    :ivar pre_stages: Pre stages in descending priority order.
+    :ivar post_stages: Post stages in descending priority order.
+    :ivar post_literals: Every literal the post stages trigger on or scan for, each
+        listed once; :meth:`post` indexes them in one pass per document.
+    """
+
+    names: tuple[str, ...]
+    pre_stages: tuple[PreStage, ...]
+    post_stages: tuple[PostStage, ...]
+    post_literals: tuple[str, ...]
+
+    def pre(self, text: str, skipped: list[str] | None = None, stats: list[StageRun] | None = None) -> str:
+        """Apply every pre stage to ``text``.
+
+        The trigger prefilter runs first, against the original source, and a stage
+        whose triggers do not occur is skipped without running. If any stage is
+        left, the source is segmented once into prose, code, and embed-line
+        segments and every remaining stage transforms those segments; the text is
+        joined back together once at the end. Consecutive embed stages are fused
+        into a single pass over the embed-line segments. A stage with no segment
+        form runs on the joined text, which is then segmented again for the stages
+        after it.
+
+        :param text: Markdown source text.
+        :param skipped: Optional list collecting the names of stages the trigger
+            prefilter skipped.
+        :param stats: Optional list collecting a :class:`StageRun` for every stage
+            that ran, with sizes measured over the segments' text.
+        :returns: Source text after every pre stage has run.
+        """
+        active: list[PreStage] = []
+        for stage in self.pre_stages:
+            if _triggered(text, stage.triggers):
+                active.append(stage)
+            elif skipped is not None:
+                skipped.append(stage.name)
+        if not active:
+            return text
+        keywords = [stage.embed[0] for stage in active if stage.embed is not None]
+        segments = segment_source(text, keywords)
+        renderers: dict[str, EmbedRenderer] = {}
+        fused: list[str] = []
+        for stage in active:
+            if stage.embed is not None:
+                keyword, renderer = stage.embed
+                renderers[keyword] = renderer
+                fused.append(stage.name)
+                continue
+            if renderers:
+                expand = functools.partial(expand_embed_segments, renderers=renderers)
+                segments = _timed(stats, "+".join(fused), _segments_size, expand, segments)
+                renderers = {}
+                fused = []
+            if stage.segments is not None:
+                segments = _timed(stats, stage.name, _segments_size, stage.segments, segments)
+            else:
+                expanded = _timed(stats, stage.name, len, stage.run, join_segments(segments))
+                segments = segment_source(expanded, keywords)
+        if renderers:
+            expand = functools.partial(expand_embed_segments, renderers=renderers)
+            segments = _timed(stats, "+".join(fused), _segments_size, expand, segments)
+        return join_segments(segments)
+
+    def post(
+        self,
+        html: str,
+        warnings: list[str] | None = None,
+        skipped: list[str] | None = None,
+        stats: list[StageRun] | None = None,
+    ) -> str:
+        """Apply every post stage to ``html``.
+
+        Every stage's literals are located once, up front, in a
+        :class:`~markwright._scan.LiteralIndex`. A stage whose triggers have no
+        occurrence is skipped without running. A stage with a scan form reads the
+        offsets it needs from the index instead of searching the HTML, and returns
+        ``(offset, length, replacement)`` edits; so does a stage speaking the plain
+        edit-list protocol. Edits are checked for overlap and merged into the HTML
+        in a single pass, and the index is carried across them by searching only
+        the edited spans. A stage with neither form runs on the HTML directly and
+        the index is rebuilt after it.
+
+        :param html: Rendered HTML.
+        :param warnings: Optional list collecting skip reasons from stages that validate markers.
+        :param skipped: Optional list collecting the names of stages the trigger
+            prefilter skipped.
+        :param stats: Optional list collecting a :class:`StageRun` for every stage that ran.
+        :returns: HTML after every post stage has run.
+        """
+        state = (html, LiteralIndex.build(html, self.post_literals))
+        for stage in self.post_stages:
+            if stage.triggers and not state[1].contains_any(stage.triggers):
+                if skipped is not None:
+                    skipped.append(stage.name)
+                continue
+            run = functools.partial(self._post_stage, stage, warnings=warnings)
+            state = _timed(stats, stage.name, lambda current: len(current[0]), run, state)
+        return state[0]
+
+    def _post_stage(
+        self,
+        stage: PostStage,
+        state: tuple[str, LiteralIndex],
+        warnings: list[str] | None,
+    ) -> tuple[str, LiteralIndex]:
+        """Run one post stage and carry the literal index across its changes.
+
+        :param stage: The stage.
+        :param state: The HTML and its index.
+        :param warnings: Optional list collecting skip reasons.
+        :returns: The stage's HTML and its index.
+        """
+        html, index = state
+        if stage.scan is not None:
+            edits = stage.scan(html, index, warnings)
+        elif stage.edits is not None:
+            edits = stage.edits(html, warnings)
+        else:
+            html = stage.run(html, warnings)
+            return html, LiteralIndex.build(html, self.post_literals)
+        ordered = sort_edits(edits, len(html))
+        html = apply_edits(html, ordered)
+        return html, index.remap(html, ordered)
+
+    def roundtrip(self, text: str, render: Callable[[str], str], warnings: list[str] | None = None) -> str:
+        """Run the full pre, external render, post pipeline on ``text``.
+
+        :param text: Markdown source text.
+        :param render: The external renderer turning pre-stage output into HTML.
+        :param warnings: Optional list collecting skip reasons from the post stage.
+        :returns: Final HTML.
+        """
+        return self.post(render(self.pre(text)), warnings)
+
+
+def compile(names: list[str], config: Mapping[str, Mapping[str, object]] | None = None) -> Pipeline:
+    """Resolve, order, and bind the selected stages into a reusable :class:`Pipeline`.
+
+    :param names: Selected extension names, typically from :func:`select_extensions`.
+    :param config: Optional per-extension options keyed by extension name, such as
+        ``{"fence": {"label_class": "label"}}``. Options for extensions outside
+        ``names`` are ignored.
+    :returns: An immutable pipeline holding the bound stage functions.
+    :raises ValueError: If a name is not registered, or an extension is given options
+        it does not accept.
+    """
+    config = config or {}
+    require_registered([*names, *config])
+    bound: dict[str, StageSpec] = {}
+    for name in names:
+        spec = REGISTRY[name]
+        options = config.get(name)
+        if options is None:
+            bound[name] = spec
+        elif spec["bind"] is None:
+            raise ValueError(f"extension {name!r} takes no configuration")
+        else:
+            bound[name] = spec["bind"](options)
+    pre_stages: list[PreStage] = []
+    for name in _ordered(names, lambda spec: spec["pre"], lambda spec: spec["pre_priority"]):
+        spec = bound[name]
+        pre_fn = spec["pre"]
+        assert pre_fn is not None
+        pre_stages.append(PreStage(name, pre_fn, spec["pre_triggers"], spec["embed"], spec["pre_segments"]))
+    post_stages: list[PostStage] = []
+    post_literals: list[str] = []
+    for name in _ordered(names, lambda spec: spec["post"], lambda spec: spec["post_priority"]):
+        spec = bound[name]
+        post_fn = spec["post"]
+        assert post_fn is not None
+        scan_literals, scan_fn = spec["post_scan"] or ((), None)
+        post_stages.append(PostStage(name, post_fn, spec["post_triggers"], spec["post_edits"], scan_fn))
+        post_literals.extend([*spec["post_triggers"], *scan_literals])
+    selected = tuple(name for name in EXTENSION_NAMES if name in names)
+    return Pipeline(selected, tuple(pre_stages), tuple(post_stages), tuple(dict.fromkeys(post_literals)))
+
+
+@functools.cache
+def _default_pipeline(names: frozenset[str]) -> Pipeline:
+    """Return the unconfigured pipeline for a selection, compiling it on first use.
+
+    :param names: Selected extension names.
+    :returns: The cached :class:`Pipeline` for ``names``.
+    """
+    return compile(list(names))
+
+
+def run_pre(
+    text: str,
+    names: list[str],
+    skipped: list[str] | None = None,
+    stats: list[StageRun] | None = None,
+) -> str:
     """Apply each selected pre-stage transform to ``text`` in descending priority order.
 
+    A convenience over :meth:`Pipeline.pre` that reuses one cached pipeline per
+    distinct selection.
+
     :param text: Markdown source text.
     :param names: Selected extension names.
+    :param skipped: Optional list collecting the names of stages the trigger
+        prefilter skipped.
+    :param stats: Optional list collecting a :class:`StageRun` for every stage that ran.
     :returns: Source text after every selected pre stage has run.
     """
-    for name in _ordered(names, lambda spec: spec["pre"], lambda spec: spec["pre_priority"]):
-        pre_fn = REGISTRY[name]["pre"]
-        assert pre_fn is not None
-        text = pre_fn(text)
-    return text
+    return _default_pipeline(frozenset(names)).pre(text, skipped, stats)
 
 
-def run_post(html: str, names: list[str], warnings: list[str] | None = None) -> str:
+def run_post(
+    html: str,
+    names: list[str],
+    warnings: list[str] | None = None,
+    skipped: list[str] | None = None,
+    stats: list[StageRun] | None = None,
+) -> str:
     """Apply each selected post-stage transform to ``html`` in descending priority order.
 
+    A convenience over :meth:`Pipeline.post` that reuses one cached pipeline per
+    distinct selection.
+
     :param html: Rendered HTML.
     :param names: Selected extension names.
     :param warnings: Optional list collecting skip reasons from stages that validate markers.
+    :param skipped: Optional list collecting the names of stages the trigger
+        prefilter skipped.
+    :param stats: Optional list collecting a :class:`StageRun` for every stage that ran.
     :returns: HTML after every selected post stage has run.
     """
-    for name in _ordered(names, lambda spec: spec["post"], lambda spec: spec["post_priority"]):
-        post_fn = REGISTRY[name]["post"]
-        assert post_fn is not None
-        html = post_fn(html, warnings)
-    return html
+    return _default_pipeline(frozenset(names)).post(html, warnings, skipped, stats)
+
+
+@functools.cache
+def _trigger_bytes(names: frozenset[str], step: Literal["pre", "post"]) -> tuple[bytes, ...] | None:
+    """Return the UTF-8 trigger literals of a selection's stages, compiling it on first use.
+
+    :param names: Selected extension names.
+    :param step: ``"pre"`` or ``"post"``.
+    :returns: Every trigger of the step's stages, each listed once, or ``None``
+        if one of them has no triggers and so always runs.
+    """
+    pipeline = _default_pipeline(names)
+    stages: tuple[PreStage | PostStage, ...] = pipeline.pre_stages if step == "pre" else pipeline.post_stages
+    if any(not stage.triggers for stage in stages):
+        return None
+    return tuple(dict.fromkeys(trigger.encode() for stage in stages for trigger in stage.triggers))
+
+
+def could_change(data: bytes | mmap.mmap, step: Literal["pre", "post"], names: list[str]) -> bool:
+    """Report whether any selected stage could change a UTF-8 encoded document.
+
+    The byte-level form of the trigger prefilter: the triggers are searched for
+    in the raw bytes, so a document none of them occurs in can go out as it came
+    in without being decoded. No UTF-8 character's encoding starts inside
+    another's, so a trigger occurs in the bytes exactly when it occurs in the
+    decoded text.
+
+    :param data: The encoded document, or a map of the file holding it.
+    :param step: ``"pre"`` or ``"post"``.
+    :param names: Selected extension names.
+    :returns: ``False`` if :func:`run_pre` or :func:`run_post` would return the
+        document unchanged without running a stage.
+    """
+    triggers = _trigger_bytes(frozenset(names), step)
+    return triggers is None or any(data.find(trigger) != -1 for trigger in triggers)
+
+
+# What the prescan behind largest-first scheduling charges for the work in a
+# Markdown source, in bytes of plain prose, by step: ``(embed, fenced line)``.
+# Measured per step, a fenced line costs about the same whatever its width,
+# since the fence stage and the highlighter work line by line, and an embed costs
+# a pre run far more than its size but a render run, where prose is slow, little.
+# The post stages cost about the same per byte of HTML whatever it holds, so a
+# post document costs its size.
+_SOURCE_WEIGHTS: dict[str, tuple[int, int]] = {"pre": (2048, 192), "render": (96, 96)}
+
+# Sources smaller than this cost their size without a scan. Scanning one takes
+# about as long as the pre step on it, and a page this small cannot hold enough
+# work to end up last behind a long one.
+PRESCAN_MIN_BYTES = 16 * 1024
+
+
+@functools.cache
+def _embed_keywords(names: frozenset[str]) -> tuple[bytes, ...]:
+    """Return the opening brackets of a selection's embeds, such as ``b"[youtube"``.
+
+    :param names: Selected extension names.
+    :returns: One literal per embed stage in the selection.
+    """
+    return tuple(
+        f"[{stage.embed[0]}".encode() for stage in _default_pipeline(names).pre_stages if stage.embed is not None
+    )
+
+
+def _find_all(data: bytes | mmap.mmap, literal: bytes) -> Iterator[int]:
+    """Yield the offset of every non-overlapping occurrence of ``literal`` in ``data``.
+
+    :param data: The bytes to search, or a map of a file.
+    :param literal: The bytes to find.
+    :returns: An iterator of offsets, in increasing order.
+    """
+    position = data.find(literal)
+    while position != -1:
+        yield position
+        position = data.find(literal, position + len(literal))
+
+
+def document_cost(data: str | bytes | mmap.mmap, step: Literal["pre", "post", "render"], names: list[str]) -> int:
+    """Estimate how long a step will take on a document, for largest-first scheduling.
+
+    A Markdown source of at least :data:`PRESCAN_MIN_BYTES` costs its size, plus
+    a weight for every embed and for every line between a pair of fence
+    delimiters; a smaller one, and any HTML, costs its size. The raw bytes are
+    searched with ``find``, one literal at a time, which runs far faster than
+    the stages themselves. The estimate only has to rank documents, so an embed
+    counts even inside a fence, a fence left open runs to the end, and a closing
+    delimiter need not match its opener.
+
+    :param data: The document, its UTF-8 encoding, or a map of the file holding it.
+    :param step: The step that will run: ``"pre"`` or ``"render"`` on a Markdown
+        source, or ``"post"`` on HTML.
+    :param names: Selected extension names.
+    :returns: The estimated cost, in bytes of plain prose.
+    """
+    if isinstance(data, str):
+        data = data.encode()
+    cost = len(data)
+    if step == "post" or cost < PRESCAN_MIN_BYTES:
+        return cost
+    embed_cost, line_cost = _SOURCE_WEIGHTS[step]
+    for keyword in _embed_keywords(frozenset(names)):
+        cost += embed_cost * sum(1 for _ in _find_all(data, keyword))
+    delimiters = sorted(
+        position
+        for literal in (b"```", b"~~~")
+        for position in _find_all(data, literal)
+        # A delimiter opens a line, after at most some indentation.
+        if not data[data.rfind(b"\n", 0, position) + 1 : position].strip(b" \t")
+    )
+    delimiters.append(len(data))
+    for opener, closer in zip(delimiters[0::2], delimiters[1::2], strict=False):
+        cost += line_cost * data[opener:closer].count(b"\n")
+    return cost
+
+
+def _pre_one(names: frozenset[str], text: str) -> str:
+    """Run the pre stages on one document; the picklable unit of :func:`run_pre_many`.
+
+    :param names: Selected extension names.
+    :param text: Markdown source text.
+    :returns: Source text after every selected pre stage has run.
+    """
+    return _default_pipeline(names).pre(text)
+
+
+def _post_one(names: frozenset[str], html: str) -> tuple[str, list[str]]:
+    """Run the post stages on one document; the picklable unit of :func:`run_post_many`.
+
+    :param names: Selected extension names.
+    :param html: Rendered HTML.
+    :returns: ``(html, warnings)`` for the document.
+    """
+    warnings: list[str] = []
+    return _default_pipeline(names).post(html, warnings), warnings
+
+
+def run_pre_many(
+    texts: Iterable[str],
+    names: list[str],
+    *,
+    executor: Executor | None = None,
+    backend: str = "auto",
+    max_workers: int | None = None,
+    chunksize: int | None = None,
+) -> list[str]:
+    """Apply the selected pre stages to many documents across a worker pool.
+
+    Each worker compiles the selection once and reuses it for every document it
+    receives. The documents are ranked by :func:`document_cost` and dispatched
+    costliest first, so a long page never starts last. A batch of one document,
+    or a single worker, runs in-process without starting a pool.
+
+    :param texts: Markdown source documents.
+    :param names: Selected extension names.
+    :param executor: Optional executor to run on instead of a fresh pool; it is
+        not shut down.
+    :param backend: Pool to start when no executor is given: ``"process"``,
+        ``"thread"``, ``"interpreter"`` (subinterpreters), or ``"auto"`` (threads
+        on a free-threaded build, processes otherwise).
+    :param max_workers: Workers for the managed pool; defaults to the CPUs this
+        process may use.
+    :param chunksize: Documents sent to a worker per task; by default each task
+        holds about half of one worker's share of the estimated cost not yet planned.
+    :returns: The transformed documents, in input order.
+    :raises ValueError: If a name or the backend is not known.
+    """
+    require_registered(names)
+    cost = functools.partial(document_cost, step="pre", names=names)
+    return map_documents(_pre_one, texts, names, executor, backend, max_workers, chunksize, cost)
+
+
+def run_post_many(
+    htmls: Iterable[str],
+    names: list[str],
+    *,
+    executor: Executor | None = None,
+    backend: str = "auto",
+    max_workers: int | None = None,
+    chunksize: int | None = None,
+) -> list[tuple[str, list[str]]]:
+    """Apply the selected post stages to many documents across a worker pool.
+
+    The batch form of :func:`run_post`; see :func:`run_pre_many` for how work is
+    distributed.
+
+    :param htmls: Rendered HTML documents.
+    :param names: Selected extension names.
+    :param executor: Optional executor to run on instead of a fresh pool; it is
+        not shut down.
+    :param backend: Pool to start when no executor is given; see :func:`run_pre_many`.
+    :param max_workers: Workers for the managed pool; defaults to the CPUs this
+        process may use.
+    :param chunksize: Documents sent to a worker per task; by default each task
+        holds about half of one worker's share of the estimated cost not yet planned.
+    :returns: ``(html, warnings)`` per document, in input order, where
+        ``warnings`` holds that document's skip reasons.
+    :raises ValueError: If a name or the backend is not known.
+    """
+    require_registered(names)
+    # A post document costs its size, so the encoding need not be made to measure it.
+    return map_documents(_post_one, htmls, names, executor, backend, max_workers, chunksize, len)
 
 
 def describe() -> list[tuple[str, list[str]]]:
@@ -131,3 +883,16 @@ def describe() -> list[tuple[str, list[str]]]:
             stages.append("post")
         described.append((name, stages))
     return described
+
+
+def skip_summary(stage: str, names: list[str], skipped: list[str]) -> str:
+    """Describe how many selected stages the trigger prefilter skipped.
+
+    :param stage: ``"pre"`` or ``"post"``, naming the stage that ran.
+    :param names: Selected extension names.
+    :param skipped: Names of the stages that were skipped.
+    :returns: A one-line summary such as ``mw post: skipped 1 of 5 stages: fence``.
+    """
+    total = sum(1 for name, stages in describe() if name in names and stage in stages)
+    summary = f"mw {stage}: skipped {len(skipped)} of {total} stages"
+    return f"{summary}: {', '.join(skipped)}" if skipped else summary
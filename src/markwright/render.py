@@ -0,0 +1,125 @@
+# ABOUTME: In-process Markdown rendering with the site stack plus the selected markwright extensions.
+# Backs mw render and render_many, reusing one configured Markdown instance per selection and thread.
+
+from __future__ import annotations
+
+import functools
+import threading
+from collections.abc import Iterable
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING
+
+from markwright import registry
+from markwright._batch import map_documents
+
+if TYPE_CHECKING:
+    import markdown
+
+# The renderer stack the site uses around the markwright extensions, so fence and
+# highlight render exactly as they do in production.
+SITE_EXTENSIONS = ("pymdownx.superfences", "pymdownx.highlight")
+SITE_EXTENSION_CONFIGS: dict[str, dict[str, object]] = {"pymdownx.highlight": {"pygments_lang_class": True}}
+
+# A Markdown instance keeps per-document state (the HTML stash, reference links),
+# so instances are cached per thread and reset before every conversion.
+_thread_state = threading.local()
+
+
+def build_markdown(names: list[str]) -> markdown.Markdown:
+    """Build a ``markdown.Markdown`` configured with the site stack and ``names``.
+
+    :param names: Selected extension names, in registry order.
+    :returns: A fresh Markdown instance.
+    """
+    # Imported here so the pre and post paths, which never render, skip loading Markdown.
+    import markdown
+
+    return markdown.Markdown(
+        extensions=[*SITE_EXTENSIONS, *(f"markwright.{name}" for name in names)],
+        extension_configs=SITE_EXTENSION_CONFIGS,
+    )
+
+
+def _selection(names: list[str]) -> frozenset[str]:
+    """Validate a selection of extension names.
+
+    :param names: Selected extension names; an empty list selects none.
+    :returns: The names as a set.
+    :raises ValueError: If a name is not registered.
+    """
+    registry.require_registered(names)
+    return frozenset(names)
+
+
+def _markdown_for(names: frozenset[str]) -> markdown.Markdown:
+    """Return this thread's Markdown instance for a selection, building it on first use.
+
+    :param names: Selected extension names.
+    :returns: The cached instance, reset and ready to convert.
+    """
+    instances: dict[frozenset[str], markdown.Markdown] = _thread_state.__dict__.setdefault("instances", {})
+    instance = instances.get(names)
+    if instance is None:
+        ordered = [name for name in registry.EXTENSION_NAMES if name in names]
+        instance = instances[names] = build_markdown(ordered)
+    instance.reset()
+    return instance
+
+
+def render(text: str, names: list[str]) -> str:
+    """Render Markdown source to final HTML in-process.
+
+    The configured instance is built once per selection and thread, so repeated
+    calls skip extension loading.
+
+    :param text: Markdown source text.
+    :param names: Selected extension names.
+    :returns: The rendered HTML.
+    :raises ValueError: If a name is not registered.
+    """
+    return _markdown_for(_selection(names)).convert(text)
+
+
+def _render_one(names: frozenset[str], text: str) -> str:
+    """Render one document; the picklable unit of :func:`render_many`.
+
+    :param names: Selected extension names.
+    :param text: Markdown source text.
+    :returns: The rendered HTML.
+    """
+    return _markdown_for(names).convert(text)
+
+
+def render_many(
+    texts: Iterable[str],
+    names: list[str],
+    *,
+    executor: Executor | None = None,
+    backend: str = "auto",
+    max_workers: int | None = None,
+    chunksize: int | None = None,
+) -> list[str]:
+    """Render many Markdown documents to final HTML across a worker pool.
+
+    Each worker imports Markdown and the extensions once and reuses its configured
+    instance for every document it receives. See
+    :func:`~markwright.registry.run_pre_many` for the pool options and the
+    costliest-first dispatch; the
+    ``"interpreter"`` backend gives parallel rendering on the standard build with
+    less memory per worker than processes.
+
+    :param texts: Markdown source documents.
+    :param names: Selected extension names.
+    :param executor: Optional executor to run on instead of a fresh pool; it is
+        not shut down.
+    :param backend: Pool to start when no executor is given.
+    :param max_workers: Workers for the managed pool; defaults to the CPUs this
+        process may use.
+    :param chunksize: Documents sent to a worker per task; by default each task
+        holds about half of one worker's share of the estimated cost not yet planned.
+    :returns: The rendered HTML documents, in input order.
+    :raises ValueError: If a name or the backend is not known.
+    """
+    selection = list(_selection(names))
+    cost = functools.partial(registry.document_cost, step="render", names=selection)
+    return map_documents(_render_one, texts, selection, executor, backend, max_workers, chunksize, cost)
@@ -0,0 +1,133 @@
+# ABOUTME: The mw serve daemon: answers pre/post/render requests over a Unix domain socket.
+# Keeps the compiled pipelines and configured Markdown instances warm across requests on a fixed thread pool.
+
+from __future__ import annotations
+
+import errno
+import os
+import socket
+import socketserver
+import stat
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from markwright import registry, render
+from markwright._framing import read_message, write_message
+
+SERVE_STEPS = ("pre", "post", "render")
+
+
+def answer(request: Mapping[str, Any], text: str) -> tuple[int, str, str]:
+    """Run one request the way the matching ``mw`` filter would.
+
+    The request carries ``step`` (``"pre"``, ``"post"``, or ``"render"``), the
+    ``use`` and ``exclude`` selection lists, and the ``warn`` and
+    ``report_skips`` flags.
+
+    :param request: The decoded request header.
+    :param text: The document.
+    :returns: ``(exit_code, output, stderr)``, as the filter would have produced them.
+    """
+    step = request.get("step")
+    if step not in SERVE_STEPS:
+        return 2, "", f"mw serve: unknown step: {step!r}\n"
+    try:
+        names = registry.select_extensions(list(request.get("use", [])), list(request.get("exclude", [])))
+    except ValueError as selection_error:
+        return 2, "", f"{selection_error}\n"
+    if step == "render":
+        return 0, render.render(text, names), ""
+    warnings: list[str] = []
+    skipped: list[str] = []
+    if step == "pre":
+        output = registry.run_pre(text, names, skipped)
+    else:
+        output = registry.run_post(text, names, warnings, skipped)
+    report = warnings if request.get("warn") else []
+    if request.get("report_skips"):
+        report.append(registry.skip_summary(step, names, skipped))
+    return 0, output, "".join(f"{line}\n" for line in report)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Answer every request on one connection until the client hangs up."""
+
+    def handle(self) -> None:
+        while True:
+            try:
+                message = read_message(self.rfile)
+            except ValueError as protocol_error:
+                write_message(self.wfile, {"exit": 2, "stderr": f"mw serve: bad request: {protocol_error}\n"}, "")
+                return
+            if message is None:
+                return
+            exit_code, output, errors = answer(*message)
+            write_message(self.wfile, {"exit": exit_code, "stderr": errors}, output)
+
+
+def _claim_socket_path(path: str) -> None:
+    """Remove a stale socket left at ``path`` by a daemon that did not shut down cleanly.
+
+    :param path: Socket path the server is about to bind.
+    :raises OSError: ``EADDRINUSE`` if a live daemon already answers on ``path``.
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise OSError(errno.EADDRINUSE, "mw serve is already running", path)
+
+
+class Server(socketserver.UnixStreamServer):
+    """Unix socket server answering each connection on a fixed pool of threads.
+
+    Threads outlive connections, so every thread keeps its configured Markdown
+    instances between clients; ``socketserver.ThreadingMixIn`` would start a
+    cold thread per connection instead.
+
+    :param path: Socket path to listen on; a stale socket there is replaced.
+    :param workers: Threads answering connections; defaults to the CPUs this
+        process may use.
+    :raises OSError: If another daemon already answers on ``path``.
+    """
+
+    def __init__(self, path: str, workers: int | None = None) -> None:
+        _claim_socket_path(path)
+        self.path = path
+        self._bound = False
+        self._pool = ThreadPoolExecutor(max_workers=workers or os.process_cpu_count() or 1)
+        super().__init__(path, _RequestHandler)
+
+    def server_bind(self) -> None:
+        """Bind the socket, remembering that the socket file is now this server's to remove."""
+        super().server_bind()
+        self._bound = True
+
+    def process_request(self, request: Any, client_address: Any) -> None:
+        """Hand an accepted connection to the thread pool."""
+        self._pool.submit(self._process_in_thread, request, client_address)
+
+    def _process_in_thread(self, request: Any, client_address: Any) -> None:
+        """Answer one connection on a pool thread, mirroring ``ThreadingMixIn``."""
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        """Stop accepting, finish the connections in flight, and remove the socket file."""
+        super().server_close()
+        self._pool.shutdown()
+        if self._bound:
+            os.unlink(self.path)
@@ -0,0 +1,120 @@
+# ABOUTME: Deterministic sharding behind --shard I/N, splitting one tree or file list across N machines.
+# Assigns each file by a stable hash of its path, or balances by size, so every shard computes the same split.
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass
+from pathlib import Path
+
+from markwright._util import write_atomic
+from markwright.manifest import markwright_version
+
+# How files are assigned to shards: by path hash alone, or balanced by file size.
+SHARD_STRATEGIES: tuple[str, ...] = ("path", "size")
+
+_SHARD_SPEC = re.compile(r"(\d+)/(\d+)")
+
+
+def path_slot(path: str) -> int:
+    """Hash a file path to a number that is the same on every machine and Python run.
+
+    :param path: The file's path relative to the root every shard shares, in POSIX form.
+    :returns: A 64-bit integer; unlike :func:`hash`, it does not depend on ``PYTHONHASHSEED``.
+    """
+    return int.from_bytes(hashlib.blake2b(path.encode(), digest_size=8).digest(), "big")
+
+
+def partition(files: list[str], count: int, sizes: Mapping[str, int] | None = None) -> list[list[str]]:
+    """Split ``files`` into ``count`` disjoint shards.
+
+    Without ``sizes`` a file goes to the shard its :func:`path_slot` picks, so
+    adding or removing a page moves no other page. With ``sizes`` the files are
+    placed largest first, each on the shard with the fewest bytes so far, which
+    balances the shards by work at the cost of reshuffling when sizes change.
+
+    :param files: Relative POSIX paths.
+    :param count: Number of shards.
+    :param sizes: Byte size of each file, to balance by size.
+    :returns: One list per shard, each in the order of ``files``.
+    """
+    if sizes is None:
+        assigned = {path: path_slot(path) % count for path in files}
+    else:
+        loads = [(0, shard) for shard in range(count)]
+        assigned = {}
+        for path in sorted(files, key=lambda path: (-sizes[path], path_slot(path), path)):
+            load, shard = heapq.heappop(loads)
+            assigned[path] = shard
+            heapq.heappush(loads, (load + sizes[path], shard))
+    shards: list[list[str]] = [[] for _ in range(count)]
+    for path in files:
+        shards[assigned[path]].append(path)
+    return shards
+
+
+@dataclass(frozen=True, slots=True)
+class Shard:
+    """One of ``count`` disjoint slices of a run, numbered from 1.
+
+    :ivar index: This shard's number, from 1 to ``count``.
+    :ivar count: Number of shards the run is split into.
+    """
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, spec: str) -> Shard:
+        """Read a shard written as ``I/N``, such as ``2/8``.
+
+        :param spec: The specification.
+        :returns: The shard.
+        :raises ValueError: If ``spec`` is not ``I/N`` with ``1 <= I <= N``.
+        """
+        match = _SHARD_SPEC.fullmatch(spec.strip())
+        if match is None or not 1 <= int(match[1]) <= int(match[2]):
+            raise ValueError(f"invalid shard {spec!r}; expected I/N with 1 <= I <= N")
+        return cls(int(match[1]), int(match[2]))
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+    def select(self, files: list[str], sizes: Mapping[str, int] | None = None) -> list[str]:
+        """Return the files this shard processes.
+
+        :param files: Relative POSIX paths, the same list on every shard.
+        :param sizes: Byte size of each file, to balance by size; see :func:`partition`.
+        :returns: This shard's files, in the order of ``files``.
+        """
+        return partition(files, self.count, sizes)[self.index - 1]
+
+    def partial(self, manifest: Path) -> Path:
+        """Name this shard's partial manifest after the merged manifest it feeds.
+
+        :param manifest: Path of the merged manifest, such as ``.mw-manifest.json``.
+        :returns: A sibling such as ``.mw-manifest.shard-2-of-8.json``.
+        """
+        return manifest.with_name(f"{manifest.stem}.shard-{self.index}-of-{self.count}{manifest.suffix}")
+
+    def stats_path(self, manifest: Path) -> Path:
+        """Name this shard's stats file after the merged manifest.
+
+        :param manifest: Path of the merged manifest, such as ``.mw-manifest.json``.
+        :returns: A sibling such as ``.mw-manifest.shard-2-of-8.stats.json``.
+        """
+        return manifest.with_name(f"{manifest.stem}.shard-{self.index}-of-{self.count}.stats.json")
+
+    def save_stats(self, manifest: Path, step: str, stats: Mapping[str, int | float]) -> None:
+        """Write what this shard did beside its partial manifest, so CI can compare shards.
+
+        :param manifest: Path of the merged manifest the shard feeds.
+        :param step: The step that ran.
+        :param stats: Counts and timings, such as ``files``, ``input_bytes``, and ``seconds``.
+        """
+        document = {"markwright": markwright_version(), "step": step, "shard": str(self), **stats}
+        write_atomic(self.stats_path(manifest), json.dumps(document, indent=1) + "\n")
@@ -5,10 +5,16 @@ from __future__ import annotations
 
 import html
 import re
+from typing import TYPE_CHECKING
 
-from markdown import Markdown
-from markdown.extensions import Extension
-from markdown.preprocessors import Preprocessor
+from markwright._embed import expand_embed_source
+from markwright._extensions import markdown_attributes
+
+# Static types for the classes __getattr__ forwards below; at run time they still load on first access.
+if TYPE_CHECKING:
+    from markwright._extensions.slideshow import SlideshowExtension as SlideshowExtension
+    from markwright._extensions.slideshow import SlideshowPreprocessor as SlideshowPreprocessor
+    from markwright._extensions.slideshow import makeExtension as makeExtension
 
 SLIDESHOW_RE = re.compile(r"^\[slideshow\s+(.+)\]$")
 
@@ -70,31 +76,9 @@ def expand_source(text: str) -> str:
     Python-Markdown stash placeholder.
 
     :param text: The source text.
-    :returns: The text with standalone slideshow embeds replaced by HTML.
-    """
-    return "\n".join(_render_match(line) or line for line in text.split("\n"))
-
-
-class SlideshowPreprocessor(Preprocessor):
-    """Replace [slideshow ...] lines with slideshow HTML.
-
-    :param md: The Markdown instance.
+    :returns: The text with standalone slideshow embeds outside code replaced by HTML.
     """
-
-    def run(self, lines: list[str]) -> list[str]:
-        """Process lines, replacing slideshow embed syntax with HTML.
-
-        :param lines: Source lines to process.
-        :returns: Modified lines with slideshow embeds replaced by HTML.
-        """
-        output: list[str] = []
-        for line in lines:
-            slideshow_html = _render_match(line)
-            if slideshow_html is not None:
-                output.append(self.md.htmlStash.store(slideshow_html))
-            else:
-                output.append(line)
-        return output
+    return expand_embed_source(text, {"slideshow": _render_match})
 
 
 def _build_slideshow_html(urls: list[str], height: int, width: int) -> str:
@@ -125,25 +109,5 @@ def _build_slideshow_html(urls: list[str], height: int, width: int) -> str:
     )
 
 
-class SlideshowExtension(Extension):
-    """Python-Markdown extension for image slideshow embeds.
-
-    :param \\*\\*kwargs: Configuration options passed to the extension.
-    """
-
-    def extendMarkdown(self, md: Markdown) -> None:
-        """Register the slideshow preprocessor.
-
-        :param md: The Markdown instance to extend.
-        """
-        preprocessor = SlideshowPreprocessor(md)
-        md.preprocessors.register(preprocessor, "do-slideshow", 20)
-
-
-def makeExtension(**kwargs: object) -> SlideshowExtension:
-    """Create and return the SlideshowExtension instance.
-
-    :param \\*\\*kwargs: Configuration options.
-    :returns: A configured SlideshowExtension.
-    """
-    return SlideshowExtension(**kwargs)
+# The Python-Markdown classes live in markwright._extensions.slideshow and load on first access.
+__getattr__ = markdown_attributes(__name__, ("SlideshowPreprocessor", "SlideshowExtension", "makeExtension"))
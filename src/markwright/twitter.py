@@ -5,11 +5,20 @@ from __future__ import annotations
 
 import html
 import re
+from typing import TYPE_CHECKING
 
-from markdown import Markdown
-from markdown.extensions import Extension
-from markdown.postprocessors import Postprocessor
-from markdown.preprocessors import Preprocessor
+from markwright._embed import expand_embed_source
+from markwright._extensions import markdown_attributes
+from markwright._scan import LiteralIndex
+from markwright._stats import count
+from markwright._util import Edit
+
+# Static types for the classes __getattr__ forwards below; at run time they still load on first access.
+if TYPE_CHECKING:
+    from markwright._extensions.twitter import TwitterExtension as TwitterExtension
+    from markwright._extensions.twitter import TwitterPostprocessor as TwitterPostprocessor
+    from markwright._extensions.twitter import TwitterPreprocessor as TwitterPreprocessor
+    from markwright._extensions.twitter import makeExtension as makeExtension
 
 TWITTER_RE = re.compile(
     r"^\[twitter\s+(https?://(?:twitter\.com|x\.com)/(\S+)/status/(\S+))"
@@ -97,9 +106,9 @@ def expand_source(text: str) -> str:
     HTML inline without any Python-Markdown stash placeholder.
 
     :param text: The source text.
-    :returns: The text with standalone Twitter embeds replaced by HTML.
+    :returns: The text with standalone Twitter embeds outside code replaced by HTML.
     """
-    return "\n".join(_render_match(line) or line for line in text.split("\n"))
+    return expand_embed_source(text, {"twitter": _render_match})
 
 
 def apply_html(rendered_html: str, warnings: list[str] | None = None) -> str:
@@ -114,68 +123,29 @@ def apply_html(rendered_html: str, warnings: list[str] | None = None) -> str:
     :returns: HTML with the Twitter script appended if needed.
     """
     if TWITTER_SIGNATURE in rendered_html and TWITTER_SCRIPT not in rendered_html:
+        count("scripts_injected")
         return rendered_html + "\n" + TWITTER_SCRIPT
     return rendered_html
 
 
-class TwitterPreprocessor(Preprocessor):
-    """Replace [twitter ...] lines with Twitter embed HTML.
-
-    :param md: The Markdown instance.
-    """
-
-    def run(self, lines: list[str]) -> list[str]:
-        """Process lines, replacing Twitter embed syntax with HTML.
-
-        :param lines: Source lines to process.
-        :returns: Modified lines with Twitter embeds replaced by HTML.
-        """
-        output: list[str] = []
-        for line in lines:
-            embed_html = _render_match(line)
-            if embed_html is not None:
-                output.append(self.md.htmlStash.store(embed_html))
-            else:
-                output.append(line)
-        return output
-
-
-class TwitterPostprocessor(Postprocessor):
-    """Append the Twitter widgets script tag once if any embeds are present.
-
-    :param md: The Markdown instance.
-    """
-
-    def run(self, text: str) -> str:
-        """Append the script tag if a Twitter embed signature is present.
+def script_edits(rendered_html: str, index: LiteralIndex, warnings: list[str] | None = None) -> list[Edit]:
+    """Compute the script injection of :func:`apply_html` from a literal index.
 
-        :param text: Rendered HTML content.
-        :returns: HTML with Twitter script appended if needed.
-        """
-        return apply_html(text)
+    The form the registry pipeline calls: the index already records whether the
+    Twitter class signature and the script occur, so the HTML is not searched.
 
-
-class TwitterExtension(Extension):
-    """Python-Markdown extension for Twitter embeds.
-
-    :param \\*\\*kwargs: Configuration options passed to the extension.
+    :param rendered_html: Rendered HTML content.
+    :param index: An index of ``rendered_html`` holding ``TWITTER_SIGNATURE`` and ``TWITTER_SCRIPT``.
+    :param warnings: Optional warnings list; unused (signature injection never warns).
+    :returns: One edit appending the script if needed, else no edits.
     """
+    if index.hits[TWITTER_SIGNATURE] and not index.hits[TWITTER_SCRIPT]:
+        count("scripts_injected")
+        return [(len(rendered_html), 0, "\n" + TWITTER_SCRIPT)]
+    return []
 
-    def extendMarkdown(self, md: Markdown) -> None:
-        """Register the Twitter preprocessor and postprocessor.
-
-        :param md: The Markdown instance to extend.
-        """
-        preprocessor = TwitterPreprocessor(md)
-        postprocessor = TwitterPostprocessor(md)
-        md.preprocessors.register(preprocessor, "do-twitter", 20)
-        md.postprocessors.register(postprocessor, "do-twitter-script", 15)
 
-
-def makeExtension(**kwargs: object) -> TwitterExtension:
-    """Create and return the TwitterExtension instance.
-
-    :param \\*\\*kwargs: Configuration options.
-    :returns: A configured TwitterExtension.
-    """
-    return TwitterExtension(**kwargs)
+# The Python-Markdown classes live in markwright._extensions.twitter and load on first access.
+__getattr__ = markdown_attributes(
+    __name__, ("TwitterPreprocessor", "TwitterPostprocessor", "TwitterExtension", "makeExtension")
+)
@@ -0,0 +1,179 @@
+# ABOUTME: Incremental rebuild mode behind mw watch: keeps an output tree current as its sources change.
+# Polls the source tree, debounces bursts of edits, and re-runs one step only on inputs whose hash or selection changed.
+
+from __future__ import annotations
+
+import os
+import stat
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from markwright import build, registry
+from markwright._util import write_atomic
+from markwright.manifest import MANIFEST_NAME, ManifestEntry, content_hash, load_manifest, save_manifest, selection_key
+
+# What a scan remembers about each source file: its modification time in
+# nanoseconds and its size. A file whose pair is unchanged is not read again.
+Snapshot = dict[str, tuple[int, int]]
+
+
+@dataclass(frozen=True, slots=True)
+class SyncResult:
+    """Outcome of one :meth:`Watcher.sync` pass.
+
+    :ivar rebuilt: Inputs whose outputs were written, relative to the source root.
+    :ivar removed: Inputs that disappeared, whose outputs were deleted.
+    :ivar seconds: Wall-clock time the pass took.
+    :ivar warnings: Skip reasons from post stages, and inputs that could not be
+        read or decoded, each prefixed with its file.
+    """
+
+    rebuilt: tuple[str, ...]
+    removed: tuple[str, ...]
+    seconds: float
+    warnings: tuple[str, ...] = ()
+
+
+class Watcher:
+    """Keep ``destination`` in step with ``source`` for one pipeline step.
+
+    Every pass compares each input against a manifest of content hashes, so only
+    files whose bytes or extension selection changed are transformed again, and
+    a restarted watcher picks up where the last one stopped. Between passes the
+    watcher remembers each file's modification time and size, and does not read
+    a file whose pair is unchanged. Work runs in this process, so the compiled
+    pipelines and Markdown instances stay warm from one edit to the next.
+
+    :param step: One of :data:`~markwright.build.BUILD_STEPS`.
+    :param source: Root of the source tree.
+    :param destination: Root of the output tree, created as needed.
+    :param names: Selected extension names, in registry order.
+    :param manifest: Manifest file; defaults to :data:`~markwright.manifest.MANIFEST_NAME`
+        in ``destination``.
+    :raises ValueError: If the step or a name is not known, or the step would
+        overwrite its own inputs.
+    """
+
+    def __init__(
+        self,
+        step: str,
+        source: Path,
+        destination: Path,
+        names: list[str],
+        *,
+        manifest: Path | None = None,
+    ) -> None:
+        build.check_tree(step, source, destination, names)
+        self.step = step
+        self.source = source
+        self.destination = destination
+        self.names = [name for name in registry.EXTENSION_NAMES if name in names]
+        self.manifest_path = manifest or destination / MANIFEST_NAME
+        self._selection = selection_key(step, self.names)
+        self._entries = load_manifest(self.manifest_path)
+        self._seen: Snapshot = {}
+
+    def scan(self) -> Snapshot:
+        """Stat every input under the source tree.
+
+        A file that vanishes before it is statted, or that is not a regular file,
+        such as a dangling symlink an editor leaves as a lock file, is skipped.
+
+        :returns: Modification time and size by input path.
+        """
+        snapshot: Snapshot = {}
+        for relative in build.find_sources(self.source, self.step, self.destination):
+            try:
+                status = os.stat(self.source / relative)
+            except FileNotFoundError:
+                continue
+            if stat.S_ISREG(status.st_mode):
+                snapshot[relative] = (status.st_mtime_ns, status.st_size)
+        return snapshot
+
+    def _output(self, relative: str) -> Path:
+        """Where the output for an input goes."""
+        read_suffix, write_suffix = build.STEP_SUFFIXES[self.step]
+        return self.destination / (relative.removesuffix(read_suffix) + write_suffix)
+
+    def sync(self, snapshot: Snapshot | None = None) -> SyncResult:
+        """Bring every output up to date with its input.
+
+        An input that cannot be read, because it vanished since the scan for
+        example, or that is not valid UTF-8 becomes a warning and keeps its old
+        output; the pass goes on with the other files, and the next pass that
+        sees the input change tries it again.
+
+        :param snapshot: A :meth:`scan` taken just before, to save scanning twice.
+        :returns: What was rebuilt and removed.
+        """
+        started = time.perf_counter()
+        current = self.scan() if snapshot is None else snapshot
+        rebuilt: list[str] = []
+        warnings: list[str] = []
+        for relative, stamp in current.items():
+            if self._seen.get(relative) == stamp and relative in self._entries:
+                continue
+            try:
+                data = (self.source / relative).read_bytes()
+            except OSError as read_error:
+                warnings.append(f"{relative}: not rebuilt: {read_error.strerror or read_error}")
+                continue
+            entry = ManifestEntry(hash=content_hash(data), selection=self._selection)
+            output = self._output(relative)
+            if self._entries.get(relative) == entry and output.exists():
+                continue
+            try:
+                source_text = data.decode()
+            except UnicodeDecodeError as decode_error:
+                warnings.append(f"{relative}: not rebuilt: {decode_error}")
+                continue
+            text, file_warnings = build.transform(self.step, self.names, source_text)
+            write_atomic(output, text)
+            self._entries[relative] = entry
+            rebuilt.append(relative)
+            warnings.extend(f"{relative}: {warning}" for warning in file_warnings)
+        removed = sorted(relative for relative in self._entries if relative not in current)
+        for relative in removed:
+            self._output(relative).unlink(missing_ok=True)
+            del self._entries[relative]
+        if rebuilt or removed:
+            save_manifest(self.manifest_path, self._entries)
+        self._seen = current
+        return SyncResult(tuple(rebuilt), tuple(removed), time.perf_counter() - started, tuple(warnings))
+
+    def run(
+        self,
+        report: Callable[[SyncResult], None],
+        *,
+        interval: float = 0.5,
+        debounce: float = 0.2,
+        stop: threading.Event | None = None,
+    ) -> None:
+        """Sync once, then poll the source tree and sync after each burst of edits.
+
+        A pass starts once a scan finds changes and no scan has found further
+        changes for ``debounce`` seconds, so an editor saving several files, or
+        one file several times, triggers one pass rather than many.
+
+        :param report: Called with the result of every pass.
+        :param interval: Seconds between scans.
+        :param debounce: Quiet period, in seconds, before a pass starts.
+        :param stop: Event that ends the loop when set; without one the loop
+            runs until interrupted.
+        """
+        stop = stop or threading.Event()
+        report(self.sync())
+        last = self._seen
+        quiet_since = time.monotonic()
+        while not stop.wait(interval):
+            current = self.scan()
+            if current != last:
+                last = current
+                quiet_since = time.monotonic()
+                continue
+            if current != self._seen and time.monotonic() - quiet_since >= debounce:
+                report(self.sync(current))
@@ -5,13 +5,18 @@ from __future__ import annotations
 
 import re
 import urllib.parse
+from typing import TYPE_CHECKING
 
-from markdown import Markdown
-from markdown.extensions import Extension
-from markdown.preprocessors import Preprocessor
-
+from markwright._embed import expand_embed_source
+from markwright._extensions import markdown_attributes
 from markwright._util import reduce_fraction
 
+# Static types for the classes __getattr__ forwards below; at run time they still load on first access.
+if TYPE_CHECKING:
+    from markwright._extensions.youtube import YouTubeExtension as YouTubeExtension
+    from markwright._extensions.youtube import YouTubePreprocessor as YouTubePreprocessor
+    from markwright._extensions.youtube import makeExtension as makeExtension
+
 YOUTUBE_RE = re.compile(r"^\[youtube (\S+?)(?:\s+(\d+))?(?:\s+(\d+))?\]$")
 
 DEFAULT_HEIGHT = 270
@@ -53,52 +58,10 @@ def expand_source(text: str) -> str:
     HTML inline without any Python-Markdown stash placeholder.
 
     :param text: The source text.
-    :returns: The text with standalone YouTube embeds replaced by iframe HTML.
-    """
-    return "\n".join(_render_match(line) or line for line in text.split("\n"))
-
-
-class YouTubePreprocessor(Preprocessor):
-    """Replace [youtube ...] lines with responsive iframe HTML.
-
-    :param md: The Markdown instance.
-    """
-
-    def run(self, lines: list[str]) -> list[str]:
-        """Process lines, replacing YouTube embed syntax with iframe HTML.
-
-        :param lines: Source lines to process.
-        :returns: Modified lines with YouTube embeds replaced by HTML.
-        """
-        output: list[str] = []
-        for line in lines:
-            iframe_html = _render_match(line)
-            if iframe_html is not None:
-                output.append(self.md.htmlStash.store(iframe_html))
-            else:
-                output.append(line)
-        return output
-
-
-class YouTubeExtension(Extension):
-    """Python-Markdown extension for YouTube video embeds.
-
-    :param \\*\\*kwargs: Configuration options passed to the extension.
+    :returns: The text with standalone YouTube embeds outside code replaced by iframe HTML.
     """
+    return expand_embed_source(text, {"youtube": _render_match})
 
-    def extendMarkdown(self, md: Markdown) -> None:
-        """Register the YouTube preprocessor.
 
-        :param md: The Markdown instance to extend.
-        """
-        preprocessor = YouTubePreprocessor(md)
-        md.preprocessors.register(preprocessor, "do-youtube", 20)
-
-
-def makeExtension(**kwargs: object) -> YouTubeExtension:
-    """Create and return the YouTubeExtension instance.
-
-    :param \\*\\*kwargs: Configuration options.
-    :returns: A configured YouTubeExtension.
-    """
-    return YouTubeExtension(**kwargs)
+# The Python-Markdown classes live in markwright._extensions.youtube and load on first access.
+__getattr__ = markdown_attributes(__name__, ("YouTubePreprocessor", "YouTubeExtension", "makeExtension"))
@@ -0,0 +1,176 @@
+# ABOUTME: Tests for the asyncio entry points and the offloader behind them.
+# Covers inline small documents, the concurrency bound, cancellation, and parity with the sync calls.
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+import pytest
+
+from markwright.aio import Offloader, arender, arun_post, arun_pre
+from markwright.registry import EXTENSION_NAMES, run_post, run_pre
+from markwright.render import render
+
+SOURCE = "[youtube dQw4w9WgXcQ]\n\n```bash\n[label a.sh]\necho <^>hi<^>\n```\n\nText <^>marked<^>.\n"
+FENCE_HTML = (
+    '<!-- mw-fence:{"version": 1, "label": "a.sh"} -->\n'
+    '<pre><code class="language-bash">echo &lt;^&gt;hi&lt;^&gt;\n</code></pre>\n'
+)
+BROKEN_HTML = "<!-- mw-fence:{not json} -->\n<p>x</p>\n"
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Thread pool that records how many jobs were submitted to it."""
+
+    def __init__(self) -> None:
+        super().__init__(max_workers=4)
+        self.submitted = 0
+
+    def submit(self, fn: Any, /, *args: Any, **kwargs: Any) -> Future[Any]:
+        self.submitted += 1
+        return super().submit(fn, *args, **kwargs)
+
+
+class TestAsyncEntryPoints:
+    """Tests for arun_pre, arun_post, and arender matching their sync forms."""
+
+    @pytest.mark.parametrize("inline_below", [0, 1 << 20])
+    def test_results_match_sync_calls(self, inline_below: int) -> None:
+        names = list(EXTENSION_NAMES)
+        with CountingExecutor() as executor:
+            offloader = Offloader(executor, inline_below=inline_below)
+
+            async def main() -> tuple[str, str, str]:
+                return (
+                    await arun_pre(SOURCE, names, offloader=offloader),
+                    await arun_post(FENCE_HTML, names, offloader=offloader),
+                    await arender(SOURCE, names, offloader=offloader),
+                )
+
+            assert asyncio.run(main()) == (run_pre(SOURCE, names), run_post(FENCE_HTML, names), render(SOURCE, names))
+            assert executor.submitted == (3 if inline_below == 0 else 0)
+
+    def test_default_offloader_runs_small_documents_inline(self) -> None:
+        assert asyncio.run(arun_pre(SOURCE, ["youtube"])) == run_pre(SOURCE, ["youtube"])
+
+    def test_post_warnings_come_back_from_the_executor(self) -> None:
+        expected: list[str] = []
+        run_post(BROKEN_HTML, ["fence"], expected)
+        warnings: list[str] = []
+        offloader = Offloader(inline_below=0)
+        asyncio.run(arun_post(BROKEN_HTML, ["fence"], warnings, offloader=offloader))
+        asyncio.run(arun_post(BROKEN_HTML, ["fence"], offloader=offloader))
+        assert warnings == expected
+        assert expected
+
+    def test_unknown_name_raises(self) -> None:
+        with pytest.raises(ValueError, match="bogus"):
+            asyncio.run(arender("x" * 10, ["bogus"], offloader=Offloader(inline_below=0)))
+
+
+class TestOffloader:
+    """Tests for the concurrency bound and cancellation handling of Offloader."""
+
+    def test_default_executor_is_created_once(self) -> None:
+        offloader = Offloader(max_concurrency=2)
+        assert isinstance(offloader.executor, ThreadPoolExecutor)
+        assert offloader.executor is offloader.executor
+
+    def test_bound_limits_jobs_in_flight(self) -> None:
+        lock = threading.Lock()
+        running = peak = 0
+
+        def job() -> None:
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            threading.Event().wait(0.01)
+            with lock:
+                running -= 1
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            offloader = Offloader(executor, max_concurrency=2, inline_below=0)
+
+            async def main() -> None:
+                await asyncio.gather(*(offloader.run(1, job) for _ in range(8)))
+
+            asyncio.run(main())
+        assert peak == 2
+
+    def test_cancelled_running_job_keeps_its_slot_until_done(self) -> None:
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking() -> str:
+            started.set()
+            release.wait()
+            return "first"
+
+        with CountingExecutor() as executor:
+            offloader = Offloader(executor, max_concurrency=1, inline_below=0)
+
+            async def main() -> str:
+                first = asyncio.create_task(offloader.run(1, blocking))
+                await asyncio.to_thread(started.wait)
+                first.cancel()
+                second = asyncio.create_task(offloader.run(1, str.upper, "second"))
+                await asyncio.sleep(0.01)
+                assert executor.submitted == 1
+                release.set()
+                return await second
+
+            assert asyncio.run(main()) == "SECOND"
+
+    def test_cancelled_waiting_caller_never_submits(self) -> None:
+        release = threading.Event()
+        with CountingExecutor() as executor:
+            offloader = Offloader(executor, max_concurrency=1, inline_below=0)
+
+            async def main() -> None:
+                first = asyncio.create_task(offloader.run(1, release.wait))
+                second = asyncio.create_task(offloader.run(1, str.upper, "x"))
+                await asyncio.sleep(0.01)
+                second.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await second
+                release.set()
+                await first
+
+            asyncio.run(main())
+            assert executor.submitted == 1
+
+    def test_failed_submit_releases_its_slot(self) -> None:
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.shutdown()
+        offloader = Offloader(executor, max_concurrency=1, inline_below=0)
+
+        async def main() -> None:
+            for _ in range(2):
+                with pytest.raises(RuntimeError):
+                    await offloader.run(1, str.upper, "x")
+
+        asyncio.run(main())
+
+    def test_job_finishing_after_the_loop_closes(self) -> None:
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocking() -> None:
+            started.set()
+            release.wait()
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        offloader = Offloader(executor, max_concurrency=1, inline_below=0)
+
+        async def main() -> None:
+            task = asyncio.create_task(offloader.run(1, blocking))
+            await asyncio.to_thread(started.wait)
+            task.cancel()
+
+        asyncio.run(main())
+        release.set()
+        executor.shutdown(wait=True)
@@ -0,0 +1,95 @@
+# ABOUTME: Tests for the benchmark harness behind mw bench.
+# Covers corpus generation and loading, per-stage measurement, and the table and JSON reports.
+
+from __future__ import annotations
+
+from importlib.metadata import version as package_version
+from pathlib import Path
+
+import pytest
+
+from markwright.bench import StageStats, format_table, generate_corpus, load_corpus, measure, report_json, run_bench
+
+
+class TestCorpus:
+    """Tests for generating and loading benchmark corpora."""
+
+    def test_generated_corpus_is_deterministic_and_exercises_the_extensions(self) -> None:
+        corpus = generate_corpus(30, seed=1)
+        assert corpus == generate_corpus(30, seed=1) != generate_corpus(30, seed=2)
+        assert any("line_numbers" in page for page in corpus)
+        assert any("[youtube " in page for page in corpus)
+
+    def test_load_corpus_reads_markdown_files_in_path_order(self, tmp_path: Path) -> None:
+        (tmp_path / "b.md").write_text("two", encoding="utf-8")
+        (tmp_path / "a.md").write_text("one", encoding="utf-8")
+        (tmp_path / "c.html").write_text("skip", encoding="utf-8")
+        assert load_corpus(tmp_path) == ["one", "two"]
+
+
+class TestMeasure:
+    """Tests for timing one stage."""
+
+    def test_counts_calls_and_reports_percentiles(self) -> None:
+        calls: list[str] = []
+        stats = measure("probe", calls.append, ["a", "bb"], iterations=3, warmup=2)
+        assert len(calls) == (2 + 3 + 1) * 2
+        assert (stats.documents, stats.iterations, stats.input_bytes) == (2, 3, 3)
+        assert 0 <= stats.p50_ms <= stats.p95_ms <= stats.p99_ms
+        assert stats.documents_per_second > 0 and stats.mb_per_second > 0
+
+    def test_rates_of_an_untimed_run_are_zero(self) -> None:
+        stats = StageStats("probe", 1, 1, 10, 0.0, 0.0, 0.0, 0.0, 0)
+        assert stats.mb_per_second == stats.documents_per_second == 0.0
+
+
+class TestRunBench:
+    """Tests for benchmarking a selection."""
+
+    def test_stages_follow_the_selection(self) -> None:
+        stats = run_bench(generate_corpus(2), ["youtube", "codepen", "fence"], iterations=1, warmup=0)
+        assert [entry.stage for entry in stats] == [
+            "pre:youtube",
+            "pre:codepen",
+            "pre:fence",
+            "pre",
+            "post:codepen",
+            "post:fence",
+            "post",
+            "render",
+        ]
+
+    def test_invalid_runs_raise(self) -> None:
+        with pytest.raises(ValueError, match="empty"):
+            run_bench([], [])
+        with pytest.raises(ValueError, match="at least 1"):
+            run_bench(["text"], [], iterations=0)
+        with pytest.raises(ValueError, match="bogus"):
+            run_bench(["text"], ["bogus"])
+
+
+class TestReports:
+    """Tests for the table and JSON reports."""
+
+    def test_json_and_table_carry_every_stage(self) -> None:
+        stats = [StageStats("pre:fence", 2, 5, 2048, 0.5, 0.1, 0.2, 0.3, 4096)]
+        report = report_json(stats, warmup=1)
+        assert report["markwright"] == package_version("markwright")
+        assert report["stages"] == [
+            {
+                "stage": "pre:fence",
+                "documents": 2,
+                "iterations": 5,
+                "input_bytes": 2048,
+                "seconds": 0.5,
+                "p50_ms": 0.1,
+                "p95_ms": 0.2,
+                "p99_ms": 0.3,
+                "peak_bytes": 4096,
+                "mb_per_second": 0.02048,
+                "documents_per_second": 20.0,
+            }
+        ]
+        header, row = format_table(stats).splitlines()
+        assert header.split()[:3] == ["stage", "MB/s", "docs/s"]
+        assert row.split() == ["pre:fence", "0.02", "20", "0.100", "0.200", "0.300", "4"]
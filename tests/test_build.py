@@ -0,0 +1,243 @@
+# ABOUTME: Tests for the directory mode behind mw build.
+# Covers source discovery, atomic writes, per-step outputs, sharding, sidecars, and the worker pool path.
+
+from __future__ import annotations
+
+import gzip
+import importlib.util
+import json
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from markwright import build, registry
+from markwright._util import write_atomic
+from markwright.build import BuildResult, build_tree, find_sources
+from markwright.manifest import MANIFEST_NAME, ManifestEntry, content_hash, merge_manifests, save_manifest
+from markwright.registry import EXTENSION_NAMES, run_post, run_pre
+from markwright.render import render
+from markwright.shard import Shard
+from markwright.watch import Watcher
+
+HAS_ZSTD = (
+    importlib.util.find_spec("compression") is not None and importlib.util.find_spec("compression.zstd") is not None
+)
+
+SOURCE = "[youtube dQw4w9WgXcQ]\n\nText <^>marked<^>.\n"
+BROKEN_HTML = "<!-- mw-fence:not json --><p>body</p>\n"
+
+
+def _tree(root: Path, files: dict[str, str]) -> Path:
+    """Create ``files`` under ``root``.
+
+    :param root: Directory to create the files in.
+    :param files: Content by relative path.
+    :returns: ``root``.
+    """
+    for relative, text in files.items():
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    return root
+
+
+class TestFindSources:
+    """Tests for find_sources walking a tree."""
+
+    def test_lists_matching_files_sorted_and_skips_nested_destination(self, tmp_path: Path) -> None:
+        _tree(tmp_path, {"b.md": "", "a/z.md": "", "a/y.html": "", "out/old.md": ""})
+        assert find_sources(tmp_path, "pre", tmp_path / "out") == ["a/z.md", "b.md"]
+        assert find_sources(tmp_path, "post") == ["a/y.html"]
+
+
+class TestWriteAtomic:
+    """Tests for write_atomic replacing files whole."""
+
+    def test_replaces_existing_file_without_leaving_temporaries(self, tmp_path: Path) -> None:
+        target = tmp_path / "deep" / "page.html"
+        write_atomic(target, "old")
+        write_atomic(target, "new")
+        assert target.read_text(encoding="utf-8") == "new"
+        assert [path.name for path in target.parent.iterdir()] == ["page.html"]
+
+    def test_writes_bytes_as_they_are(self, tmp_path: Path) -> None:
+        target = tmp_path / "page.html.gz"
+        write_atomic(target, b"\x1f\x8b\r\n")
+        assert target.read_bytes() == b"\x1f\x8b\r\n"
+
+    def test_in_place_keeps_the_mode_and_writes_through_symlinks(self, tmp_path: Path) -> None:
+        target = tmp_path / "real" / "page.html"
+        target.parent.mkdir()
+        target.write_text("old", encoding="utf-8")
+        target.chmod(0o640)
+        link = tmp_path / "page.html"
+        link.symlink_to(target)
+        write_atomic(link, b"new", in_place=True)
+        assert link.is_symlink()
+        assert target.read_bytes() == b"new"
+        assert stat.S_IMODE(target.stat().st_mode) == 0o640
+        with pytest.raises(FileNotFoundError):
+            write_atomic(tmp_path / "missing.html", "new", in_place=True)
+
+    def test_failed_write_removes_the_temporary(self, tmp_path: Path) -> None:
+        with pytest.raises(UnicodeEncodeError):
+            write_atomic(tmp_path / "page.html", "\udc80")
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestBuildTree:
+    """Tests for build_tree applying each step across a tree."""
+
+    @pytest.mark.parametrize(
+        ("step", "name", "output", "expected"),
+        [
+            ("pre", "a/page.md", "a/page.md", run_pre(SOURCE, list(EXTENSION_NAMES))),
+            ("render", "a/page.md", "a/page.html", render(SOURCE, list(EXTENSION_NAMES))),
+            ("post", "a/page.html", "a/page.html", run_post(SOURCE, list(EXTENSION_NAMES))),
+        ],
+    )
+    def test_step_writes_the_transformed_tree(
+        self, tmp_path: Path, step: str, name: str, output: str, expected: str
+    ) -> None:
+        source = _tree(tmp_path / "src", {name: SOURCE})
+        result = build_tree(step, source, tmp_path / "dest", list(EXTENSION_NAMES), max_workers=1)
+        assert result.files == 1
+        assert (tmp_path / "dest" / output).read_text(encoding="utf-8") == expected
+
+    def test_pool_run_matches_serial_run_and_prefixes_warnings(self, tmp_path: Path) -> None:
+        files = {f"p{index}.html": BROKEN_HTML for index in range(4)}
+        source = _tree(tmp_path / "src", files)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            result = build_tree("post", source, tmp_path / "dest", ["fence"], executor=executor)
+        assert result.files == 4
+        assert result.warnings[0].startswith("p0.html: Skipping malformed mw-fence marker")
+        assert (tmp_path / "dest" / "p3.html").read_text(encoding="utf-8") == run_post(BROKEN_HTML, ["fence"])
+
+    def test_undecodable_file_becomes_a_warning_and_the_rest_are_built(self, tmp_path: Path) -> None:
+        source = _tree(tmp_path / "src", {"good.md": SOURCE})
+        (source / "bad.md").write_bytes(b"<^>x<^> \xff")
+        result = build_tree("pre", source, tmp_path / "dest", ["highlight"], max_workers=1, shard=Shard(1, 1))
+        assert result.files == 1
+        assert result.warnings == (
+            "bad.md: not built: 'utf-8' codec can't decode byte 0xff in position 8: invalid start byte",
+        )
+        assert list(result.hashes) == ["good.md"]
+        assert list(merge_manifests([Shard(1, 1).partial(tmp_path / "dest" / MANIFEST_NAME)])) == ["good.md"]
+        assert result.input_bytes == len(SOURCE.encode()) + 9
+        assert sorted(path.name for path in (tmp_path / "dest").iterdir() if not path.name.startswith(".")) == [
+            "good.md"
+        ]
+
+    @pytest.mark.parametrize(("step", "suffix"), [("pre", ".md"), ("render", ".md"), ("post", ".html")])
+    def test_pool_starts_the_costliest_file_first(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, step: str, suffix: str
+    ) -> None:
+        long_page = "```python\n" + "x = 1\n" * registry.PRESCAN_MIN_BYTES + "```\n"
+        source = _tree(tmp_path / "src", {f"a{suffix}": "short", f"b{suffix}": long_page, f"c{suffix}": ""})
+        started: list[str] = []
+        build_one = build._build_one
+
+        def recording(*args: Any) -> tuple[list[str], str | None, int]:
+            started.append(args[-1])
+            return build_one(*args)
+
+        monkeypatch.setattr(build, "_build_one", recording)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert build_tree(step, source, tmp_path / "dest", ["fence"], executor=executor).files == 3
+        assert started == [f"b{suffix}", f"a{suffix}", f"c{suffix}"]
+
+    def test_unknown_step_name_and_self_overwrite_raise(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="unknown build step"):
+            build_tree("bogus", tmp_path, tmp_path / "dest", [])
+        with pytest.raises(ValueError, match="bogus"):
+            build_tree("pre", tmp_path, tmp_path / "dest", ["bogus"])
+        with pytest.raises(ValueError, match="overwrite its inputs"):
+            build_tree("pre", tmp_path, tmp_path, [])
+
+    def test_render_may_write_beside_its_sources(self, tmp_path: Path) -> None:
+        _tree(tmp_path, {"page.md": SOURCE})
+        assert build_tree("render", tmp_path, tmp_path, ["youtube"]).files == 1
+        assert (tmp_path / "page.html").exists()
+
+    def test_files_per_second(self) -> None:
+        assert BuildResult(files=10, seconds=2.0).files_per_second == 5.0
+        assert BuildResult(files=0, seconds=0.0).files_per_second == 0.0
+        assert build.BUILD_STEPS == ("pre", "post", "render")
+
+
+class TestShardedBuild:
+    """Tests for build_tree processing one shard and recording it for the merge."""
+
+    def test_shards_split_the_tree_and_merge_into_the_watch_manifest(self, tmp_path: Path) -> None:
+        source = _tree(tmp_path / "src", {f"p{index}.md": f"Page {index}.\n" for index in range(12)})
+        destination = tmp_path / "dest"
+        results = [
+            build_tree("pre", source, destination, ["youtube"], max_workers=1, shard=Shard(index, 3))
+            for index in (1, 2, 3)
+        ]
+        assert sum(result.files for result in results) == 12
+        partials = [Shard(index, 3).partial(destination / MANIFEST_NAME) for index in (1, 2, 3)]
+        merged = merge_manifests(partials)
+        assert set(merged) == {f"p{index}.md" for index in range(12)}
+        assert merged["p0.md"] == ManifestEntry(hash=content_hash(b"Page 0.\n"), selection="pre:youtube")
+        save_manifest(destination / MANIFEST_NAME, merged)
+        assert Watcher("pre", source, destination, ["youtube"]).sync().rebuilt == ()
+
+    def test_shard_writes_its_stats(self, tmp_path: Path) -> None:
+        source = _tree(tmp_path / "src", {"a.html": BROKEN_HTML, "b.html": "<p>b</p>"})
+        shard = Shard(1, 1)
+        result = build_tree("post", source, tmp_path / "dest", ["fence"], max_workers=1, shard=shard, shard_by="size")
+        stats = json.loads(shard.stats_path(tmp_path / "dest" / MANIFEST_NAME).read_text(encoding="utf-8"))
+        assert stats["files"] == result.files == 2
+        assert stats["input_bytes"] == result.input_bytes == len(BROKEN_HTML) + len("<p>b</p>")
+        assert (stats["shard"], stats["step"], stats["warnings"]) == ("1/1", "post", 1)
+
+    def test_unsharded_run_writes_no_manifest(self, tmp_path: Path) -> None:
+        source = _tree(tmp_path / "src", {"a.md": SOURCE})
+        result = build_tree("pre", source, tmp_path / "dest", [], max_workers=1)
+        assert result.hashes == {"a.md": content_hash(SOURCE.encode())}
+        assert [path.name for path in (tmp_path / "dest").iterdir()] == ["a.md"]
+
+    def test_unknown_strategy_raises(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="unknown shard strategy"):
+            build_tree("pre", tmp_path, tmp_path / "dest", [], shard=Shard(1, 2), shard_by="bogus")
+
+
+class TestSidecars:
+    """Tests for the compressed sidecars written beside each page."""
+
+    @pytest.mark.parametrize(("step", "name"), [("post", "a/index.html"), ("render", "a/index.md")])
+    def test_gzip_sidecar_holds_the_page(self, tmp_path: Path, step: str, name: str) -> None:
+        source = _tree(tmp_path / "src", {name: SOURCE})
+        build_tree(step, source, tmp_path / "dest", ["youtube"], max_workers=1, compress=("gz",))
+        page = tmp_path / "dest" / "a" / "index.html"
+        assert gzip.decompress((tmp_path / "dest" / "a" / "index.html.gz").read_bytes()) == page.read_bytes()
+
+    def test_gzip_output_is_reproducible(self, tmp_path: Path) -> None:
+        source = _tree(tmp_path / "src", {"index.html": SOURCE})
+        build_tree("post", source, tmp_path / "one", [], max_workers=1, compress=("gz",))
+        build_tree("post", source, tmp_path / "two", [], max_workers=1, compress=("gz",))
+        assert (tmp_path / "one" / "index.html.gz").read_bytes() == (tmp_path / "two" / "index.html.gz").read_bytes()
+
+    def test_sidecar_no_longer_asked_for_is_removed(self, tmp_path: Path) -> None:
+        source = _tree(tmp_path / "src", {"index.html": SOURCE})
+        build_tree("post", source, tmp_path / "dest", [], max_workers=1, compress=("gz",))
+        build_tree("post", source, tmp_path / "dest", [], max_workers=1)
+        assert [path.name for path in (tmp_path / "dest").iterdir()] == ["index.html"]
+
+    @pytest.mark.skipif(not HAS_ZSTD, reason="compression.zstd needs Python 3.14")
+    def test_zstd_sidecar_holds_the_page(self, tmp_path: Path) -> None:
+        zstd = importlib.import_module("compression.zstd")
+        source = _tree(tmp_path / "src", {"index.html": SOURCE})
+        build_tree("post", source, tmp_path / "dest", [], max_workers=1, compress=("gz", "zst"))
+        page = (tmp_path / "dest" / "index.html").read_bytes()
+        assert zstd.decompress((tmp_path / "dest" / "index.html.zst").read_bytes()) == page
+
+    def test_pre_step_and_unknown_format_raise(self, tmp_path: Path) -> None:
+        with pytest.raises(ValueError, match="does not write HTML"):
+            build_tree("pre", tmp_path, tmp_path / "dest", [], compress=("gz",))
+        with pytest.raises(ValueError, match="unknown sidecar format: 'br'"):
+            build_tree("post", tmp_path, tmp_path / "dest", [], compress=("br",))
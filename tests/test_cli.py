@@ -4,14 +4,21 @@
 from __future__ import annotations
 
 import io
+import json
+import os
+import pstats
+from collections.abc import Callable
 from importlib.metadata import version as package_version
+from pathlib import Path
 
 import markdown
 import pytest
 
+from markwright import _passthrough, watch
+from markwright._framing import iter_documents
 from markwright.cli import main
 from markwright.codepen import CODEPEN_SCRIPT
-from markwright.registry import EXTENSION_NAMES
+from markwright.registry import EXTENSION_NAMES, run_pre
 
 
 class TestCliVersion:
@@ -59,7 +66,7 @@ def _feed_stdin(monkeypatch: pytest.MonkeyPatch, text: str) -> None:
     :param monkeypatch: Pytest monkeypatch fixture.
     :param text: Content the CLI handler will read from stdin.
     """
-    monkeypatch.setattr("sys.stdin", io.StringIO(text))
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(text.encode())))
 
 
 def _in_process_render(text: str, names: list[str]) -> str:
@@ -127,6 +134,25 @@ class TestCliPost:
         assert "<p>body</p>" in captured.out
         assert captured.err == ""
 
+    def test_post_report_skips_counts_untriggered_stages(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _feed_stdin(monkeypatch, '<p class="codepen">embed</p>')
+        exit_code = main(["post", "--report-skips"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        assert captured.out.count(CODEPEN_SCRIPT) == 1
+        assert "mw post: skipped 4 of 5 stages: fence, highlight, twitter, instagram" in captured.err
+
+    def test_post_without_report_skips_is_silent(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _feed_stdin(monkeypatch, "<p>body</p>")
+        exit_code = main(["post"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        assert captured.err == ""
+
     def test_post_unknown_use_name_returns_two_with_stderr(
         self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
     ) -> None:
@@ -190,6 +216,15 @@ class TestCliPre:
         assert "<iframe" not in captured.out
         assert "<mark>prose</mark>" in captured.out
 
+    def test_pre_report_skips_with_nothing_skipped(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _feed_stdin(monkeypatch, "[youtube dQw4w9WgXcQ]")
+        exit_code = main(["pre", "--use", "youtube", "--report-skips"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        assert captured.err.strip() == "mw pre: skipped 0 of 1 stages"
+
     def test_pre_unknown_use_name_returns_two_with_stderr(
         self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
     ) -> None:
@@ -236,3 +271,609 @@ class TestCliRender:
         captured = capsys.readouterr()
         assert exit_code == 2
         assert "bogus" in captured.err
+
+
+class TestCliBuild:
+    """Tests for the build subcommand: applying a step across a directory tree."""
+
+    def test_build_render_writes_html_and_prints_summary(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        source = tmp_path / "content"
+        source.mkdir()
+        (source / "page.md").write_text("[youtube dQw4w9WgXcQ]", encoding="utf-8")
+        exit_code = main(["build", "render", str(source), str(tmp_path / "public"), "-j", "1"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        assert "<iframe" in (tmp_path / "public" / "page.html").read_text(encoding="utf-8")
+        assert captured.out.startswith("mw build render: 1 files in ")
+        assert "files/s" in captured.out
+
+    def test_build_post_warn_reports_file_and_reason(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        (tmp_path / "page.html").write_text("<!-- mw-fence:not json --><p>body</p>", encoding="utf-8")
+        exit_code = main(["build", "post", str(tmp_path), str(tmp_path / "out"), "--warn", "--backend", "thread"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        assert "page.html: Skipping malformed mw-fence marker" in captured.err
+
+    def test_build_warns_about_an_undecodable_file_and_goes_on(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        (tmp_path / "good.md").write_text("Plain.", encoding="utf-8")
+        (tmp_path / "bad.md").write_bytes(b"\xff")
+        exit_code = main(["build", "pre", str(tmp_path), str(tmp_path / "out"), "--warn", "--backend", "thread"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        assert captured.out.startswith("mw build pre: 1 files in ")
+        assert "bad.md: not built: 'utf-8' codec can't decode byte 0xff" in captured.err
+        assert (tmp_path / "out" / "good.md").read_text(encoding="utf-8") == "Plain."
+
+    def test_build_compress_writes_sidecars(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        (tmp_path / "page.html").write_text("<p>body</p>", encoding="utf-8")
+        argv = [
+            "build",
+            "post",
+            str(tmp_path),
+            str(tmp_path / "out"),
+            "--compress",
+            "gz",
+            "--compress",
+            "gz",
+            "-j",
+            "1",
+        ]
+        assert main(argv) == 0
+        assert sorted(path.name for path in (tmp_path / "out").iterdir()) == ["page.html", "page.html.gz"]
+
+    def test_build_pre_compress_returns_two(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        exit_code = main(["build", "pre", str(tmp_path), str(tmp_path / "out"), "--compress", "gz"])
+        assert exit_code == 2
+        assert "compressed sidecars need post or render" in capsys.readouterr().err
+
+    def test_build_shard_and_merge_manifests(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        for index in range(6):
+            (tmp_path / f"p{index}.html").write_text("<p>body</p>", encoding="utf-8")
+        out = tmp_path / "out"
+        for index in (1, 2):
+            argv = ["build", "post", str(tmp_path), str(out), "--shard", f"{index}/2", "--shard-by", "size", "-j", "1"]
+            assert main(argv) == 0
+            assert capsys.readouterr().out.endswith(f" [shard {index}/2]\n")
+        partials = sorted(str(path) for path in out.glob(".mw-manifest.shard-*-of-2.json"))
+        assert main(["merge-manifests", str(out / ".mw-manifest.json"), *partials]) == 0
+        assert capsys.readouterr().out == "mw merge-manifests: 6 files from 2 manifests\n"
+        assert len(json.loads((out / ".mw-manifest.json").read_text(encoding="utf-8"))["files"]) == 6
+
+    @pytest.mark.parametrize("spec", ["0/2", "3/2", "half"])
+    def test_build_bad_shard_returns_two(self, tmp_path: Path, capsys: pytest.CaptureFixture[str], spec: str) -> None:
+        assert main(["build", "pre", str(tmp_path), str(tmp_path / "out"), "--shard", spec]) == 2
+        assert "expected I/N" in capsys.readouterr().err
+
+    def test_merge_manifests_usage_errors(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        assert main(["merge-manifests", str(tmp_path / "m.json"), str(tmp_path / "missing.json")]) == 2
+        assert "mw merge-manifests: not a file:" in capsys.readouterr().err
+        (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+        assert main(["merge-manifests", str(tmp_path / "m.json"), str(tmp_path / "broken.json")]) == 2
+        assert "not a markwright manifest" in capsys.readouterr().err
+        assert not (tmp_path / "m.json").exists()
+
+    def test_build_unknown_use_name_returns_two(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        exit_code = main(["build", "pre", str(tmp_path), str(tmp_path / "out"), "--use", "bogus"])
+        captured = capsys.readouterr()
+        assert exit_code == 2
+        assert "bogus" in captured.err
+
+    def test_build_missing_source_returns_two(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        exit_code = main(["build", "pre", str(tmp_path / "missing"), str(tmp_path / "out")])
+        captured = capsys.readouterr()
+        assert exit_code == 2
+        assert "not a directory" in captured.err
+
+    def test_build_over_its_own_inputs_returns_two(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        exit_code = main(["build", "pre", str(tmp_path), str(tmp_path)])
+        captured = capsys.readouterr()
+        assert exit_code == 2
+        assert "overwrite its inputs" in captured.err
+
+
+class TestCliWatch:
+    """Tests for the watch subcommand: incremental rebuilds of a tree."""
+
+    def test_watch_once_builds_then_reports_nothing_to_do(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        (tmp_path / "page.md").write_text("[youtube dQw4w9WgXcQ]", encoding="utf-8")
+        arguments = ["watch", str(tmp_path), str(tmp_path / "out"), "--use", "youtube", "--once"]
+        assert main(arguments) == 0
+        assert capsys.readouterr().out.startswith("mw watch pre: 1 rebuilt, 0 removed in ")
+        assert main(arguments) == 0
+        assert capsys.readouterr().out == ""
+        assert "<iframe" in (tmp_path / "out" / "page.md").read_text(encoding="utf-8")
+
+    def test_watch_runs_until_interrupted_and_warns(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        def interrupted(watcher: watch.Watcher, report: Callable[[watch.SyncResult], None], **_: object) -> None:
+            report(watcher.sync())
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(watch.Watcher, "run", interrupted)
+        (tmp_path / "page.html").write_text("<!-- mw-fence:not json --><p>body</p>", encoding="utf-8")
+        exit_code = main(["watch", str(tmp_path), str(tmp_path / "out"), "--stage", "post", "--warn"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        assert "mw watch: watching" in captured.err
+        assert "page.html: Skipping malformed mw-fence marker" in captured.err
+        assert captured.out.startswith("mw watch post: 1 rebuilt")
+
+    def test_watch_survives_a_dangling_lock_file(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "page.md").write_text("Plain.", encoding="utf-8")
+        (tmp_path / "src" / ".#page.md").symlink_to("user@host.1234")
+        assert main(["watch", str(tmp_path / "src"), str(tmp_path / "out"), "--once"]) == 0
+        assert capsys.readouterr().out.startswith("mw watch pre: 1 rebuilt, 0 removed in ")
+
+    def test_watch_unknown_use_name_returns_two(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        assert main(["watch", str(tmp_path), str(tmp_path / "out"), "--use", "bogus"]) == 2
+        assert "bogus" in capsys.readouterr().err
+
+    def test_watch_missing_source_returns_two(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        assert main(["watch", str(tmp_path / "missing"), str(tmp_path / "out")]) == 2
+        assert "not a directory" in capsys.readouterr().err
+
+    def test_watch_over_its_own_inputs_returns_two(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        assert main(["watch", str(tmp_path), str(tmp_path)]) == 2
+        assert "overwrite its inputs" in capsys.readouterr().err
+
+
+class TestCliBench:
+    """Tests for the bench subcommand: timing every stage over a corpus."""
+
+    def test_bench_prints_a_table(self, capsys: pytest.CaptureFixture[str]) -> None:
+        exit_code = main(["bench", "--documents", "2", "-n", "1", "--warmup", "0", "--use", "youtube"])
+        lines = capsys.readouterr().out.splitlines()
+        assert exit_code == 0
+        assert lines[0].startswith("2 documents, ")
+        assert [line.split()[0] for line in lines[2:]] == ["pre:youtube", "pre", "post", "render"]
+
+    def test_bench_json_over_a_corpus_directory(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        (tmp_path / "page.md").write_text("[youtube dQw4w9WgXcQ]", encoding="utf-8")
+        exit_code = main(["bench", "--corpus", str(tmp_path), "-n", "1", "--use", "youtube", "--json"])
+        report = json.loads(capsys.readouterr().out)
+        assert exit_code == 0
+        assert report["stages"][0]["stage"] == "pre:youtube"
+        assert report["stages"][0]["documents"] == 1
+
+    def test_bench_unknown_use_name_returns_two(self, capsys: pytest.CaptureFixture[str]) -> None:
+        assert main(["bench", "--use", "bogus"]) == 2
+        assert "bogus" in capsys.readouterr().err
+
+    def test_bench_missing_corpus_returns_two(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        assert main(["bench", "--corpus", str(tmp_path / "missing")]) == 2
+        assert "not a directory" in capsys.readouterr().err
+
+    def test_bench_empty_corpus_returns_two(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        assert main(["bench", "--corpus", str(tmp_path)]) == 2
+        assert "corpus is empty" in capsys.readouterr().err
+
+
+class TestCliProfile:
+    """Tests for the profile subcommand: cProfile and tracemalloc over one document."""
+
+    def test_profile_prints_report(self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]) -> None:
+        _feed_stdin(monkeypatch, "```command\n[label deploy.sh]\nls\n```\n")
+        exit_code = main(["profile", "pre", "--use", "fence", "--top", "5", "--repeat", "3"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        assert captured.out.startswith("mw profile pre: 3 run(s)")
+
+    def test_profile_writes_pstats(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        _feed_stdin(monkeypatch, "<p>x</p>")
+        assert main(["profile", "post", "--pstats", str(tmp_path / "post.pstats")]) == 0
+        assert pstats.Stats(str(tmp_path / "post.pstats")).total_calls > 0  # type: ignore[attr-defined]
+
+    def test_profile_unknown_use_name_returns_two(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _feed_stdin(monkeypatch, "text")
+        assert main(["profile", "pre", "--use", "bogus"]) == 2
+        assert "bogus" in capsys.readouterr().err
+
+    def test_profile_repeat_below_one_returns_two(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _feed_stdin(monkeypatch, "text")
+        assert main(["profile", "post", "--repeat", "0"]) == 2
+        assert "mw profile: repeat must be at least 1" in capsys.readouterr().err
+
+
+class TestCliStats:
+    """Tests for --stats reporting each stage's time, sizes, and counts to stderr as JSON."""
+
+    def test_pre_stats_report_each_stage(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        source = "[youtube dQw4w9WgXcQ]\n\nText with a <^>prose<^> marker."
+        _feed_stdin(monkeypatch, source)
+        exit_code = main(["pre", "--use", "youtube", "--use", "highlight", "--use", "twitter", "--stats"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        report = json.loads(captured.err)
+        assert report["step"] == "pre"
+        assert report["input_size"] == len(source)
+        assert report["output_size"] == len(captured.out)
+        assert [stage["name"] for stage in report["stages"]] == ["youtube", "highlight"]
+        assert report["stages"][0]["counts"] == {"embeds_expanded.youtube": 1}
+        assert report["stages"][1]["counts"] == {"regions_wrapped": 1}
+        assert report["skipped"] == ["twitter"]
+        assert report["seconds"] >= report["stages"][0]["seconds"]
+
+    def test_post_stats_follow_warnings(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _feed_stdin(monkeypatch, "<!-- mw-fence:{bad} -->\n<pre><code>x\n</code></pre>")
+        exit_code = main(["post", "--use", "fence", "--warn", "--stats"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        warning, stats_line = captured.err.splitlines()
+        assert warning.startswith("Skipping malformed mw-fence marker")
+        report = json.loads(stats_line)
+        assert report["step"] == "post"
+        assert report["stages"][0]["counts"] == {"markers_skipped": 1}
+
+    def test_render_stats_report_one_stage(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _feed_stdin(monkeypatch, "[youtube dQw4w9WgXcQ]\n\nText with a <^>prose<^> marker.")
+        exit_code = main(["render", "--use", "youtube", "--use", "highlight", "--stats"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        report = json.loads(captured.err)
+        assert report["output_size"] == len(captured.out)
+        assert report["skipped"] == []
+        (stage,) = report["stages"]
+        assert stage["name"] == "render"
+        assert stage["seconds"] == report["seconds"]
+        assert stage["counts"] == {"embeds_expanded.youtube": 1, "regions_wrapped": 1}
+
+    def test_framed_stream_reports_one_line_per_document(
+        self, monkeypatch: pytest.MonkeyPatch, capsysbinary: pytest.CaptureFixture[bytes]
+    ) -> None:
+        monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(b"[youtube a]\0plain\0")))
+        assert main(["pre", "--framing", "nul", "--stats"]) == 0
+        lines = capsysbinary.readouterr().err.splitlines()
+        assert [json.loads(line)["input_size"] for line in lines] == [11, 5]
+
+    def test_no_stats_without_the_flag(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _feed_stdin(monkeypatch, "[youtube dQw4w9WgXcQ]")
+        assert main(["pre"]) == 0
+        assert capsys.readouterr().err == ""
+
+
+class TestCliPassThrough:
+    """Tests for copying documents no selected stage could change straight to stdout."""
+
+    def test_post_copies_plain_file_byte_for_byte(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path, capfd: pytest.CaptureFixture[str]
+    ) -> None:
+        page = tmp_path / "page.html"
+        page.write_bytes("<p>caf\u00e9 \xff</p>\n".encode())
+        with page.open("rb") as stdin:
+            monkeypatch.setattr("sys.stdin", io.TextIOWrapper(stdin))
+            assert main(["post"]) == 0
+        assert capfd.readouterr().out == "<p>caf\u00e9 \xff</p>\n"
+
+    def test_post_transforms_file_with_a_trigger(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        page = tmp_path / "page.html"
+        page.write_text('<p class="codepen">pen</p>', encoding="utf-8")
+        with page.open("rb") as stdin:
+            monkeypatch.setattr("sys.stdin", io.TextIOWrapper(stdin))
+            assert main(["post"]) == 0
+        assert capsys.readouterr().out.endswith(CODEPEN_SCRIPT)
+
+    def test_pre_copies_plain_stream(self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]) -> None:
+        _feed_stdin(monkeypatch, "# Plain page\n")
+        assert main(["pre"]) == 0
+        assert capsys.readouterr().out == "# Plain page\n"
+
+    def test_carriage_returns_are_still_normalized(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _feed_stdin(monkeypatch, "line one\r\nline two\r\n")
+        assert main(["post"]) == 0
+        assert capsys.readouterr().out == "line one\nline two\n"
+
+    def test_framed_plain_document_is_copied(
+        self, monkeypatch: pytest.MonkeyPatch, capsysbinary: pytest.CaptureFixture[bytes]
+    ) -> None:
+        monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(b"<p>a</p>\0<p>&lt;^&gt;b&lt;^&gt;</p>\0")))
+        assert main(["post", "--framing", "nul"]) == 0
+        assert capsysbinary.readouterr().out == b"<p>a</p>\0<p><mark>b</mark></p>\0"
+
+    def test_reports_turn_the_fast_path_off(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        _feed_stdin(monkeypatch, "<p>plain</p>")
+        assert main(["post", "--report-skips"]) == 0
+        captured = capsys.readouterr()
+        assert captured.out == "<p>plain</p>"
+        assert captured.err.startswith("mw post: skipped 5 of 5 stages")
+
+
+class TestPassThroughCopy:
+    """Tests for the kernel copy and its fallbacks behind the pass-through fast path."""
+
+    @pytest.fixture
+    def page(self, tmp_path: Path) -> Path:
+        page = tmp_path / "page.html"
+        page.write_bytes(b"<p>plain</p>")
+        return page
+
+    def test_unchanged_file_is_sent_to_a_file(self, page: Path, tmp_path: Path) -> None:
+        output = tmp_path / "out.html"
+        with page.open("rb") as source, output.open("wb") as destination:
+            assert _passthrough.pass_through(source, destination, lambda data: True) is None
+        assert output.read_bytes() == b"<p>plain</p>"
+
+    def test_file_needing_work_is_returned(self, page: Path) -> None:
+        with page.open("rb") as source:
+            assert _passthrough.pass_through(source, io.BytesIO(), lambda data: False) == b"<p>plain</p>"
+
+    def test_piped_documents_are_read_as_bytes(self) -> None:
+        destination = io.BytesIO()
+        assert _passthrough.pass_through(io.BytesIO(b"a"), destination, lambda data: True) is None
+        assert destination.getvalue() == b"a"
+        assert _passthrough.pass_through(io.BytesIO(b"b"), destination, lambda data: False) == b"b"
+
+    def test_empty_or_partly_read_file_is_not_mapped(self, page: Path, tmp_path: Path) -> None:
+        empty = tmp_path / "empty.html"
+        empty.write_bytes(b"")
+        with empty.open("rb") as source:
+            assert _passthrough._mappable(source) is None
+        with page.open("rb") as source:
+            source.read(3)
+            assert _passthrough._mappable(source) is None
+
+    def test_pipe_is_not_mapped(self) -> None:
+        reader, writer = os.pipe()
+        with os.fdopen(reader, "rb") as source, os.fdopen(writer, "wb"):
+            assert _passthrough._mappable(source) is None
+
+    def test_unsendable_destination_gets_a_buffered_copy(self, page: Path) -> None:
+        destination = io.BytesIO()
+        with page.open("rb") as source:
+            assert _passthrough.pass_through(source, destination, lambda data: True) is None
+        assert destination.getvalue() == b"<p>plain</p>"
+
+    def test_platform_without_sendfile_copies(
+        self, monkeypatch: pytest.MonkeyPatch, page: Path, tmp_path: Path
+    ) -> None:
+        monkeypatch.delattr(os, "sendfile")
+        with page.open("rb") as source, (tmp_path / "out").open("wb") as destination:
+            assert not _passthrough._send(source.fileno(), destination, 12)
+
+    def test_refused_sendfile_copies(self, monkeypatch: pytest.MonkeyPatch, page: Path, tmp_path: Path) -> None:
+        def refuse(*args: object) -> int:
+            raise OSError("EINVAL")
+
+        monkeypatch.setattr(os, "sendfile", refuse)
+        output = tmp_path / "out.html"
+        with page.open("rb") as source, output.open("wb") as destination:
+            assert _passthrough.pass_through(source, destination, lambda data: True) is None
+        assert output.read_bytes() == b"<p>plain</p>"
+
+    def test_failure_after_a_partial_send_raises(
+        self, monkeypatch: pytest.MonkeyPatch, page: Path, tmp_path: Path
+    ) -> None:
+        sends = iter([5])
+
+        def partial(*args: object) -> int:
+            for sent in sends:
+                return sent
+            raise OSError("EIO")
+
+        monkeypatch.setattr(os, "sendfile", partial)
+        with (
+            page.open("rb") as source,
+            (tmp_path / "out").open("wb") as destination,
+            pytest.raises(OSError, match="EIO"),
+        ):
+            _passthrough._send(source.fileno(), destination, 12)
+
+    def test_shrunk_file_stops_the_send(self, monkeypatch: pytest.MonkeyPatch, page: Path, tmp_path: Path) -> None:
+        monkeypatch.setattr(os, "sendfile", lambda *args: 0)
+        with page.open("rb") as source, (tmp_path / "out").open("wb") as destination:
+            assert _passthrough._send(source.fileno(), destination, 12)
+
+
+class TestCliInPlace:
+    """Tests for --in-place rewriting many files in one process."""
+
+    def test_pre_rewrites_files_then_skips_them(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        page = tmp_path / "page.md"
+        page.write_text("[youtube dQw4w9WgXcQ]\n", encoding="utf-8")
+        argv = ["pre", "--in-place", str(page), "--manifest", str(tmp_path / "m.json")]
+        assert main(argv) == 0
+        assert capsys.readouterr().out.startswith("mw pre --in-place: 1 rewritten, 0 unchanged, 0 current in ")
+        assert "<iframe" in page.read_text(encoding="utf-8")
+        assert main(argv) == 0
+        assert capsys.readouterr().out.startswith("mw pre --in-place: 0 rewritten, 0 unchanged, 1 current in ")
+
+    def test_post_warn_reports_file_and_reason(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        page = tmp_path / "index.html"
+        page.write_text("<!-- mw-fence:bad --><p>a</p>", encoding="utf-8")
+        assert main(["post", "--warn", "--in-place", str(page), "--manifest", str(tmp_path / "m.json")]) == 0
+        assert capsys.readouterr().err == f"{page}: Skipping malformed mw-fence marker: 'bad'\n"
+
+    def test_pre_reports_an_undecodable_file(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        page = tmp_path / "page.md"
+        page.write_bytes(b"[youtube abc] \xff")
+        assert main(["pre", "--in-place", str(page), "--manifest", str(tmp_path / "m.json")]) == 0
+        captured = capsys.readouterr()
+        assert captured.err.startswith(f"{page}: not rewritten: 'utf-8' codec can't decode byte 0xff")
+        assert captured.out.startswith("mw pre --in-place: 0 rewritten, 0 unchanged, 0 current in ")
+
+    def test_post_without_warn_stays_quiet(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        page = tmp_path / "index.html"
+        page.write_text("<!-- mw-fence:bad --><p>a</p>", encoding="utf-8")
+        assert main(["post", "--in-place", str(page), "--manifest", str(tmp_path / "m.json")]) == 0
+        assert capsys.readouterr().err == ""
+
+    @pytest.mark.parametrize("extra", [["--stats"], ["--framing", "nul"], ["--report-skips"]])
+    def test_stdin_flags_are_usage_errors(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str], extra: list[str]
+    ) -> None:
+        page = tmp_path / "page.md"
+        page.write_text("text", encoding="utf-8")
+        assert main(["pre", "--in-place", str(page), *extra]) == 2
+        assert "cannot be combined" in capsys.readouterr().err
+
+    def test_missing_file_is_a_usage_error(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        assert main(["post", "--in-place", str(tmp_path / "nope.html")]) == 2
+        assert "not a file" in capsys.readouterr().err
+
+    def test_manifest_without_in_place_is_a_usage_error(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        assert main(["pre", "--manifest", str(tmp_path / "m.json")]) == 2
+        assert "--manifest and --shard need --in-place" in capsys.readouterr().err
+        assert main(["post", "--shard", "1/2"]) == 2
+        assert "--manifest and --shard need --in-place" in capsys.readouterr().err
+
+    def test_shard_rewrites_its_slice_and_says_so(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        page = tmp_path / "page.md"
+        page.write_text("[youtube dQw4w9WgXcQ]\n", encoding="utf-8")
+        argv = ["pre", "--in-place", str(page), "--manifest", str(tmp_path / "m.json"), "--shard", "1/1"]
+        assert main(argv) == 0
+        assert capsys.readouterr().out.endswith(" [shard 1/1]\n")
+        assert (tmp_path / "m.shard-1-of-1.json").is_file()
+        assert (tmp_path / "m.shard-1-of-1.stats.json").is_file()
+
+
+class TestCliTree:
+    """Tests for --tree rewriting every matching file under a directory."""
+
+    def test_post_tree_rewrites_changed_pages(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        (tmp_path / "a").mkdir()
+        (tmp_path / "a" / "index.html").write_text("<!-- mw-fence:bad --><p>&lt;^&gt;x&lt;^&gt;</p>", encoding="utf-8")
+        (tmp_path / "index.html").write_text("<p>plain</p>", encoding="utf-8")
+        assert main(["post", "--tree", str(tmp_path), "--warn", "-j", "1"]) == 0
+        captured = capsys.readouterr()
+        assert captured.out.startswith("mw post --tree: 1 rewritten, 1 unchanged in ")
+        assert "Skipping malformed mw-fence marker" in captured.err
+        assert "<mark>x</mark>" in (tmp_path / "a" / "index.html").read_text(encoding="utf-8")
+
+    def test_pre_tree_runs_on_a_pool(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        for index in range(3):
+            (tmp_path / f"p{index}.md").write_text(f"[youtube id{index}]\n", encoding="utf-8")
+        assert main(["pre", "--tree", str(tmp_path), "--backend", "thread", "-j", "2"]) == 0
+        assert capsys.readouterr().out.startswith("mw pre --tree: 3 rewritten, 0 unchanged in ")
+
+    @pytest.mark.parametrize(
+        ("extra", "message"),
+        [
+            (["--in-place", "x.md"], "--tree and --in-place cannot be combined"),
+            (["--manifest", "m.json"], "--manifest and --shard need --in-place"),
+            (["--shard", "1/2"], "--manifest and --shard need --in-place"),
+            (["--stats"], "--tree cannot be combined with --framing, --stats, or --report-skips"),
+        ],
+    )
+    def test_usage_errors(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str], extra: list[str], message: str
+    ) -> None:
+        assert main(["pre", "--tree", str(tmp_path), *extra]) == 2
+        assert message in capsys.readouterr().err
+
+    @pytest.mark.parametrize(
+        "arguments",
+        [["pre", "-j", "4"], ["post", "--backend", "thread"], ["pre", "--in-place", "page.md", "-j", "2"]],
+    )
+    def test_pool_flags_need_tree(self, capsys: pytest.CaptureFixture[str], arguments: list[str]) -> None:
+        assert main(arguments) == 2
+        assert "-j and --backend need --tree" in capsys.readouterr().err
+
+    def test_missing_directory_is_a_usage_error(self, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+        assert main(["post", "--tree", str(tmp_path / "public")]) == 2
+        assert "mw post: not a directory:" in capsys.readouterr().err
+
+
+class TestCliFraming:
+    """Tests for --framing streaming many documents through one filter process."""
+
+    @pytest.mark.parametrize(
+        ("framing", "stream", "expected"),
+        [
+            ("nul", b"[youtube a]\0<^>x<^>\0", [b"[youtube a]", b"<^>x<^>"]),
+            ("length", b"\x00\x00\x00\x0b[youtube a]\x00\x00\x00\x07<^>x<^>", [b"[youtube a]", b"<^>x<^>"]),
+        ],
+    )
+    def test_pre_answers_each_document_in_kind(
+        self,
+        monkeypatch: pytest.MonkeyPatch,
+        capsysbinary: pytest.CaptureFixture[bytes],
+        framing: str,
+        stream: bytes,
+        expected: list[bytes],
+    ) -> None:
+        monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(stream)))
+        exit_code = main(["pre", "--framing", framing])
+        captured = capsysbinary.readouterr()
+        assert exit_code == 0
+        outputs = list(iter_documents(io.BytesIO(captured.out), framing))
+        assert outputs == [run_pre(document.decode(), list(EXTENSION_NAMES)).encode() for document in expected]
+
+    def test_post_and_render_frame_their_outputs(
+        self, monkeypatch: pytest.MonkeyPatch, capsysbinary: pytest.CaptureFixture[bytes]
+    ) -> None:
+        monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(b"<!-- mw-fence:bad --><p>a</p>\0<p>b</p>\0")))
+        assert main(["post", "--framing", "nul", "--warn", "--report-skips"]) == 0
+        captured = capsysbinary.readouterr()
+        assert captured.out.count(b"\0") == 2
+        assert captured.err.count(b"mw post: skipped") == 2
+        monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(b"# One\0# Two\0")))
+        assert main(["render", "--framing", "nul", "--use", "highlight"]) == 0
+        assert capsysbinary.readouterr().out == b"<h1>One</h1>\0<h1>Two</h1>\0"
+
+    def test_undecodable_document_is_answered_unchanged_and_the_stream_goes_on(
+        self, monkeypatch: pytest.MonkeyPatch, capsysbinary: pytest.CaptureFixture[bytes]
+    ) -> None:
+        stream = b"\x00\x00\x00\x09<^>x<^> \xff\x00\x00\x00\x09<^>y<^>\r\n"
+        monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(stream), encoding="utf-8"))
+        assert main(["pre", "--framing", "length"]) == 0
+        captured = capsysbinary.readouterr()
+        assert list(iter_documents(io.BytesIO(captured.out), "length")) == [b"<^>x<^> \xff", b"<mark>y</mark>\n"]
+        assert b"mw pre: document 1 left unchanged: 'utf-8' codec can't decode byte 0xff" in captured.err
+
+    def test_surrogate_escaped_document_round_trips(
+        self, monkeypatch: pytest.MonkeyPatch, capsysbinary: pytest.CaptureFixture[bytes]
+    ) -> None:
+        stdin = io.TextIOWrapper(io.BytesIO(b"<^>x<^> \xff\0"), encoding="utf-8", errors="surrogateescape")
+        written = io.BytesIO()
+        stdout = io.TextIOWrapper(written, encoding="utf-8", errors="surrogateescape")
+        monkeypatch.setattr("sys.stdin", stdin)
+        monkeypatch.setattr("sys.stdout", stdout)
+        assert main(["pre", "--framing", "nul"]) == 0
+        stdout.flush()
+        assert written.getvalue() == b"<mark>x</mark> \xff\0"
+
+
+class TestCliJsonl:
+    """Tests for the jsonl subcommand: JSON-lines requests in, JSON-lines answers out."""
+
+    REQUESTS = "".join(
+        json.dumps({"id": index, "stage": "pre", "text": "[youtube dQw4w9WgXcQ]"}) + "\n" for index in range(3)
+    )
+
+    @pytest.mark.parametrize("jobs", ["1", "2"])
+    def test_jsonl_answers_every_request(
+        self, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str], jobs: str
+    ) -> None:
+        _feed_stdin(monkeypatch, self.REQUESTS)
+        exit_code = main(["jsonl", "-j", jobs, "--backend", "thread"])
+        answers = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert exit_code == 0
+        assert sorted(answer["id"] for answer in answers) == [0, 1, 2]
+        assert all("<iframe" in answer["output"] for answer in answers)
@@ -5,7 +5,8 @@ from __future__ import annotations
 
 import markdown
 
-from markwright.codepen import apply_html, expand_source
+from markwright._scan import LiteralIndex
+from markwright.codepen import CODEPEN_SCRIPT, CODEPEN_SIGNATURE, apply_html, expand_source, script_edits
 
 
 def render(source: str) -> str:
@@ -122,6 +123,14 @@ class TestCodePenScript:
         result = render("Just some text")
         assert "static.codepen.io" not in result
 
+    def test_script_edits_append_once_from_index(self) -> None:
+        html_input = f"<p {CODEPEN_SIGNATURE}></p>"
+        literals = (CODEPEN_SIGNATURE, CODEPEN_SCRIPT)
+        edits = script_edits(html_input, LiteralIndex.build(html_input, literals))
+        assert edits == [(len(html_input), 0, "\n" + CODEPEN_SCRIPT)]
+        injected = html_input + edits[0][2]
+        assert script_edits(injected, LiteralIndex.build(injected, literals)) == []
+
 
 class TestCodePenEdgeCases:
     """Tests for edge cases."""
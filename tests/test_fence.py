@@ -2,8 +2,11 @@
 # Verifies directive extraction, HTML injection, environment classes, line prefixes, and edge cases.
 
 import markdown
+import pytest
 
-from markwright.fence import apply_html, expand_source
+from markwright._scan import LiteralIndex
+from markwright._segment import join_segments, segment_source
+from markwright.fence import MARKER_PREFIX, apply_html, bind_stages, expand_source, marker_edits
 
 
 def render_fence(source: str, allowed_environments: list[str] | None = None) -> str:
@@ -346,6 +349,116 @@ class TestFenceApplyHtml:
             assert "code-label" not in result
 
 
+class TestFenceBindStages:
+    """bind_stages builds stage functions carrying the FenceExtension options."""
+
+    def test_defaults_match_unbound_stages(self) -> None:
+        expand, apply, edits, segments, scan = bind_stages({})
+        source = "```command\n[label deploy.sh]\n[environment local]\necho hi\n```"
+        assert expand(source) == expand_source(source)
+        assert join_segments(segments(segment_source(source))) == expand_source(source)
+        marker = '<!-- mw-fence:{"version": 1, "secondary_label": "s"} -->\n<pre><code>x\n</code></pre>'
+        assert apply(marker, None) == apply_html(marker)
+        assert edits(marker, None) == marker_edits(marker)
+        assert scan(marker, LiteralIndex.build(marker, (MARKER_PREFIX,)), None) == marker_edits(marker)
+
+    def test_secondary_label_class_is_bound(self) -> None:
+        _, apply, _, _, _ = bind_stages({"secondary_label_class": "sub"})
+        marker = '<!-- mw-fence:{"version": 1, "secondary_label": "s"} -->\n<pre><code>x\n</code></pre>'
+        assert '<div class="sub" title="s">s</div>' in apply(marker, None)
+
+    def test_allowed_environments_bound_into_segment_stage(self) -> None:
+        _, _, _, segments, _ = bind_stages({"allowed_environments": ["local"]})
+        source = "intro\n```\n[environment remote]\necho hi\n```"
+        assert join_segments(segments(segment_source(source))) == source
+
+    def test_unknown_option_raises(self) -> None:
+        with pytest.raises(ValueError, match="colour"):
+            bind_stages({"colour": "red"})
+
+    def test_non_string_label_class_raises(self) -> None:
+        with pytest.raises(ValueError, match="strings"):
+            bind_stages({"label_class": 3})
+
+    def test_non_list_allowed_environments_raises(self) -> None:
+        with pytest.raises(ValueError, match="allowed_environments"):
+            bind_stages({"allowed_environments": "local"})
+
+
+class TestFenceMarkerEdits:
+    """marker_edits returns non-overlapping splices against the input HTML."""
+
+    def test_edits_are_offsets_into_the_input(self) -> None:
+        html_input = '<!-- mw-fence:{"version": 1, "label": "a"} -->\n<pre><code>x\n</code></pre>'
+        edits = marker_edits(html_input)
+        assert edits == [(0, html_input.index("\n"), '<div class="code-label" title="a">a</div>\n')]
+
+    def test_prefix_inside_a_payload_or_unterminated_is_not_a_marker(self) -> None:
+        html_input = (
+            '<!-- mw-fence:{"version": 1, "label": "<!-- mw-fence:"} -->\n<pre><code>x\n</code></pre>\n'
+            "<!-- mw-fence: unterminated\n"
+        )
+        result = apply_html(html_input)
+        assert result.startswith('<div class="code-label" title="&lt;!-- mw-fence:">&lt;!-- mw-fence:</div>\n')
+        assert result.endswith("<!-- mw-fence: unterminated\n")
+
+    def test_markers_sharing_a_code_block_merge_into_one_edit_each(self) -> None:
+        # The first marker has no code block of its own, so it styles the next one.
+        html_input = (
+            '<!-- mw-fence:{"version": 1, "environment": "local", "secondary_label": "one"} -->\n<p>prose</p>\n'
+            '<!-- mw-fence:{"version": 1, "prefix_type": "command", "prefix_value": "$", "secondary_label": "two"} -->'
+            "\n<pre><code>ls\n</code></pre>"
+        )
+        result = apply_html(html_input)
+        assert '<pre class="environment-local prefixed command">' in result
+        assert result.index('title="one"') < result.index('title="two"') < result.index("<ol>")
+        assert result.count("<ol>") == 1
+
+    def test_tag_spelled_inside_a_marker_payload_is_not_a_code_block(self) -> None:
+        html_input = (
+            '<!-- mw-fence:{"version": 1, "environment": "local"} -->\n<p>prose</p>\n'
+            '<!-- mw-fence:{"version": 1, "label": "<pre> tags"} -->\n<pre><code>x\n</code></pre>'
+        )
+        result = apply_html(html_input)
+        assert '<pre class="environment-local">' in result
+        assert "&lt;pre&gt; tags</div>" in result
+
+    def test_unclosed_code_spanning_a_later_marker_skips_the_wrap(self) -> None:
+        html_input = (
+            '<!-- mw-fence:{"version": 1, "prefix_type": "command", "prefix_value": "$"} -->\n<pre><code>x\n'
+            '<!-- mw-fence:{"version": 1, "label": "b"} -->\n<pre><code>y\n</code></pre>'
+        )
+        warnings: list[str] = []
+        result = apply_html(html_input, warnings)
+        assert "<!-- mw-fence:" not in result
+        assert '<div class="code-label" title="b">b</div>' in result
+        assert "<ol>" not in result
+        assert warnings == ["Skipping mw-fence styling that overlaps another marker"]
+        assert apply_html(html_input) == result
+
+    def test_unclosed_code_overlap_is_silent_without_warnings(self) -> None:
+        html_input = (
+            '<!-- mw-fence:{"version": 1, "prefix_type": "command", "prefix_value": "$"} -->\n<pre><code>x\n'
+            '<!-- mw-fence:{"version": 1, "label": "b"} -->\n<pre><code>y\n</code></pre>'
+        )
+        assert "<ol>" not in apply_html(html_input)
+
+    def test_styling_edit_inside_another_wrap_is_dropped(self) -> None:
+        # Both markers resolve to the <pre> spelled inside the second marker's
+        # inline <code>, so classing that tag would overlap the line wrap.
+        html_input = (
+            '<!-- mw-fence:{"version": 1, "environment": "local"} -->\n<p>a</p>\n'
+            '<!-- mw-fence:{"version": 1, "prefix_type": "line_numbers"} -->\n<code>x <pre>y</pre> z</code>'
+        )
+        warnings: list[str] = []
+        result = apply_html(html_input, warnings)
+        assert "<!-- mw-fence:" not in result
+        assert 'data-prefix="1"' in result
+        assert "environment-local" not in result
+        assert warnings == ["Skipping mw-fence styling that overlaps another marker"]
+        assert apply_html(html_input) == result
+
+
 class TestFenceBranchCoverage:
     """Exercise the remaining fence branches: an unclosed fence, and markers whose
     adjacent HTML is missing a <pre>, a <code>, a closing </code>, or a trailing
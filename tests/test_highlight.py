@@ -5,7 +5,7 @@ import re
 
 import markdown
 
-from markwright.highlight import apply_html, expand_source
+from markwright.highlight import apply_html, expand_source, highlight_edits
 
 
 def _render(source: str) -> str:
@@ -174,7 +174,31 @@ class TestHighlightExpandSource:
         source = "use `<^>x<^>` here"
         assert expand_source(source) == source
 
+    def test_marker_in_tilde_fence_untouched(self) -> None:
+        source = "~~~\nfoo <^>x<^> bar\n~~~\nafter <^>y<^>"
+        assert expand_source(source) == "~~~\nfoo <^>x<^> bar\n~~~\nafter <mark>y</mark>"
+
+    def test_unclosed_fence_is_highlighted_as_prose(self) -> None:
+        source = "```\nfoo <^>x<^> `<^>y<^>`"
+        assert expand_source(source) == "```\nfoo <mark>x</mark> `<^>y<^>`"
+
     def test_backslash_escaped_prose_marker_left_literal(self) -> None:
         result = expand_source(r"a \<^>x\<^> b")
         assert "<mark>" not in result
         assert "<^>x<^>" in result
+
+
+class TestHighlightEdits:
+    """highlight_edits returns one splice per marked region or escaped marker."""
+
+    def test_region_and_escaped_marker_edits(self) -> None:
+        html_input = "a &lt;^&gt;b&lt;^&gt; c \\&lt;^&gt; d"
+        edits = highlight_edits(html_input)
+        assert edits == [(2, 19, "<mark>b</mark>"), (24, 10, "&lt;^&gt;")]
+
+    def test_escaped_marker_inside_region_is_revealed(self) -> None:
+        html_input = "&lt;^&gt;x \\&lt;^&gt; y&lt;^&gt;"
+        assert apply_html(html_input) == "<mark>x &lt;^&gt; y</mark>"
+
+    def test_no_markers_no_edits(self) -> None:
+        assert highlight_edits("<p>plain</p>") == []
@@ -0,0 +1,226 @@
+# ABOUTME: Tests for the in-place multi-file modes behind mw pre/post --in-place and --tree.
+# Covers atomic rewrites, manifest skips, selection changes, sharding, failures partway through, and whole trees.
+
+from __future__ import annotations
+
+import json
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from markwright.inplace import manifest_key, rewrite_in_place, rewrite_tree
+from markwright.manifest import load_manifest, merge_manifests
+from markwright.registry import run_post, run_pre
+from markwright.shard import Shard
+
+SOURCE = "[youtube dQw4w9WgXcQ]\n\nText <^>marked<^>.\n"
+BROKEN_HTML = "<!-- mw-fence:not json --><p>body</p>\n"
+MARKED_HTML = "<p>a &lt;^&gt;word&lt;^&gt; b</p>\n"
+
+
+@pytest.fixture
+def pages(tmp_path: Path) -> list[Path]:
+    """Two Markdown pages, one with markwright syntax and one without."""
+    (tmp_path / "posts").mkdir()
+    marked = tmp_path / "posts" / "one.md"
+    marked.write_text(SOURCE, encoding="utf-8")
+    plain = tmp_path / "two.md"
+    plain.write_text("Plain text.\n", encoding="utf-8")
+    return [marked, plain]
+
+
+class TestRewriteInPlace:
+    """Tests for rewrite_in_place rewriting files and skipping those already current."""
+
+    def test_rewrites_changed_files_and_leaves_the_rest(self, pages: list[Path], tmp_path: Path) -> None:
+        os.utime(pages[1], ns=(1, 1))
+        result = rewrite_in_place("pre", pages, ["youtube"], manifest=tmp_path / "m.json")
+        assert result.rewritten == (str(pages[0]),)
+        assert result.unchanged == (str(pages[1]),)
+        assert result.current == ()
+        assert pages[0].read_text(encoding="utf-8") == run_pre(SOURCE, ["youtube"])
+        assert pages[1].stat().st_mtime_ns == 1
+
+    def test_rewrite_keeps_the_mode_and_symlinks(self, pages: list[Path], tmp_path: Path) -> None:
+        pages[0].chmod(0o444)
+        link = tmp_path / "link.md"
+        link.symlink_to(pages[0])
+        result = rewrite_in_place("pre", [link], ["youtube"], manifest=tmp_path / "m.json")
+        assert result.rewritten == (str(link),)
+        assert link.is_symlink()
+        assert pages[0].read_text(encoding="utf-8") == run_pre(SOURCE, ["youtube"])
+        assert stat.S_IMODE(pages[0].stat().st_mode) == 0o444
+
+    def test_second_run_skips_every_file(self, pages: list[Path], tmp_path: Path) -> None:
+        rewrite_in_place("pre", pages, ["youtube"], manifest=tmp_path / "m.json")
+        result = rewrite_in_place("pre", pages, ["youtube"], manifest=tmp_path / "m.json")
+        assert result.current == tuple(str(page) for page in pages)
+        assert result.rewritten == result.unchanged == ()
+
+    def test_edited_file_and_changed_selection_run_again(self, pages: list[Path], tmp_path: Path) -> None:
+        manifest = tmp_path / "m.json"
+        rewrite_in_place("pre", pages, ["youtube"], manifest=manifest)
+        pages[1].write_text("[youtube abc]\n", encoding="utf-8")
+        assert rewrite_in_place("pre", pages, ["youtube"], manifest=manifest).rewritten == (str(pages[1]),)
+        result = rewrite_in_place("pre", pages, ["youtube", "highlight"], manifest=manifest)
+        assert result.rewritten == (str(pages[0]),)
+        assert result.unchanged == (str(pages[1]),)
+
+    def test_manifest_keys_are_relative_to_the_manifest(
+        self, pages: list[Path], tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.chdir(tmp_path / "posts")
+        rewrite_in_place("pre", [Path("one.md")], ["youtube"])
+        assert set(load_manifest(tmp_path / "posts" / ".mw-manifest.json")) == {"one.md"}
+        assert manifest_key(pages[0], tmp_path / "m.json") == "posts/one.md"
+
+    def test_other_entries_are_kept(self, pages: list[Path], tmp_path: Path) -> None:
+        manifest = tmp_path / "m.json"
+        rewrite_in_place("pre", [pages[0]], ["youtube"], manifest=manifest)
+        rewrite_in_place("pre", [pages[1]], ["youtube"], manifest=manifest)
+        assert set(load_manifest(manifest)) == {"posts/one.md", "two.md"}
+
+    def test_post_collects_warnings(self, tmp_path: Path) -> None:
+        page = tmp_path / "index.html"
+        page.write_text(BROKEN_HTML, encoding="utf-8")
+        result = rewrite_in_place("post", [page], ["fence"], manifest=tmp_path / "m.json")
+        assert result.rewritten == (str(page),)
+        assert page.read_text(encoding="utf-8") == run_post(BROKEN_HTML, ["fence"])
+        assert result.warnings == (f"{page}: Skipping malformed mw-fence marker: 'not json'",)
+
+    def test_undecodable_file_becomes_a_warning_and_the_run_goes_on(self, pages: list[Path], tmp_path: Path) -> None:
+        bad = tmp_path / "bad.md"
+        bad.write_bytes(b"[youtube abc] \xff")
+        manifest = tmp_path / "m.json"
+        result = rewrite_in_place("pre", [bad, *pages], ["youtube"], manifest=manifest)
+        assert result.rewritten == (str(pages[0]),)
+        assert result.unchanged == (str(pages[1]),)
+        assert result.warnings == (
+            f"{bad}: not rewritten: 'utf-8' codec can't decode byte 0xff in position 14: invalid start byte",
+        )
+        assert bad.read_bytes() == b"[youtube abc] \xff"
+        assert set(load_manifest(manifest)) == {"posts/one.md", "two.md"}
+
+    def test_files_done_before_a_failure_are_recorded(self, pages: list[Path], tmp_path: Path) -> None:
+        manifest = tmp_path / "m.json"
+        with pytest.raises(FileNotFoundError):
+            rewrite_in_place("pre", [pages[0], tmp_path / "missing.md"], ["youtube"], manifest=manifest)
+        assert set(load_manifest(manifest)) == {"posts/one.md"}
+
+    def test_nothing_new_leaves_the_manifest_alone(self, pages: list[Path], tmp_path: Path) -> None:
+        manifest = tmp_path / "m.json"
+        rewrite_in_place("pre", pages, ["youtube"], manifest=manifest)
+        os.utime(manifest, ns=(1, 1))
+        rewrite_in_place("pre", pages, ["youtube"], manifest=manifest)
+        assert manifest.stat().st_mtime_ns == 1
+
+    @pytest.mark.parametrize("shard_by", ["path", "size"])
+    def test_shards_split_the_files_and_keep_partial_manifests(
+        self, pages: list[Path], tmp_path: Path, shard_by: str
+    ) -> None:
+        manifest = tmp_path / "m.json"
+        results = [
+            rewrite_in_place("pre", pages, ["youtube"], manifest=manifest, shard=Shard(index, 2), shard_by=shard_by)
+            for index in (1, 2)
+        ]
+        assert sorted(path for result in results for path in result.rewritten + result.unchanged) == sorted(
+            str(page) for page in pages
+        )
+        partials = [Shard(index, 2).partial(manifest) for index in (1, 2)]
+        assert set(merge_manifests([partial for partial in partials if partial.exists()])) == {"posts/one.md", "two.md"}
+        assert not manifest.exists()
+        stats = json.loads(Shard(1, 2).stats_path(manifest).read_text(encoding="utf-8"))
+        assert stats["files"] == len(results[0].rewritten) + len(results[0].unchanged)
+        assert stats["current"] == 0
+
+    def test_unknown_shard_strategy_raises(self, pages: list[Path]) -> None:
+        with pytest.raises(ValueError, match="unknown shard strategy"):
+            rewrite_in_place("pre", pages, ["youtube"], shard=Shard(1, 2), shard_by="bogus")
+
+    @pytest.mark.parametrize(("step", "names"), [("render", ["youtube"]), ("pre", ["bogus"])])
+    def test_unknown_step_or_name_raises(self, pages: list[Path], step: str, names: list[str]) -> None:
+        with pytest.raises(ValueError, match="unknown"):
+            rewrite_in_place(step, pages, names)  # type: ignore[arg-type]
+
+
+class TestRewriteTree:
+    """Tests for rewrite_tree rewriting a whole tree in place on a worker pool."""
+
+    @pytest.fixture
+    def site(self, tmp_path: Path) -> Path:
+        """A rendered site with a page to change, a plain page, a page left as it was, and non-HTML files."""
+        (tmp_path / "posts" / "one").mkdir(parents=True)
+        (tmp_path / "posts" / "one" / "index.html").write_text(BROKEN_HTML + MARKED_HTML, encoding="utf-8")
+        (tmp_path / "index.html").write_text("<p>Plain.</p>\n", encoding="utf-8")
+        (tmp_path / "lonely.html").write_text("<p>a &lt;^&gt; b</p>\n", encoding="utf-8")
+        (tmp_path / "empty.html").write_text("", encoding="utf-8")
+        (tmp_path / "style.css").write_text("p &lt;^&gt;x&lt;^&gt; {}", encoding="utf-8")
+        for page in tmp_path.rglob("*.*"):
+            os.utime(page, ns=(1, 1))
+        return tmp_path
+
+    def test_rewrites_only_pages_the_step_changes(self, site: Path) -> None:
+        result = rewrite_tree("post", site, ["fence", "highlight"], max_workers=1)
+        page = site / "posts" / "one" / "index.html"
+        assert result.rewritten == (str(page),)
+        assert sorted(result.unchanged) == sorted(
+            str(site / name) for name in ("empty.html", "index.html", "lonely.html")
+        )
+        assert result.current == ()
+        assert page.read_text(encoding="utf-8") == run_post(BROKEN_HTML + MARKED_HTML, ["fence", "highlight"])
+        assert result.warnings == (f"{page}: Skipping malformed mw-fence marker: 'not json'",)
+        untouched = [path for path in site.rglob("*.*") if path != page]
+        assert [path.stat().st_mtime_ns for path in untouched] == [1] * len(untouched)
+
+    def test_rewrites_keep_modes_and_symlinks(self, site: Path, tmp_path_factory: pytest.TempPathFactory) -> None:
+        shared = tmp_path_factory.mktemp("shared") / "page.html"
+        shared.write_text(MARKED_HTML, encoding="utf-8")
+        shared.chmod(0o664)
+        (site / "linked.html").symlink_to(shared)
+        page = site / "posts" / "one" / "index.html"
+        page.chmod(0o600)
+        result = rewrite_tree("post", site, ["fence", "highlight"], max_workers=1)
+        assert sorted(result.rewritten) == [str(site / "linked.html"), str(page)]
+        assert (site / "linked.html").is_symlink()
+        assert shared.read_text(encoding="utf-8") == run_post(MARKED_HTML, ["highlight"])
+        assert [stat.S_IMODE(path.stat().st_mode) for path in (shared, page)] == [0o664, 0o600]
+
+    def test_pool_run_matches_serial_run(self, site: Path, tmp_path_factory: pytest.TempPathFactory) -> None:
+        copy = tmp_path_factory.mktemp("copy")
+        for page in site.rglob("*.html"):
+            target = copy / page.relative_to(site)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(page.read_bytes())
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            pooled = rewrite_tree("post", site, ["fence", "highlight"], executor=executor)
+        serial = rewrite_tree("post", copy, ["fence", "highlight"], max_workers=1)
+        assert len(pooled.rewritten) == len(serial.rewritten) == 1
+        assert all(page.read_bytes() == (copy / page.relative_to(site)).read_bytes() for page in site.rglob("*.html"))
+
+    def test_undecodable_page_becomes_a_warning(self, site: Path) -> None:
+        (site / "bad.html").write_bytes(b"<p>&lt;^&gt;x&lt;^&gt; \xff</p>")
+        result = rewrite_tree("post", site, ["highlight"], max_workers=1)
+        assert str(site / "bad.html") in result.unchanged
+        assert f"{site / 'bad.html'}: not rewritten: 'utf-8' codec can't decode byte 0xff" in result.warnings[0]
+        assert (site / "bad.html").read_bytes() == b"<p>&lt;^&gt;x&lt;^&gt; \xff</p>"
+
+    def test_pages_without_triggers_are_never_decoded(self, tmp_path: Path) -> None:
+        (tmp_path / "binary.html").write_bytes(b"<p>\xff\xfe</p>")
+        assert rewrite_tree("post", tmp_path, ["highlight"], max_workers=1).unchanged == (
+            str(tmp_path / "binary.html"),
+        )
+
+    def test_pre_rewrites_markdown_and_keeps_line_endings(self, tmp_path: Path) -> None:
+        (tmp_path / "page.md").write_bytes(b"[youtube dQw4w9WgXcQ]\r\n\r\nText.\r\n")
+        result = rewrite_tree("pre", tmp_path, ["youtube"], max_workers=1)
+        assert result.rewritten == (str(tmp_path / "page.md"),)
+        expected = run_pre("[youtube dQw4w9WgXcQ]\r\n\r\nText.\r\n", ["youtube"])
+        assert (tmp_path / "page.md").read_bytes() == expected.encode()
+
+    @pytest.mark.parametrize(("step", "names"), [("render", ["youtube"]), ("post", ["bogus"])])
+    def test_unknown_step_or_name_raises(self, tmp_path: Path, step: str, names: list[str]) -> None:
+        with pytest.raises(ValueError, match="unknown"):
+            rewrite_tree(step, tmp_path, names)  # type: ignore[arg-type]
@@ -5,7 +5,8 @@ from __future__ import annotations
 
 import markdown
 
-from markwright.instagram import apply_html, expand_source
+from markwright._scan import LiteralIndex
+from markwright.instagram import INSTAGRAM_SCRIPT, INSTAGRAM_SIGNATURE, apply_html, expand_source, script_edits
 
 
 def render(source: str) -> str:
@@ -107,6 +108,14 @@ class TestInstagramScript:
         result = render("Just some text")
         assert "instagram.com/embed.js" not in result
 
+    def test_script_edits_append_once_from_index(self) -> None:
+        html_input = f"<p {INSTAGRAM_SIGNATURE}></p>"
+        literals = (INSTAGRAM_SIGNATURE, INSTAGRAM_SCRIPT)
+        edits = script_edits(html_input, LiteralIndex.build(html_input, literals))
+        assert edits == [(len(html_input), 0, "\n" + INSTAGRAM_SCRIPT)]
+        injected = html_input + edits[0][2]
+        assert script_edits(injected, LiteralIndex.build(injected, literals)) == []
+
 
 class TestInstagramEdgeCases:
     """Tests for edge cases."""
@@ -0,0 +1,133 @@
+# ABOUTME: Tests for the mw jsonl request/response protocol.
+# Covers answers and errors per request, completion-order streaming on a pool, and the in-flight window.
+
+from __future__ import annotations
+
+import json
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+import pytest
+
+from markwright.jsonl import answer_line, run_stream
+from markwright.registry import EXTENSION_NAMES, run_post, run_pre
+from markwright.render import render
+
+SOURCE = "[youtube dQw4w9WgXcQ]\n\nText <^>marked<^>.\n"
+
+
+def _answer(request: object) -> dict[str, Any]:
+    """Answer one request object and decode the answer.
+
+    :param request: The request, serialized to JSON before answering.
+    :returns: The decoded answer.
+    """
+    answer: dict[str, Any] = json.loads(answer_line(json.dumps(request), 0.0))
+    return answer
+
+
+class TestAnswerLine:
+    """Tests for answer_line running one request."""
+
+    @pytest.mark.parametrize(
+        ("stage", "expected"),
+        [
+            ("pre", run_pre(SOURCE, list(EXTENSION_NAMES))),
+            ("post", run_post(SOURCE, list(EXTENSION_NAMES))),
+            ("render", render(SOURCE, list(EXTENSION_NAMES))),
+        ],
+    )
+    def test_stage_output_matches_in_process(self, stage: str, expected: str) -> None:
+        answer = _answer({"id": 7, "stage": stage, "text": SOURCE})
+        assert answer["id"] == 7
+        assert answer["output"] == expected
+        assert answer["warnings"] == []
+        assert set(answer["timings"]) == {"queue_ms", "run_ms"}
+
+    def test_selection_and_warnings(self) -> None:
+        answer = _answer(
+            {"id": "a", "stage": "post", "text": "<!-- mw-fence:bad -->", "use": ["fence"], "exclude": None}
+        )
+        assert answer["warnings"] == ["Skipping malformed mw-fence marker: 'bad'"]
+
+    @pytest.mark.parametrize(
+        ("request_object", "message"),
+        [
+            ({"id": 1, "stage": "bogus", "text": ""}, "unknown stage"),
+            ({"id": 1, "stage": "pre", "text": 5}, "text must be a string"),
+            ({"id": 1, "stage": "pre", "text": "", "use": "youtube"}, "use must be a list"),
+            ({"id": 1, "stage": "pre", "text": "", "exclude": ["bogus"]}, "unknown extension"),
+        ],
+    )
+    def test_invalid_requests_are_answered_with_errors(self, request_object: object, message: str) -> None:
+        answer = _answer(request_object)
+        assert answer["id"] == 1
+        assert message in answer["error"]
+
+    def test_malformed_lines_are_answered_without_an_id(self) -> None:
+        assert json.loads(answer_line("not json", 0.0))["error"].startswith("bad request")
+        assert json.loads(answer_line("[1]", 0.0)) == {"id": None, "error": "bad request: not a JSON object"}
+
+
+class TestRunStream:
+    """Tests for run_stream answering lines in-process and on a pool."""
+
+    LINES = [json.dumps({"id": index, "stage": "pre", "text": SOURCE}) + "\n" for index in range(6)]
+
+    def test_serial_answers_in_order_and_skips_blank_lines(self) -> None:
+        answers: list[str] = []
+        assert run_stream([*self.LINES, "\n"], answers.append) == 6
+        assert [json.loads(answer)["id"] for answer in answers] == list(range(6))
+
+    def test_pool_answers_every_request(self) -> None:
+        answers: list[str] = []
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            assert run_stream(self.LINES, answers.append, pool, window=2) == 6
+        assert sorted(json.loads(answer)["id"] for answer in answers) == list(range(6))
+
+    def test_window_bounds_requests_in_flight(self) -> None:
+        lock = threading.Lock()
+        in_flight = peak = 0
+
+        class TrackingPool(ThreadPoolExecutor):
+            def submit(self, fn: Any, /, *args: Any, **kwargs: Any) -> Future[Any]:
+                nonlocal in_flight, peak
+                with lock:
+                    in_flight += 1
+                    peak = max(peak, in_flight)
+                return super().submit(fn, *args, **kwargs)
+
+        def write(answer: str) -> None:
+            nonlocal in_flight
+            with lock:
+                in_flight -= 1
+
+        with TrackingPool(max_workers=4) as pool:
+            run_stream(self.LINES * 4, write, pool, window=2)
+        assert peak <= 2
+
+    def test_worker_failure_is_answered_under_the_request_id(self) -> None:
+        class CrashingPool(ThreadPoolExecutor):
+            def submit(self, fn: Any, /, *args: Any, **kwargs: Any) -> Future[Any]:
+                return super().submit(_crash)
+
+        answers: list[str] = []
+        lines = [*self.LINES[:2], "not json", "[1]"]
+        with CrashingPool(max_workers=2) as pool:
+            run_stream(lines, answers.append, pool, window=2)
+        decoded = [json.loads(answer) for answer in answers]
+        assert sorted(decoded, key=lambda answer: str(answer["id"])) == [
+            {"id": 0, "error": "worker failed: RuntimeError('boom')"},
+            {"id": 1, "error": "worker failed: RuntimeError('boom')"},
+            {"id": None, "error": "worker failed: RuntimeError('boom')"},
+            {"id": None, "error": "worker failed: RuntimeError('boom')"},
+        ]
+
+
+def _crash() -> str:
+    """Stand in for a worker that crashes.
+
+    :raises RuntimeError: Always.
+    """
+    raise RuntimeError("boom")
@@ -0,0 +1,65 @@
+# ABOUTME: Tests for the content-hash manifests that incremental tree modes keep.
+# Covers hashing, selection keys, the version stamp, recovery from unreadable manifests, and merging partials.
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from markwright.manifest import (
+    ManifestEntry,
+    content_hash,
+    load_manifest,
+    merge_manifests,
+    read_manifest,
+    save_manifest,
+    selection_key,
+)
+
+
+class TestManifest:
+    """Tests for saving and loading manifests."""
+
+    def test_round_trip(self, tmp_path: Path) -> None:
+        entries = {"b.md": ManifestEntry(hash=content_hash(b"b"), selection="pre:youtube")}
+        save_manifest(tmp_path / "out" / "manifest.json", entries)
+        assert load_manifest(tmp_path / "out" / "manifest.json") == entries
+
+    def test_missing_malformed_and_foreign_manifests_load_empty(self, tmp_path: Path) -> None:
+        assert load_manifest(tmp_path / "missing.json") == {}
+        (tmp_path / "broken.json").write_text("{not json", encoding="utf-8")
+        assert load_manifest(tmp_path / "broken.json") == {}
+        (tmp_path / "old.json").write_text(json.dumps({"markwright": "0.0.0", "files": {}}), encoding="utf-8")
+        assert load_manifest(tmp_path / "old.json") == {}
+
+    def test_read_manifest_rejects_what_load_manifest_ignores(self, tmp_path: Path) -> None:
+        (tmp_path / "broken.json").write_text("{not json", encoding="utf-8")
+        (tmp_path / "list.json").write_text("[]", encoding="utf-8")
+        (tmp_path / "old.json").write_text(json.dumps({"markwright": "0.0.0", "files": {}}), encoding="utf-8")
+        for name in ("broken.json", "list.json"):
+            with pytest.raises(ValueError, match="not a markwright manifest"):
+                read_manifest(tmp_path / name)
+        with pytest.raises(ValueError, match="written by markwright 0.0.0"):
+            read_manifest(tmp_path / "old.json")
+
+    def test_hash_and_selection_key(self) -> None:
+        assert content_hash(b"a") == content_hash(b"a") != content_hash(b"b")
+        assert selection_key("pre", ["youtube", "fence"]) == "pre:youtube,fence"
+
+
+class TestMergeManifests:
+    """Tests for combining the partial manifests of a sharded run."""
+
+    def test_combines_disjoint_and_agreeing_entries(self, tmp_path: Path) -> None:
+        entry = ManifestEntry(hash=content_hash(b"a"), selection="pre:")
+        save_manifest(tmp_path / "one.json", {"a.md": entry})
+        save_manifest(tmp_path / "two.json", {"a.md": entry, "b.md": entry})
+        assert merge_manifests([tmp_path / "one.json", tmp_path / "two.json"]) == {"a.md": entry, "b.md": entry}
+
+    def test_conflicting_entries_raise(self, tmp_path: Path) -> None:
+        save_manifest(tmp_path / "one.json", {"a.md": ManifestEntry(hash="1", selection="pre:")})
+        save_manifest(tmp_path / "two.json", {"a.md": ManifestEntry(hash="2", selection="pre:")})
+        with pytest.raises(ValueError, match="a.md differs between"):
+            merge_manifests([tmp_path / "one.json", tmp_path / "two.json"])
@@ -0,0 +1,71 @@
+# ABOUTME: Tests for the profiler harness behind mw profile.
+# Covers the cProfile pass, allocation attribution by module, and the text report.
+
+from __future__ import annotations
+
+import sys
+import tracemalloc
+
+import pytest
+
+from markwright import profiling
+from markwright.profiling import OUTSIDE, format_report, profile_step
+
+FENCED = "```line_numbers,python\n" + "".join(f"print({line})  # <^>step<^>\n" for line in range(200)) + "```\n"
+
+
+class TestProfileStep:
+    """Tests for profiling one step."""
+
+    def test_profiles_the_step_and_charges_memory_to_markwright_modules(self) -> None:
+        report = profile_step("pre", FENCED, ["fence", "highlight"], repeat=2)
+        profiled = {function for _, _, function in report.stats.stats}  # type: ignore[attr-defined]
+        assert "transform" in profiled
+        assert report.repeat == 2
+        assert report.peak_bytes > 0
+        assert report.allocations[0].module == "markwright.fence"
+        assert report.allocations[0].top_line.startswith("fence.py:")
+        assert all(entry.module != "markwright.profiling" for entry in report.allocations)
+
+    def test_shallow_traces_charge_library_memory_outside_markwright(self) -> None:
+        report = profile_step("render", FENCED, ["fence"], trace_depth=1)
+        assert OUTSIDE in {entry.module for entry in report.allocations}
+
+    def test_invalid_runs_raise(self) -> None:
+        with pytest.raises(ValueError, match="unknown step"):
+            profile_step("bogus", "", [])
+        with pytest.raises(ValueError, match="repeat must be at least 1"):
+            profile_step("pre", "", [], repeat=0)
+        with pytest.raises(ValueError, match="trace depth must be at least 1"):
+            profile_step("pre", "", [], trace_depth=0)
+
+
+class TestPeakSampler:
+    """Tests for the return hook that samples memory at new highs."""
+
+    def test_snapshots_on_markwright_growth_and_disables_other_code(self) -> None:
+        tracemalloc.start()
+        try:
+            sampler = profiling._PeakSampler()
+            first = sampler.snapshot
+            assert sampler(pytest.raises.__code__, 0, None) is sys.monitoring.DISABLE
+            assert sampler.snapshot is first
+            held = [bytearray(1024) for _ in range(64)]
+            assert sampler(profile_step.__code__, 0, None) is None
+            assert sampler.snapshot is not first
+            latest = sampler.snapshot
+            sampler(profile_step.__code__, 0, None)
+            assert sampler.snapshot is latest
+        finally:
+            tracemalloc.stop()
+        assert held
+
+
+class TestFormatReport:
+    """Tests for the text report."""
+
+    def test_lists_top_functions_and_modules(self) -> None:
+        text = format_report(profile_step("post", "<p>x</p>", ["fence"]), top=3)
+        assert text.startswith("mw profile post: 1 run(s), peak ")
+        assert "Ordered by: cumulative time" in text
+        assert "Memory held near the peak, by markwright module:" in text
@@ -3,9 +3,48 @@
 
 from __future__ import annotations
 
+import dataclasses
+import itertools
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal
+
 import pytest
 
-from markwright.registry import EXTENSION_NAMES, describe, run_post, run_pre, select_extensions
+from markwright import _batch, codepen, image_compare, instagram, registry, slideshow, twitter, youtube
+from markwright._embed import expand_embeds
+from markwright._scan import LiteralIndex
+from markwright._segment import EMBED, FENCE, INLINE_CODE, OPEN_FENCE, PROSE, Segment, segment_source
+from markwright._stats import count, counting
+from markwright._util import apply_edits, sort_edits
+from markwright.fence import expand_source
+from markwright.registry import (
+    EXTENSION_NAMES,
+    StageRun,
+    compile,
+    could_change,
+    describe,
+    document_cost,
+    run_post,
+    run_post_many,
+    run_pre,
+    run_pre_many,
+    select_extensions,
+)
+
+# One standalone line per embed extension, plus lines that look like directives
+# but are not: an unregistered keyword, a one-URL slideshow, and an inline embed.
+EMBED_SOURCE = """\
+[youtube dQw4w9WgXcQ]
+[slideshow https://a.example/1.png https://a.example/2.png]
+[compare https://a.example/l.png https://a.example/r.png]
+[codepen jcoulterdesign npyBME]
+[twitter https://twitter.com/jack/status/20]
+[instagram https://www.instagram.com/p/CkQuv3_LRgS]
+[label not-an-embed]
+[slideshow https://a.example/only.png]
+Text with [youtube inline] in it.
+"""
 
 
 class TestSelectExtensions:
@@ -49,6 +88,426 @@ class TestRunPre:
         assert "<iframe" not in result
         assert "<mark>prose</mark>" in result
 
+    def test_fused_embed_pass_equals_sequential_expanders(self) -> None:
+        sequential = EMBED_SOURCE
+        for module in (youtube, slideshow, image_compare, codepen, twitter, instagram):
+            sequential = module.expand_source(sequential)
+        embed_names = ["youtube", "slideshow", "image_compare", "codepen", "twitter", "instagram"]
+        assert run_pre(EMBED_SOURCE, embed_names) == sequential
+
+    def test_fused_embed_pass_runs_only_selected_renderers(self) -> None:
+        result = run_pre(EMBED_SOURCE, ["twitter"])
+        assert 'class="twitter-tweet"' in result
+        assert "[youtube dQw4w9WgXcQ]" in result
+        assert "[codepen jcoulterdesign npyBME]" in result
+
+    def test_embed_and_marker_inside_fence_stay_literal(self) -> None:
+        source = "```\n[label a.sh]\n[youtube dQw4w9WgXcQ]\n<^>x<^>\n```\n[youtube dQw4w9WgXcQ]"
+        result = run_pre(source, list(EXTENSION_NAMES))
+        assert result.count("<iframe") == 1
+        assert "\n[youtube dQw4w9WgXcQ]\n<^>x<^>\n```\n<iframe" in result
+        assert result.startswith('<!-- mw-fence:{"version": 1, "label": "a.sh"} -->\n```\n')
+
+    def test_embed_after_unclosed_fence_still_expands(self) -> None:
+        result = run_pre("```\n[youtube dQw4w9WgXcQ]", ["youtube"])
+        assert result.startswith("```\n<iframe")
+
+    def test_closed_fence_after_unclosed_fence_stays_code(self) -> None:
+        source = "~~~~\n```\n<^>x<^>\n[youtube dQw4w9WgXcQ]\n```\n"
+        assert run_pre(source, ["highlight", "youtube"]) == source
+        after = run_pre(source + "<^>y<^>\n[youtube dQw4w9WgXcQ]", ["highlight", "youtube"])
+        assert after.startswith(source + "<mark>y</mark>\n<iframe")
+
+    def test_unclosed_fence_holds_later_fences_as_content(self) -> None:
+        source = "~~~\n[label a.sh]\nx\n```\n[label b.sh]\n```\n"
+        assert run_pre(source, ["fence"]) == expand_source(source)
+        assert run_pre(source, ["fence"]).count("mw-fence") == 1
+
+    def test_no_triggered_stage_returns_source_unsegmented(self) -> None:
+        source = "Plain prose only."
+        assert run_pre(source, list(EXTENSION_NAMES)) is source
+
+    def test_stage_without_segment_form_runs_on_joined_text(self) -> None:
+        pipeline = compile(["fence", "highlight"])
+        fence_stage = dataclasses.replace(pipeline.pre_stages[0], segments=None)
+        pipeline = dataclasses.replace(pipeline, pre_stages=(fence_stage, *pipeline.pre_stages[1:]))
+        source = "```\n[label a.sh]\nx\n```\n<^>y<^>"
+        assert pipeline.pre(source) == compile(["fence", "highlight"]).pre(source)
+
+
+class TestTriggerPrefilter:
+    """Tests for skipping stages whose trigger literals are absent from the input."""
+
+    def test_pre_skips_stages_without_triggers(self) -> None:
+        skipped: list[str] = []
+        result = run_pre("Text with a <^>prose<^> marker.", list(EXTENSION_NAMES), skipped)
+        assert "<mark>prose</mark>" in result
+        assert "highlight" not in skipped
+        assert set(skipped) == set(EXTENSION_NAMES) - {"highlight"}
+
+    def test_pre_skipped_embed_is_not_rendered_but_triggered_one_is(self) -> None:
+        skipped: list[str] = []
+        result = run_pre("[twitter https://twitter.com/jack/status/20]", ["youtube", "twitter"], skipped)
+        assert 'class="twitter-tweet"' in result
+        assert skipped == ["youtube"]
+
+    def test_pre_output_unchanged_by_prefilter(self) -> None:
+        names = list(EXTENSION_NAMES)
+        sequential = EMBED_SOURCE
+        for module in (youtube, slideshow, image_compare, codepen, twitter, instagram):
+            sequential = module.expand_source(sequential)
+        assert run_pre(EMBED_SOURCE, names, []) == run_pre(EMBED_SOURCE, names) == sequential
+
+    def test_post_skips_stages_without_triggers(self) -> None:
+        skipped: list[str] = []
+        html_input = "<p>a &lt;^&gt;word&lt;^&gt; b</p>"
+        result = run_post(html_input, list(EXTENSION_NAMES), None, skipped)
+        assert "<mark>word</mark>" in result
+        # Reported in run order: fence (priority 25) before the script stages (15).
+        assert skipped == ["fence", "codepen", "twitter", "instagram"]
+
+    def test_post_trigger_introduced_by_earlier_stage_is_seen(self) -> None:
+        # The fence stage runs first; the highlight stage must see the HTML as it
+        # stands after fence, not the original input.
+        html_input = '<!-- mw-fence:{"version": 1, "label": "a"} -->\n<pre><code>&lt;^&gt;x&lt;^&gt;\n</code></pre>'
+        result = run_post(html_input, ["fence", "highlight"], None, [])
+        assert "<mark>x</mark>" in result
+        assert 'class="code-label"' in result
+
+
+class TestStageStats:
+    """Tests for the per-stage statistics collected through the ``stats`` list."""
+
+    def test_pre_records_each_stage_in_run_order(self) -> None:
+        source = "```\n[label a.sh]\nls\n```\n\n[youtube dQw4w9WgXcQ]\n[codepen a b]\n\nSome <^>word<^>.\n"
+        stats: list[StageRun] = []
+        result = run_pre(source, ["youtube", "codepen", "fence", "highlight"], None, stats)
+        assert [stage.name for stage in stats] == ["fence", "youtube+codepen", "highlight"]
+        assert stats[0].counts == {"markers_written": 1}
+        assert stats[1].counts == {"embeds_expanded.youtube": 1, "embeds_expanded.codepen": 1}
+        assert stats[2].counts == {"regions_wrapped": 1}
+        assert stats[0].input_size == len(source)
+        assert stats[-1].output_size == len(result)
+        assert all(earlier.output_size == later.input_size for earlier, later in itertools.pairwise(stats))
+        assert all(stage.seconds >= 0 for stage in stats)
+
+    def test_pre_leaves_skipped_stages_out(self) -> None:
+        stats: list[StageRun] = []
+        run_pre("plain text", list(EXTENSION_NAMES), None, stats)
+        assert stats == []
+
+    def test_post_records_counts(self) -> None:
+        html_input = (
+            '<!-- mw-fence:{"version": 1, "label": "a"} -->\n<pre><code>&lt;^&gt;x&lt;^&gt;\n</code></pre>\n'
+            '<!-- mw-fence:{"version": 9} -->\n<p class="codepen">pen</p>'
+        )
+        stats: list[StageRun] = []
+        result = run_post(html_input, ["codepen", "fence", "highlight"], None, None, stats)
+        assert [(stage.name, stage.counts) for stage in stats] == [
+            ("fence", {"markers_applied": 1, "markers_skipped": 1}),
+            ("highlight", {"regions_wrapped": 1}),
+            ("codepen", {"scripts_injected": 1}),
+        ]
+        assert stats[0].input_size == len(html_input)
+        assert stats[-1].output_size == len(result)
+
+    def test_stats_leave_output_unchanged(self) -> None:
+        names = list(EXTENSION_NAMES)
+        assert run_pre(EMBED_SOURCE, names, None, []) == run_pre(EMBED_SOURCE, names)
+
+
+class TestCounting:
+    """Tests for the event counters behind the stage statistics."""
+
+    def test_count_outside_a_block_is_ignored(self) -> None:
+        count("markers_applied")
+        with counting() as counts:
+            pass
+        assert counts == {}
+
+    def test_nested_block_keeps_its_own_counts(self) -> None:
+        with counting() as outer:
+            count("a")
+            with counting() as inner:
+                count("b", 2)
+            count("a")
+        assert outer == {"a": 2}
+        assert inner == {"b": 2}
+
+
+class TestCompile:
+    """Tests for compile building an immutable, reusable Pipeline."""
+
+    def test_pipeline_matches_run_pre_and_run_post(self) -> None:
+        names = list(EXTENSION_NAMES)
+        pipeline = compile(names)
+        assert pipeline.pre(EMBED_SOURCE) == run_pre(EMBED_SOURCE, names)
+        html_input = '<p class="codepen"></p>\n<p>a &lt;^&gt;word&lt;^&gt; b</p>'
+        assert pipeline.post(html_input) == run_post(html_input, names)
+
+    def test_stages_are_pre_sorted_by_priority(self) -> None:
+        pipeline = compile(["highlight", "youtube", "fence", "codepen"])
+        assert [stage.name for stage in pipeline.pre_stages] == ["fence", "youtube", "codepen", "highlight"]
+        assert [stage.name for stage in pipeline.post_stages] == ["fence", "highlight", "codepen"]
+        assert pipeline.names == ("youtube", "codepen", "fence", "highlight")
+
+    def test_pipeline_is_immutable(self) -> None:
+        pipeline = compile(["youtube"])
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            pipeline.names = ("fence",)  # type: ignore[misc]
+
+    def test_fence_config_is_bound(self) -> None:
+        pipeline = compile(["fence"], {"fence": {"label_class": "title", "allowed_environments": ["local"]}})
+        source = "```\n[label a.sh]\n[environment remote]\necho hi\n```"
+        expanded = pipeline.pre(source)
+        assert '"label": "a.sh"' in expanded
+        # remote is not allowed, so the directive stays in the code as content.
+        assert "[environment remote]" in expanded
+        html_input = '<!-- mw-fence:{"version": 1, "label": "a.sh"} -->\n<pre><code>echo hi\n</code></pre>'
+        assert '<div class="title" title="a.sh">a.sh</div>' in pipeline.post(html_input)
+
+    def test_config_for_unselected_extension_is_ignored(self) -> None:
+        pipeline = compile(["youtube"], {"fence": {"label_class": "title"}})
+        assert [stage.name for stage in pipeline.pre_stages] == ["youtube"]
+
+    def test_config_for_unconfigurable_extension_raises(self) -> None:
+        with pytest.raises(ValueError, match="youtube"):
+            compile(["youtube"], {"youtube": {"height": 10}})
+
+    def test_unknown_config_extension_raises(self) -> None:
+        with pytest.raises(ValueError, match="bogus"):
+            compile(["youtube"], {"bogus": {}})
+
+    def test_unknown_name_raises(self) -> None:
+        with pytest.raises(ValueError, match="bogus"):
+            compile(["bogus"])
+
+    def test_roundtrip_runs_pre_render_post(self) -> None:
+        pipeline = compile(["codepen"])
+        rendered: list[str] = []
+
+        def fake_render(text: str) -> str:
+            rendered.append(text)
+            return f"<div>{text}</div>"
+
+        result = pipeline.roundtrip("[codepen jcoulterdesign npyBME]", fake_render)
+        assert rendered[0].startswith('<p class="codepen"')
+        assert result.count(codepen.CODEPEN_SCRIPT) == 1
+
+
+class TestApplyEdits:
+    """Tests for materializing a post stage's edit list."""
+
+    def test_applies_unordered_edits_in_one_pass(self) -> None:
+        assert apply_edits("abcdef", [(4, 2, "EF"), (0, 1, "A"), (2, 0, "+")]) == "Ab+cdEF"
+
+    def test_insertions_at_one_offset_keep_their_order(self) -> None:
+        assert apply_edits("ab", [(1, 0, "1"), (1, 0, "2"), (1, 1, "B")]) == "a12B"
+
+    def test_no_edits_returns_input(self) -> None:
+        assert apply_edits("abc", []) == "abc"
+
+    @pytest.mark.parametrize("edits", [[(0, 3, "x"), (2, 1, "y")], [(2, 5, "x")], [(1, -1, "x")]])
+    def test_overlapping_or_out_of_range_edits_raise(self, edits: list[tuple[int, int, str]]) -> None:
+        with pytest.raises(ValueError, match="overlapping edit"):
+            apply_edits("abcd", edits)
+
+    def test_post_stage_without_scan_form_falls_back_to_edits_then_run(self) -> None:
+        pipeline = compile(["fence", "highlight", "codepen"])
+        post_stages = (
+            dataclasses.replace(pipeline.post_stages[0], scan=None),
+            dataclasses.replace(pipeline.post_stages[1], scan=None, edits=None),
+            pipeline.post_stages[2],
+        )
+        fallback = dataclasses.replace(pipeline, post_stages=post_stages)
+        html_input = (
+            '<!-- mw-fence:{"version": 1, "label": "&lt;^&gt;a&lt;^&gt;"} -->\n<pre><code>x\n</code></pre>\n'
+            '<p class="codepen">&lt;^&gt;b&lt;^&gt;</p>'
+        )
+        assert fallback.post(html_input) == pipeline.post(html_input)
+
+    def test_post_stage_edits_are_merged_by_the_pipeline(self) -> None:
+        html_input = '<!-- mw-fence:{"version": 1, "environment": "local"} -->\n<pre><code>x\n</code></pre>'
+        assert compile(["fence"]).post(html_input) == '\n<pre class="environment-local"><code>x\n</code></pre>'
+
+
+class TestLiteralIndex:
+    """Tests for the literal position index shared by the post stages."""
+
+    def test_build_finds_every_occurrence_once_per_literal(self) -> None:
+        index = LiteralIndex.build("aXbXaXb", ["aX", "Xb", "aX"])
+        assert dict(index.hits) == {"aX": [0, 4], "Xb": [1, 5]}
+        assert index.contains_any(["Xb"])
+        assert not LiteralIndex.build("", ["aX"]).contains_any(["aX"])
+
+    def test_remap_matches_a_fresh_index_after_edits(self) -> None:
+        text = "aX..aX..aX"
+        edits = sort_edits([(1, 3, "X"), (5, 0, "a"), (9, 1, "XaX")], len(text))
+        edited = apply_edits(text, edits)
+        literals = ["aX", "Xa", "."]
+        remapped = LiteralIndex.build(text, literals).remap(edited, edits)
+        assert remapped.hits == LiteralIndex.build(edited, literals).hits
+
+    def test_remap_without_edits_returns_same_index(self) -> None:
+        index = LiteralIndex.build("abc", ["b"])
+        assert index.remap("abc", []) is index
+
+    def test_trigger_introduced_by_an_edit_is_seen_by_later_stage(self) -> None:
+        html_input = (
+            '<!-- mw-fence:{"version": 1, "label": "\\u003c^\\u003ex\\u003c^\\u003e"} -->\n<pre><code>y\n</code></pre>'
+        )
+        skipped: list[str] = []
+        result = run_post(html_input, ["fence", "highlight"], None, skipped)
+        assert skipped == []
+        assert '<div class="code-label" title="<mark>x</mark>"><mark>x</mark></div>' in result
+
+
+class TestExpandEmbeds:
+    """Tests for the fused single-pass embed dispatcher."""
+
+    def test_leaves_unclaimed_and_invalid_lines_untouched(self) -> None:
+        result = expand_embeds(EMBED_SOURCE, {"slideshow": slideshow._render_match})
+        lines = result.split("\n")
+        assert '<div class="slideshow"' in result
+        assert "[label not-an-embed]" in lines
+        assert "[slideshow https://a.example/only.png]" in lines
+        assert "Text with [youtube inline] in it." in lines
+
+    def test_indented_directive_is_recognized(self) -> None:
+        result = expand_embeds("  [youtube dQw4w9WgXcQ]  ", {"youtube": youtube._render_match})
+        assert result.startswith("<iframe")
+
+
+class TestSegmentSource:
+    """Tests for the shared one-time segmentation of pre-stage input."""
+
+    def test_segments_concatenate_to_source(self) -> None:
+        source = "a `b` c\n```py\nx\n```\n[youtube id]\n~~~\nopen"
+        segments = segment_source(source, ["youtube"])
+        assert "".join(segment.text for segment in segments) == source
+        assert segments == [
+            Segment(PROSE, "a "),
+            Segment(INLINE_CODE, "`b`"),
+            Segment(PROSE, " c\n"),
+            Segment(FENCE, "```py\nx\n```"),
+            Segment(PROSE, "\n"),
+            Segment(EMBED, "[youtube id]"),
+            Segment(PROSE, "\n"),
+            Segment(OPEN_FENCE, "~~~"),
+            Segment(PROSE, "\nopen"),
+        ]
+
+    def test_unclosed_fence_keeps_only_its_opener_and_directives(self) -> None:
+        source = "~~~~\n[label a.sh]\n [environment local] \nx\n```\ncode\n```"
+        assert segment_source(source) == [
+            Segment(OPEN_FENCE, "~~~~\n[label a.sh]\n [environment local] "),
+            Segment(PROSE, "\nx\n"),
+            Segment(FENCE, "```\ncode\n```"),
+        ]
+
+    def test_fence_closes_only_on_matching_run(self) -> None:
+        source = "````\n```\n~~~~\n`````  \nafter"
+        segments = segment_source(source)
+        assert segments[0] == Segment(FENCE, "````\n```\n~~~~\n`````  ")
+
+    def test_only_listed_keywords_are_embed_lines(self) -> None:
+        segments = segment_source("[youtube id]\n[youtubes id]\n[twitter x]", ["youtube"])
+        assert [segment.kind for segment in segments] == [EMBED, PROSE]
+
+
+class TestCouldChange:
+    """Tests for the byte-level trigger check behind the pass-through fast path."""
+
+    def test_document_without_triggers_cannot_change(self) -> None:
+        names = list(EXTENSION_NAMES)
+        assert not could_change(b"<p>plain</p>", "post", names)
+        assert not could_change(b"plain prose", "pre", names)
+
+    def test_any_trigger_means_the_document_could_change(self) -> None:
+        names = list(EXTENSION_NAMES)
+        assert could_change(b"<p>a &lt;^&gt;b&lt;^&gt;</p>", "post", names)
+        assert could_change(b"[youtube dQw4w9WgXcQ]", "pre", names)
+
+    def test_triggers_come_only_from_selected_stages(self) -> None:
+        assert not could_change(b"[youtube dQw4w9WgXcQ]", "pre", ["highlight"])
+
+    def test_stage_without_triggers_always_could_change(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        pipeline = compile(["highlight"])
+        stage = dataclasses.replace(pipeline.pre_stages[0], triggers=())
+        monkeypatch.setattr(
+            registry, "_default_pipeline", lambda names: dataclasses.replace(pipeline, pre_stages=(stage,))
+        )
+        monkeypatch.setattr(registry, "_trigger_bytes", registry._trigger_bytes.__wrapped__)
+        assert could_change(b"plain", "pre", ["highlight"])
+
+
+class TestDocumentCost:
+    """Tests for the prescan that ranks documents for largest-first scheduling."""
+
+    SOURCE = "[youtube a]\nSee a ``` mid-line.\n```python\nx\ny\n```\n  ~~~\nz\n"
+
+    def test_small_sources_and_html_cost_their_size(self) -> None:
+        names = list(EXTENSION_NAMES)
+        assert document_cost(self.SOURCE, "pre", names) == len(self.SOURCE)
+        html = "<p>" + "x" * registry.PRESCAN_MIN_BYTES + "</p>"
+        assert document_cost(html, "post", names) == len(html)
+
+    @pytest.mark.parametrize(("step", "embed", "line"), [("pre", 2048, 192), ("render", 96, 96)])
+    def test_scan_charges_embeds_and_fenced_lines(
+        self, monkeypatch: pytest.MonkeyPatch, step: Literal["pre", "render"], embed: int, line: int
+    ) -> None:
+        monkeypatch.setattr(registry, "PRESCAN_MIN_BYTES", 0)
+        # Three lines in the closed fence, two in the indented one left open; the mid-line ``` is not a delimiter.
+        expected = len(self.SOURCE) + embed + line * 5
+        assert document_cost(self.SOURCE, step, ["youtube", "fence"]) == expected
+        assert document_cost(self.SOURCE.encode(), step, ["youtube", "fence"]) == expected
+
+    def test_only_selected_embeds_are_charged(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(registry, "PRESCAN_MIN_BYTES", 0)
+        assert document_cost("[youtube a]\n", "pre", ["highlight"]) == len("[youtube a]\n")
+
+    def test_batch_dispatches_the_costliest_document_first(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        started: list[str] = []
+        pre_one = registry._pre_one
+
+        def recording(names: frozenset[str], text: str) -> str:
+            started.append(text)
+            return pre_one(names, text)
+
+        monkeypatch.setattr(registry, "_pre_one", recording)
+        long_page = "```python\n" + "x = 1\n" * registry.PRESCAN_MIN_BYTES + "```\n"
+        documents = ["short", "[youtube a]", long_page, "tiny"]
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            results = run_pre_many(documents, ["youtube", "fence"], executor=executor)
+        assert started[0] == long_page
+        assert results == [run_pre(text, ["youtube", "fence"]) for text in documents]
+
+
+class TestPlanTasks:
+    """Tests for grouping a batch into tasks, costliest first."""
+
+    def test_without_costs_tasks_keep_input_order(self) -> None:
+        assert _batch.plan_tasks(5, 1, None) == [[0, 1], [2, 3], [4]]
+        assert _batch.plan_tasks(5, 4, 3) == [[0, 1, 2], [3, 4]]
+
+    def test_costliest_documents_go_first_and_equal_costs_keep_their_order(self) -> None:
+        tasks = _batch.plan_tasks(6, 2, None, [1, 100, 1, 1, 50, 1])
+        assert tasks[0] == [1]
+        assert list(itertools.chain.from_iterable(tasks)) == [1, 4, 0, 2, 3, 5]
+
+    def test_fixed_chunksize_applies_to_the_ranked_order(self) -> None:
+        assert _batch.plan_tasks(4, 2, 2, [1, 3, 2, 3]) == [[1, 3], [2, 0]]
+
+    def test_tasks_shrink_towards_the_end(self) -> None:
+        tasks = _batch.plan_tasks(1000, 4, None, [10] * 1000)
+        sizes = [len(task) for task in tasks]
+        assert sum(sizes) == 1000
+        assert sizes[0] > sizes[-1] >= 1
+        assert all(earlier >= later for earlier, later in itertools.pairwise(sizes))
+
+    def test_empty_documents_still_share_tasks(self) -> None:
+        assert len(_batch.plan_tasks(100, 2, None, [0] * 100)) < 100
+
 
 class TestRunPost:
     """Tests for run_post composing the selected HTML-stage functions."""
@@ -66,6 +525,56 @@ class TestRunPost:
         assert len(warnings) == 1
 
 
+class TestBatchRunners:
+    """Tests for run_pre_many and run_post_many spreading documents over workers."""
+
+    DOCUMENTS = [f"[youtube id{index}]\n\nText <^>{index}<^>" for index in range(7)]
+
+    def test_pre_many_matches_run_pre_in_input_order(self) -> None:
+        names = ["youtube", "highlight"]
+        expected = [run_pre(text, names) for text in self.DOCUMENTS]
+        assert run_pre_many(self.DOCUMENTS, names, max_workers=1) == expected
+        assert run_pre_many(iter(self.DOCUMENTS), names, max_workers=2, chunksize=2) == expected
+
+    def test_post_many_returns_warnings_per_document(self) -> None:
+        htmls = ["<p>a &lt;^&gt;b&lt;^&gt;</p>", "<!-- mw-fence:{not json -->\n<pre><code>x\n</code></pre>"]
+        results = run_post_many(htmls, list(EXTENSION_NAMES), max_workers=2)
+        assert results[0] == ("<p>a <mark>b</mark></p>", [])
+        assert len(results[1][1]) == 1
+        assert run_post_many(htmls, list(EXTENSION_NAMES), max_workers=1) == results
+
+    def test_injected_executor_is_used_and_left_open(self) -> None:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = run_pre_many(self.DOCUMENTS, ["highlight"], executor=executor)
+            assert executor.submit(len, "open").result() == 4
+        assert results == [run_pre(text, ["highlight"]) for text in self.DOCUMENTS]
+
+    def test_thread_backend_matches_serial_run(self) -> None:
+        expected = run_pre_many(self.DOCUMENTS, ["youtube", "highlight"], max_workers=1)
+        assert run_pre_many(self.DOCUMENTS, ["youtube", "highlight"], backend="thread", max_workers=3) == expected
+
+    @pytest.mark.parametrize(("gil_enabled", "expected"), [(True, "process"), (False, "thread")])
+    def test_auto_backend_picks_threads_only_without_the_gil(
+        self, monkeypatch: pytest.MonkeyPatch, gil_enabled: bool, expected: str
+    ) -> None:
+        monkeypatch.setattr(sys, "_is_gil_enabled", lambda: gil_enabled)
+        assert _batch.resolve_backend("auto") == expected
+
+    def test_unknown_backend_raises(self) -> None:
+        with pytest.raises(ValueError, match="fibers"):
+            run_pre_many(["x"], ["highlight"], backend="fibers")
+
+    def test_unknown_name_raises_before_any_work(self) -> None:
+        with pytest.raises(ValueError, match="bogus"):
+            run_post_many(["<p></p>"], ["bogus"])
+
+    @pytest.mark.parametrize(
+        ("documents", "workers", "expected"), [(0, 4, 1), (16, 4, 1), (17, 4, 2), (40000, 32, 313)]
+    )
+    def test_chunksize_aims_for_four_chunks_per_worker(self, documents: int, workers: int, expected: int) -> None:
+        assert _batch.chunksize_for(documents, workers) == expected
+
+
 class TestDescribe:
     """Tests for describe reporting each extension's available stages."""
 
@@ -80,7 +589,6 @@ class TestDescribe:
     def test_describe_handles_post_only_extension(self, monkeypatch: pytest.MonkeyPatch) -> None:
         # No real extension is post-only (all have a pre stage), so exercise the
         # pre-is-None branch of describe() with a synthetic post-only entry.
-        from markwright import registry
 
         def _noop_post(html: str, warnings: list[str] | None = None) -> str:
             return html
@@ -0,0 +1,63 @@
+# ABOUTME: Tests for in-process rendering with the site stack and the batch renderer.
+# Covers instance reuse, selection validation, and the thread and subinterpreter backends.
+
+from __future__ import annotations
+
+import concurrent.futures
+
+import pytest
+
+from markwright.registry import EXTENSION_NAMES, run_pre_many
+from markwright.render import build_markdown, render, render_many
+
+SOURCE = "[youtube dQw4w9WgXcQ]\n\n```bash\n[label a.sh]\necho <^>hi<^>\n```\n\nText <^>marked<^>.\n"
+
+requires_interpreter_pool = pytest.mark.skipif(
+    not hasattr(concurrent.futures, "InterpreterPoolExecutor"),
+    reason="InterpreterPoolExecutor needs Python 3.14",
+)
+
+
+class TestRender:
+    """Tests for render reusing a configured Markdown instance."""
+
+    def test_matches_a_fresh_instance_on_every_call(self) -> None:
+        names = list(EXTENSION_NAMES)
+        expected = build_markdown(names).convert(SOURCE)
+        assert render(SOURCE, names) == expected
+        assert render(SOURCE, names) == expected
+
+    def test_empty_selection_renders_without_markwright(self) -> None:
+        result = render("Text <^>marked<^>.", [])
+        assert "<mark>" not in result
+
+    def test_unknown_name_raises(self) -> None:
+        with pytest.raises(ValueError, match="bogus"):
+            render("x", ["bogus"])
+
+
+class TestRenderMany:
+    """Tests for render_many spreading documents over workers."""
+
+    DOCUMENTS = [f"# Page {index}\n\n{SOURCE}" for index in range(5)]
+
+    def test_serial_and_thread_runs_match_render(self) -> None:
+        names = ["youtube", "fence", "highlight"]
+        expected = [render(text, names) for text in self.DOCUMENTS]
+        assert render_many(self.DOCUMENTS, names, max_workers=1) == expected
+        assert render_many(self.DOCUMENTS, names, backend="thread", max_workers=2) == expected
+
+    def test_unknown_name_raises(self) -> None:
+        with pytest.raises(ValueError, match="bogus"):
+            render_many(["x"], ["bogus"])
+
+    @requires_interpreter_pool
+    def test_interpreter_backend_matches_render(self) -> None:
+        names = ["youtube", "fence", "highlight"]
+        expected = [render(text, names) for text in self.DOCUMENTS]
+        assert render_many(self.DOCUMENTS, names, backend="interpreter", max_workers=2) == expected
+
+    @requires_interpreter_pool
+    def test_interpreter_backend_runs_stages(self) -> None:
+        expected = run_pre_many(self.DOCUMENTS, ["youtube"], max_workers=1)
+        assert run_pre_many(self.DOCUMENTS, ["youtube"], backend="interpreter", max_workers=2) == expected
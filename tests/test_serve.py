@@ -0,0 +1,233 @@
+# ABOUTME: Tests for the mw serve daemon, the mw client shim, and the framing helpers.
+# Runs a real daemon on a temporary Unix socket and compares its answers with the in-process filters.
+
+from __future__ import annotations
+
+import errno
+import io
+import os
+import socket
+import tempfile
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from markwright import client
+from markwright._framing import (
+    iter_documents,
+    read_frame,
+    read_message,
+    write_document,
+    write_frame,
+    write_message,
+)
+from markwright.cli import main
+from markwright.registry import EXTENSION_NAMES, run_post, run_pre
+from markwright.render import render
+from markwright.serve import Server, answer
+
+SOURCE = "[youtube dQw4w9WgXcQ]\n\nText <^>marked<^>.\n"
+BROKEN_HTML = "<!-- mw-fence:not json --><p>body</p>"
+
+
+@pytest.fixture
+def socket_dir() -> Iterator[str]:
+    """Yield a short temporary directory; socket paths are limited to about 100 bytes."""
+    with tempfile.TemporaryDirectory(prefix="mw-") as directory:
+        yield directory
+
+
+@pytest.fixture
+def daemon(socket_dir: str) -> Iterator[str]:
+    """Run a daemon on a background thread and yield its socket path."""
+    path = os.path.join(socket_dir, "mw.sock")
+    server = Server(path, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+class TestFraming:
+    """Tests for the length-prefixed frames and two-frame messages."""
+
+    def test_message_round_trip_and_clean_end(self) -> None:
+        stream = io.BytesIO()
+        write_message(stream, {"step": "pre"}, "héllo")
+        stream.seek(0)
+        assert read_message(stream) == ({"step": "pre"}, "héllo")
+        assert read_message(stream) is None
+
+    @pytest.mark.parametrize(
+        ("data", "message"),
+        [
+            (b"\x00\x00", "truncated frame length"),
+            (b"\x00\x00\x00\x05abc", "truncated frame payload"),
+        ],
+    )
+    def test_truncated_frames_raise(self, data: bytes, message: str) -> None:
+        with pytest.raises(ValueError, match=message):
+            read_frame(io.BytesIO(data))
+
+    def test_malformed_messages_raise(self) -> None:
+        lone_header = io.BytesIO()
+        write_frame(lone_header, b"{}")
+        lone_header.seek(0)
+        with pytest.raises(ValueError, match="no body frame"):
+            read_message(lone_header)
+        array_header = io.BytesIO()
+        write_frame(array_header, b"[]")
+        write_frame(array_header, b"")
+        array_header.seek(0)
+        with pytest.raises(ValueError, match="not a JSON object"):
+            read_message(array_header)
+
+    @pytest.mark.parametrize("framing", ["nul", "length"])
+    def test_documents_round_trip_across_small_reads(self, monkeypatch: pytest.MonkeyPatch, framing: str) -> None:
+        monkeypatch.setattr("markwright._framing._CHUNK_SIZE", 3)
+        documents = [b"first doc", b"", "thïrd".encode()]
+        stream = io.BytesIO()
+        for document in documents:
+            write_document(stream, document, framing)
+        stream.seek(0)
+        assert list(iter_documents(stream, framing)) == documents
+
+    def test_final_nul_document_may_be_unterminated(self) -> None:
+        assert list(iter_documents(io.BytesIO(b"a\0b"), "nul")) == [b"a", b"b"]
+        assert list(iter_documents(io.BytesIO(b""), "nul")) == []
+
+
+class TestAnswer:
+    """Tests for answer matching the in-process filters."""
+
+    def test_steps_match_in_process_results(self) -> None:
+        names = list(EXTENSION_NAMES)
+        assert answer({"step": "pre"}, SOURCE) == (0, run_pre(SOURCE, names), "")
+        assert answer({"step": "post"}, SOURCE) == (0, run_post(SOURCE, names), "")
+        assert answer({"step": "render", "use": ["youtube"]}, SOURCE) == (0, render(SOURCE, ["youtube"]), "")
+
+    def test_warn_and_report_skips_fill_stderr(self) -> None:
+        exit_code, _, errors = answer({"step": "post", "warn": True, "report_skips": True}, BROKEN_HTML)
+        assert exit_code == 0
+        assert "Skipping malformed mw-fence marker" in errors
+        assert "mw post: skipped 4 of 5 stages" in errors
+        assert answer({"step": "post"}, BROKEN_HTML)[2] == ""
+
+    def test_usage_errors_exit_two(self) -> None:
+        assert answer({"step": "bogus"}, "")[0] == 2
+        assert answer({"step": "pre", "exclude": ["bogus"]}, "") == (2, "", "unknown extension: 'bogus'\n")
+
+
+class TestServer:
+    """Tests for the daemon answering over its socket."""
+
+    def test_client_requests_match_in_process_results(self, daemon: str) -> None:
+        assert client.request(daemon, {"step": "pre"}, SOURCE) == (0, run_pre(SOURCE, list(EXTENSION_NAMES)), "")
+        assert client.request(daemon, {"step": "render"}, SOURCE)[1] == render(SOURCE, list(EXTENSION_NAMES))
+
+    def test_one_connection_carries_many_requests(self, daemon: str) -> None:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(daemon)
+            with connection.makefile("rwb") as stream:
+                for _ in range(3):
+                    write_message(stream, {"step": "pre", "use": ["youtube"]}, SOURCE)
+                stream.flush()
+                replies = [read_message(stream) for _ in range(3)]
+        assert replies == [({"exit": 0, "stderr": ""}, run_pre(SOURCE, ["youtube"]))] * 3
+
+    def test_bad_request_gets_an_error_reply(self, daemon: str) -> None:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(daemon)
+            with connection.makefile("rwb") as stream:
+                write_frame(stream, b"not json")
+                write_frame(stream, b"")
+                stream.flush()
+                reply = read_message(stream)
+        assert reply is not None
+        assert reply[0]["exit"] == 2
+        assert "bad request" in reply[0]["stderr"]
+
+    def test_failing_request_closes_the_connection(self, daemon: str, capsys: pytest.CaptureFixture[str]) -> None:
+        with pytest.raises(ValueError, match="without answering"):
+            client.request(daemon, {"step": "pre", "use": 5}, SOURCE)
+        assert "TypeError" in capsys.readouterr().err
+
+    def test_live_daemon_keeps_its_socket(self, daemon: str) -> None:
+        with pytest.raises(OSError) as raised:
+            Server(daemon)
+        assert raised.value.errno == errno.EADDRINUSE
+
+    def test_stale_socket_is_replaced(self, socket_dir: str) -> None:
+        path = os.path.join(socket_dir, "stale.sock")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+            stale.bind(path)
+        with Server(path, workers=1):
+            assert os.path.exists(path)
+        assert not os.path.exists(path)
+
+    def test_regular_file_is_never_removed(self, socket_dir: str) -> None:
+        path = os.path.join(socket_dir, "notes.txt")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write("keep")
+        with pytest.raises(OSError):
+            Server(path, workers=1)
+        assert os.path.exists(path)
+
+
+class TestCliServeAndClient:
+    """Tests for the serve and client subcommands."""
+
+    def test_client_behaves_like_the_filter(
+        self, daemon: str, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        monkeypatch.setattr("sys.stdin", io.StringIO(BROKEN_HTML))
+        exit_code = main(["client", "post", "--socket", daemon, "--use", "fence", "--warn"])
+        captured = capsys.readouterr()
+        assert exit_code == 0
+        assert captured.out == run_post(BROKEN_HTML, ["fence"])
+        assert "Skipping malformed mw-fence marker" in captured.err
+
+    def test_client_reads_socket_from_environment(
+        self, daemon: str, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        monkeypatch.setenv("MW_SOCKET", daemon)
+        monkeypatch.setattr("sys.stdin", io.StringIO(SOURCE))
+        exit_code = main(["client", "pre", "--use", "bogus"])
+        assert exit_code == 2
+        assert "bogus" in capsys.readouterr().err
+
+    def test_unreachable_daemon_exits_one(
+        self, socket_dir: str, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        monkeypatch.setattr("sys.stdin", io.StringIO(SOURCE))
+        exit_code = main(["client", "pre", "--socket", os.path.join(socket_dir, "none.sock")])
+        assert exit_code == 1
+        assert "cannot use mw serve" in capsys.readouterr().err
+
+    @pytest.mark.parametrize("command", ["serve", "client"])
+    def test_missing_socket_exits_two(
+        self, command: str, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        monkeypatch.delenv("MW_SOCKET", raising=False)
+        argv = [command] if command == "serve" else [command, "pre"]
+        assert main(argv) == 2
+        assert "MW_SOCKET" in capsys.readouterr().err
+
+    def test_serve_runs_until_interrupted_and_removes_its_socket(
+        self, socket_dir: str, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        def interrupt(server: Server) -> None:
+            raise KeyboardInterrupt
+
+        monkeypatch.setattr(Server, "serve_forever", interrupt)
+        path = os.path.join(socket_dir, "mw.sock")
+        assert main(["serve", "--socket", path, "-j", "1"]) == 0
+        assert "listening on" in capsys.readouterr().err
+        assert not os.path.exists(path)
+
+    def test_serve_reports_a_busy_socket(self, daemon: str, capsys: pytest.CaptureFixture[str]) -> None:
+        assert main(["serve", "--socket", daemon]) == 1
+        assert "already running" in capsys.readouterr().err
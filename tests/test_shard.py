@@ -0,0 +1,74 @@
+# ABOUTME: Tests for the deterministic sharding behind --shard I/N.
+# Covers spec parsing, stable path-hash assignment, size balancing, and the partial file names.
+
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from markwright.manifest import markwright_version
+from markwright.shard import Shard, partition, path_slot
+
+FILES = [f"posts/{number:03}.md" for number in range(200)]
+
+
+class TestShardSpec:
+    """Tests for parsing and naming shards."""
+
+    def test_parses_index_and_count(self) -> None:
+        assert Shard.parse(" 2/8 ") == Shard(2, 8)
+        assert str(Shard(2, 8)) == "2/8"
+
+    @pytest.mark.parametrize("spec", ["0/4", "5/4", "1", "a/b", "1/0", "-1/4"])
+    def test_rejects_invalid_specs(self, spec: str) -> None:
+        with pytest.raises(ValueError, match="expected I/N"):
+            Shard.parse(spec)
+
+    def test_partial_files_are_named_after_the_merged_manifest(self, tmp_path: Path) -> None:
+        shard = Shard(2, 8)
+        assert shard.partial(tmp_path / ".mw-manifest.json") == tmp_path / ".mw-manifest.shard-2-of-8.json"
+        assert shard.stats_path(tmp_path / ".mw-manifest.json") == tmp_path / ".mw-manifest.shard-2-of-8.stats.json"
+
+    def test_save_stats_stamps_version_step_and_shard(self, tmp_path: Path) -> None:
+        shard = Shard(1, 2)
+        shard.save_stats(tmp_path / "m.json", "post", {"files": 3, "seconds": 0.5})
+        assert json.loads(shard.stats_path(tmp_path / "m.json").read_text(encoding="utf-8")) == {
+            "markwright": markwright_version(),
+            "step": "post",
+            "shard": "1/2",
+            "files": 3,
+            "seconds": 0.5,
+        }
+
+
+class TestPartition:
+    """Tests for splitting a file list into disjoint, stable shards."""
+
+    @pytest.mark.parametrize("sizes", [None, {path: len(path) * (1 + index % 7) for index, path in enumerate(FILES)}])
+    def test_shards_cover_every_file_once_in_input_order(self, sizes: dict[str, int] | None) -> None:
+        shards = partition(FILES, 4, sizes)
+        assert sorted(path for shard in shards for path in shard) == FILES
+        assert all(shard == sorted(shard) for shard in shards)
+        assert [Shard(index, 4).select(FILES, sizes) for index in range(1, 5)] == shards
+
+    def test_path_assignment_survives_other_files_changing(self) -> None:
+        before = partition(FILES, 4)
+        after = partition(["posts/new.md", *FILES[1:]], 4)
+        for old, new in zip(before, after, strict=True):
+            assert [path for path in old if path != FILES[0]] == [path for path in new if path != "posts/new.md"]
+
+    def test_path_hash_does_not_depend_on_the_interpreter(self) -> None:
+        script = "from markwright.shard import path_slot; print(path_slot('posts/a.md'))"
+        completed = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True, env={"PYTHONHASHSEED": "1"}
+        )
+        assert int(completed.stdout) == path_slot("posts/a.md")
+
+    def test_size_balancing_evens_out_bytes(self) -> None:
+        sizes = {path: 1000 if index < 4 else 10 for index, path in enumerate(FILES)}
+        loads = [sum(sizes[path] for path in shard) for shard in partition(FILES, 4, sizes)]
+        assert max(loads) - min(loads) <= 10
@@ -0,0 +1,94 @@
+# ABOUTME: Startup tests for the mw entry point: which modules each subcommand loads and how long cli takes to import.
+# Runs mw in a fresh interpreter under python -X importtime and reads the import report from stderr.
+
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import pytest
+
+from markwright import youtube
+from markwright.registry import EXTENSION_NAMES
+
+# Cumulative import time allowed for markwright.cli, in milliseconds. Importing it
+# takes about 30 ms from cached bytecode and 50 ms when every module is compiled;
+# pulling Python-Markdown and its extensions back in adds about as much again.
+STARTUP_BUDGET_MS = 150
+
+_RUN_MAIN = "import sys; from markwright.cli import main; sys.exit(main(sys.argv[1:]))"
+
+
+def _import_report(argv: list[str], stdin: str = "") -> dict[str, int]:
+    """Run ``mw`` with ``argv`` in a fresh interpreter and collect its imports.
+
+    :param argv: Arguments after ``mw``.
+    :param stdin: Text fed to the subcommand.
+    :returns: Cumulative import time in microseconds, by module name.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _RUN_MAIN, *argv],
+        input=stdin,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    report: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.removeprefix("import time:").split("|")
+        report[name.strip()] = int(cumulative)
+    return report
+
+
+def _loads_markdown(report: dict[str, int]) -> bool:
+    """Whether any Python-Markdown module appears in ``report``."""
+    return any(name == "markdown" or name.startswith("markdown.") for name in report)
+
+
+def _loaded_extensions(report: dict[str, int]) -> set[str]:
+    """The markwright extension modules that appear in ``report``."""
+    return {name for name in EXTENSION_NAMES if f"markwright.{name}" in report}
+
+
+class TestStartupImports:
+    """The pre, post, and list paths never import Python-Markdown, and only selected extensions load."""
+
+    @pytest.mark.parametrize(
+        ("argv", "stdin"),
+        [(["pre"], "[youtube dQw4w9WgXcQ]\n"), (["post"], '<p class="codepen">embed</p>'), (["list"], "")],
+    )
+    def test_subcommand_does_not_import_markdown(self, argv: list[str], stdin: str) -> None:
+        assert not _loads_markdown(_import_report(argv, stdin))
+
+    def test_render_imports_markdown(self) -> None:
+        assert _loads_markdown(_import_report(["render", "--use", "youtube"], "# Title\n"))
+
+    def test_pre_imports_only_the_selected_extension(self) -> None:
+        report = _import_report(["pre", "--use", "youtube"], "[youtube dQw4w9WgXcQ]\n")
+        assert _loaded_extensions(report) == {"youtube"}
+
+    def test_post_imports_only_the_selected_extension(self) -> None:
+        report = _import_report(["post", "--use", "codepen"], '<p class="codepen">embed</p>')
+        assert _loaded_extensions(report) == {"codepen"}
+
+
+class TestStartupBudget:
+    """Importing markwright.cli stays within the startup budget."""
+
+    def test_cli_import_within_budget(self) -> None:
+        # Best of three runs, so one slow scheduler slice does not fail the suite.
+        fastest = min(_import_report(["list"])["markwright.cli"] for _ in range(3))
+        assert fastest / 1000 < STARTUP_BUDGET_MS
+
+
+class TestLazyExtensionClasses:
+    """The Python-Markdown classes stay reachable from the public extension modules."""
+
+    def test_extension_class_loads_on_access(self) -> None:
+        assert youtube.YouTubeExtension.__module__ == "markwright._extensions.youtube"
+
+    def test_unknown_attribute_raises_attribute_error(self) -> None:
+        with pytest.raises(AttributeError, match="no attribute 'NoSuchThing'"):
+            _ = youtube.NoSuchThing  # type: ignore[attr-defined]
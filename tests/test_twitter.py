@@ -5,7 +5,8 @@ from __future__ import annotations
 
 import markdown
 
-from markwright.twitter import apply_html, expand_source
+from markwright._scan import LiteralIndex
+from markwright.twitter import TWITTER_SCRIPT, TWITTER_SIGNATURE, apply_html, expand_source, script_edits
 
 
 def render(source: str) -> str:
@@ -110,6 +111,14 @@ class TestTwitterScript:
         result = render("Just some text")
         assert "platform.twitter.com" not in result
 
+    def test_script_edits_append_once_from_index(self) -> None:
+        html_input = f"<p {TWITTER_SIGNATURE}></p>"
+        literals = (TWITTER_SIGNATURE, TWITTER_SCRIPT)
+        edits = script_edits(html_input, LiteralIndex.build(html_input, literals))
+        assert edits == [(len(html_input), 0, "\n" + TWITTER_SCRIPT)]
+        injected = html_input + edits[0][2]
+        assert script_edits(injected, LiteralIndex.build(injected, literals)) == []
+
 
 class TestTwitterEdgeCases:
     """Tests for edge cases."""
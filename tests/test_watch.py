@@ -0,0 +1,119 @@
+# ABOUTME: Tests for the incremental rebuild mode behind mw watch.
+# Covers hash-based skipping, selection changes, deletions, restarts, unreadable inputs, and the debounced polling loop.
+
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from markwright.registry import run_post, run_pre
+from markwright.watch import SyncResult, Watcher
+
+SOURCE = "[youtube dQw4w9WgXcQ]\n\nText <^>marked<^>.\n"
+BROKEN_HTML = "<!-- mw-fence:not json --><p>body</p>\n"
+
+
+@pytest.fixture
+def source(tmp_path: Path) -> Path:
+    """A source tree with two Markdown pages."""
+    root = tmp_path / "src"
+    (root / "a").mkdir(parents=True)
+    (root / "a" / "one.md").write_text(SOURCE, encoding="utf-8")
+    (root / "two.md").write_text("Plain text.\n", encoding="utf-8")
+    return root
+
+
+class TestWatcherSync:
+    """Tests for Watcher.sync rebuilding only what changed."""
+
+    def test_first_sync_builds_everything_then_nothing(self, source: Path, tmp_path: Path) -> None:
+        watcher = Watcher("pre", source, tmp_path / "out", ["youtube"])
+        assert watcher.sync().rebuilt == ("a/one.md", "two.md")
+        assert (tmp_path / "out" / "a" / "one.md").read_text(encoding="utf-8") == run_pre(SOURCE, ["youtube"])
+        assert watcher.sync().rebuilt == ()
+
+    def test_edit_rebuilds_only_that_file(self, source: Path, tmp_path: Path) -> None:
+        watcher = Watcher("pre", source, tmp_path / "out", ["youtube"])
+        watcher.sync()
+        (source / "two.md").write_text("[youtube abc]\n", encoding="utf-8")
+        result = watcher.sync()
+        assert result.rebuilt == ("two.md",)
+        assert "abc" in (tmp_path / "out" / "two.md").read_text(encoding="utf-8")
+
+    def test_touch_without_content_change_does_not_rebuild(self, source: Path, tmp_path: Path) -> None:
+        watcher = Watcher("pre", source, tmp_path / "out", ["youtube"])
+        watcher.sync()
+        os.utime(source / "two.md", ns=(1, 1))
+        assert watcher.sync().rebuilt == ()
+
+    def test_restart_skips_unchanged_and_selection_change_rebuilds(self, source: Path, tmp_path: Path) -> None:
+        Watcher("pre", source, tmp_path / "out", ["youtube"]).sync()
+        assert Watcher("pre", source, tmp_path / "out", ["youtube"]).sync().rebuilt == ()
+        rebuilt = Watcher("pre", source, tmp_path / "out", ["youtube", "fence"]).sync().rebuilt
+        assert rebuilt == ("a/one.md", "two.md")
+
+    def test_deleted_output_is_rebuilt_on_restart(self, source: Path, tmp_path: Path) -> None:
+        Watcher("pre", source, tmp_path / "out", ["youtube"]).sync()
+        (tmp_path / "out" / "two.md").unlink()
+        assert Watcher("pre", source, tmp_path / "out", ["youtube"]).sync().rebuilt == ("two.md",)
+
+    def test_removed_source_removes_its_output(self, source: Path, tmp_path: Path) -> None:
+        watcher = Watcher("render", source, tmp_path / "out", [])
+        watcher.sync()
+        (source / "two.md").unlink()
+        result = watcher.sync()
+        assert result.removed == ("two.md",)
+        assert not (tmp_path / "out" / "two.html").exists()
+        assert (tmp_path / "out" / "a" / "one.html").exists()
+
+    def test_post_warnings_are_prefixed_with_the_file(self, tmp_path: Path) -> None:
+        (tmp_path / "page.html").write_text(BROKEN_HTML, encoding="utf-8")
+        result = Watcher("post", tmp_path, tmp_path / "out", ["fence"]).sync()
+        assert result.warnings[0].startswith("page.html: Skipping malformed mw-fence marker")
+        assert (tmp_path / "out" / "page.html").read_text(encoding="utf-8") == run_post(BROKEN_HTML, ["fence"])
+
+    def test_dangling_symlink_and_special_files_are_ignored(self, source: Path, tmp_path: Path) -> None:
+        (source / ".#two.md").symlink_to(source / "missing.md")
+        os.mkfifo(source / "pipe.md")
+        watcher = Watcher("pre", source, tmp_path / "out", ["youtube"])
+        assert list(watcher.scan()) == ["a/one.md", "two.md"]
+        assert watcher.sync().rebuilt == ("a/one.md", "two.md")
+
+    def test_unreadable_files_become_warnings(self, source: Path, tmp_path: Path) -> None:
+        (source / "bad.md").write_bytes(b"\xff\xfe")
+        watcher = Watcher("pre", source, tmp_path / "out", ["youtube"])
+        snapshot = watcher.scan()
+        (source / "two.md").unlink()
+        result = watcher.sync(snapshot)
+        assert result.rebuilt == ("a/one.md",)
+        assert result.warnings[0].startswith("bad.md: not rebuilt: 'utf-8' codec can't decode")
+        assert result.warnings[1] == "two.md: not rebuilt: No such file or directory"
+        assert watcher.sync().removed == ()
+
+    def test_invalid_runs_raise(self, source: Path) -> None:
+        with pytest.raises(ValueError, match="overwrite its inputs"):
+            Watcher("pre", source, source, [])
+        with pytest.raises(ValueError, match="bogus"):
+            Watcher("pre", source, source / "out", ["bogus"])
+
+
+class TestWatcherRun:
+    """Tests for the polling loop."""
+
+    def test_edit_during_run_triggers_one_debounced_pass(self, source: Path, tmp_path: Path) -> None:
+        watcher = Watcher("pre", source, tmp_path / "out", ["youtube"])
+        stop = threading.Event()
+        results: list[SyncResult] = []
+
+        def report(result: SyncResult) -> None:
+            results.append(result)
+            if len(results) == 1:
+                (source / "two.md").write_text("[youtube abc]\n", encoding="utf-8")
+            else:
+                stop.set()
+
+        watcher.run(report, interval=0.01, debounce=0.05, stop=stop)
+        assert [result.rebuilt for result in results] == [("a/one.md", "two.md"), ("two.md",)]